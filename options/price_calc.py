@@ -34,7 +34,7 @@ Run the script to get the price of the specified option based on the provided pa
 # INPUTS/CONSTANTS
 # GENERAL
 from utils.utils import get_live_data_from_yfinance, return_sample_data, trading_days_between, get_asset_data, \
-    process_data, calculate_volatility, calculate_binomial_parameters, price_option
+    process_data, calculate_volatility, calculate_binomial_parameters, build_binomial_trees, price_option
 import numpy as np
 import pandas as pd
 
@@ -67,21 +67,8 @@ current_stock_price = asset_data_frame.iloc[0]['Close']
 
 print('Current stock price:', current_stock_price)
 
-stock_price_tree = np.zeros((PRICING_STEPS + 1, PRICING_STEPS + 1))
-stock_price_tree[0, 0] = current_stock_price
-
-for i in range(1, PRICING_STEPS + 1):
-    stock_price_tree[i, 0] = stock_price_tree[i - 1, 0] * up_branch_move
-    for j in range(1, i + 1):
-        stock_price_tree[i, j] = stock_price_tree[i - 1, j - 1] * down_branch_move
-
-option_value_tree = np.zeros((PRICING_STEPS + 1, PRICING_STEPS + 1))
-
-for j in range(PRICING_STEPS + 1):
-    if option_type == 'call':
-        option_value_tree[PRICING_STEPS, j] = max(0, stock_price_tree[PRICING_STEPS, j] - strike_price)
-    elif option_type == 'put':
-        option_value_tree[PRICING_STEPS, j] = max(0, strike_price - stock_price_tree[PRICING_STEPS, j])
+stock_price_tree, option_value_tree = build_binomial_trees(current_stock_price, strike_price, PRICING_STEPS,
+                                                           up_branch_move, down_branch_move, option_type)
 
 option_price = price_option(stock_price_tree, option_value_tree, PRICING_STEPS, up_branch_probability,
                             down_branch_probability, factor_step_discount, option_type, strike_price, OPTION_STYLE)
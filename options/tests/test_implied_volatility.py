@@ -1,5 +1,6 @@
 import unittest
-from utils.utils import implied_volatility
+import numpy as np
+from utils.utils import build_binomial_trees, implied_volatility
 
 class TestOptionPricing(unittest.TestCase):
     def test_implied_volatility(self):
@@ -28,5 +29,15 @@ class TestOptionPricing(unittest.TestCase):
         # Assert that the calculated implied volatility is close to the expected value
         self.assertAlmostEqual(calculated_implied_volatility, expected_implied_volatility, places=2)
 
+    def test_binomial_trees(self):
+        stock_price_tree, option_value_tree = build_binomial_trees(100, 105, 3, 1.1, 0.9, 'put')
+
+        # After i steps, j of them down, the price is 100 * 1.1 ** (i - j) * 0.9 ** j
+        for i in range(4):
+            for j in range(i + 1):
+                self.assertAlmostEqual(stock_price_tree[i, j], 100 * 1.1 ** (i - j) * 0.9 ** j)
+        np.testing.assert_allclose(option_value_tree[3], np.maximum(105 - stock_price_tree[3], 0))
+        self.assertFalse(option_value_tree[:3].any())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -6,7 +6,11 @@ import numpy as np
 from scipy.optimize import newton
 import warnings
 
-def get_live_data_from_yfinance(ticker: str = "SPY", start_days_ago: int = 365, end_days_ago: int = 0) -> pd.DataFrame:
+# Downloads are kept in the same local cache as the VPA jobs. Pass cache_dir=None to always download.
+DATA_CACHE_DIR = os.path.join(os.path.dirname(__file__), "../vpa/cache/")
+
+def get_live_data_from_yfinance(ticker: str = "SPY", start_days_ago: int = 365, end_days_ago: int = 0,
+                                cache_dir: str = DATA_CACHE_DIR) -> pd.DataFrame:
 
     # Get the current date
     end_date = datetime.now().date() - timedelta(days=end_days_ago)
@@ -14,6 +18,13 @@ def get_live_data_from_yfinance(ticker: str = "SPY", start_days_ago: int = 365,
     # Get the date one year ago from today
     start_date = end_date - timedelta(days=start_days_ago)
 
+    if cache_dir is not None:
+        # Only the days that are not on disk yet are downloaded. Imported here so the options modules that use the
+        # other helpers do not pull in the vpa package.
+        from vpa.cache import OHLCVCache, CachedProvider
+        from vpa.data_provider import YahooProvider
+        return CachedProvider(YahooProvider(), OHLCVCache(cache_dir)).fetch_one(ticker, start_date, end_date)
+
     # Suppress specific warning
     warnings.filterwarnings("ignore", message="The default value of auto_adjust will be changed to True")
 
@@ -81,6 +92,27 @@ def calculate_binomial_parameters(volatility, trading_days_left, trading_days, p
     down_branch_probability = 1 - up_branch_probability
     return up_branch_move, down_branch_move, factor_step_discount, up_branch_probability, down_branch_probability
 
+def build_binomial_trees(current_stock_price, strike_price, pricing_steps, up_branch_move, down_branch_move, option_type):
+    # The stock price tree (stock_price_tree[i, j] is the price after i steps, j of them down) and the option value
+    # tree with the payoffs at expiry filled in, ready for price_option
+    stock_price_tree = np.zeros((pricing_steps + 1, pricing_steps + 1))
+    stock_price_tree[0, 0] = current_stock_price
+
+    for i in range(1, pricing_steps + 1):
+        stock_price_tree[i, 0] = stock_price_tree[i - 1, 0] * up_branch_move
+        for j in range(1, i + 1):
+            stock_price_tree[i, j] = stock_price_tree[i - 1, j - 1] * down_branch_move
+
+    option_value_tree = np.zeros((pricing_steps + 1, pricing_steps + 1))
+
+    for j in range(pricing_steps + 1):
+        if option_type == 'call':
+            option_value_tree[pricing_steps, j] = max(0, stock_price_tree[pricing_steps, j] - strike_price)
+        elif option_type == 'put':
+            option_value_tree[pricing_steps, j] = max(0, strike_price - stock_price_tree[pricing_steps, j])
+
+    return stock_price_tree, option_value_tree
+
 def price_option(stock_price_tree, option_value_tree, pricing_steps, up_branch_probability, down_branch_probability,
                  factor_step_discount, option_type, strike_price, option_style):
     for i in range(pricing_steps - 1, -1, -1):
@@ -107,21 +139,8 @@ def implied_volatility(option_price, option_type, current_stock_price, strike_pr
         up_branch_move, down_branch_move, factor_step_discount, up_branch_probability, down_branch_probability = calculate_binomial_parameters(
             volatility, time_to_expiration * TRADING_DAYS, TRADING_DAYS, pricing_steps, interest_rate, dividend_yield)
 
-        stock_price_tree = np.zeros((pricing_steps + 1, pricing_steps + 1))
-        stock_price_tree[0, 0] = current_stock_price
-
-        for i in range(1, pricing_steps + 1):
-            stock_price_tree[i, 0] = stock_price_tree[i - 1, 0] * up_branch_move
-            for j in range(1, i + 1):
-                stock_price_tree[i, j] = stock_price_tree[i - 1, j - 1] * down_branch_move
-
-        option_value_tree = np.zeros((pricing_steps + 1, pricing_steps + 1))
-
-        for j in range(pricing_steps + 1):
-            if option_type == 'call':
-                option_value_tree[pricing_steps, j] = max(0, stock_price_tree[pricing_steps, j] - strike_price)
-            elif option_type == 'put':
-                option_value_tree[pricing_steps, j] = max(0, strike_price - stock_price_tree[pricing_steps, j])
+        stock_price_tree, option_value_tree = build_binomial_trees(current_stock_price, strike_price, pricing_steps,
+                                                                   up_branch_move, down_branch_move, option_type)
 
         calculated_option_price = price_option(stock_price_tree, option_value_tree, pricing_steps,
                                                up_branch_probability,
@@ -134,8 +153,9 @@ def implied_volatility(option_price, option_type, current_stock_price, strike_pr
     implied_vol = newton(objective_function, initial_guess, tol=tolerance)
     return implied_vol
 
-def get_asset_data(use_real_data, ticker, start_days_ago, end_days_ago):
+def get_asset_data(use_real_data, ticker, start_days_ago, end_days_ago, cache_dir=DATA_CACHE_DIR):
     if use_real_data:
-        return get_live_data_from_yfinance(ticker=ticker, start_days_ago=start_days_ago, end_days_ago=end_days_ago)
+        return get_live_data_from_yfinance(ticker=ticker, start_days_ago=start_days_ago, end_days_ago=end_days_ago,
+                                           cache_dir=cache_dir)
     else:
         return return_sample_data()
\ No newline at end of file
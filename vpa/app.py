@@ -1,9 +1,16 @@
 import os
+import sys
+import atexit
+import queue
+import threading
+import weakref
 import statistics
-from collections import deque
+from collections import deque, namedtuple
+from collections.abc import MutableMapping
 from datetime import datetime
-import pandas as pd
+from itertools import islice
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 def calculate_true_range(candle1, candle2):
     # True Range (TR) is the greatest of the following:
@@ -79,6 +86,199 @@ def calculate_adx(candles, period=14):
     return [adx[0], statistics.fmean(tr_smooth), statistics.fmean(dm_plus_smooth), statistics.fmean(dm_minus_smooth)]
 
 
+def _pair_movements(high, low, close):
+    # True Range, DM+ and DM- for each pair of consecutive candles in OHLC arrays (along the last axis)
+    high_move = high[..., 1:] - high[..., :-1]
+    low_move = low[..., :-1] - low[..., 1:]
+    tr = np.maximum.reduce([high[..., 1:] - low[..., 1:], np.abs(high[..., 1:] - close[..., :-1]),
+                            np.abs(low[..., 1:] - close[..., :-1])])
+    dm_plus = np.where(high_move > low_move, np.maximum(high_move, 0), 0)
+    dm_minus = np.where(low_move > high_move, np.maximum(low_move, 0), 0)
+    return tr, dm_plus, dm_minus
+
+
+def _wilder_smooth(windows, period):
+    # Wilder smoothing restarted at the beginning of every window, as calculate_adx does
+    smooth = windows[:, 0] + 0
+    for i in range(1, period):
+        smooth = smooth + windows[:, i]
+    smoothed = [smooth]
+    for i in range(period, windows.shape[1]):
+        smooth = smooth - (smooth / period) + windows[:, i]
+        smoothed.append(smooth)
+    return np.stack(smoothed, axis=1)
+
+
+def calculate_adx_batch(high, low, close, length, period=14):
+    # calculate_adx applied to every window of `length` candles in one go. Row i is the window ending at
+    # candle length - 1 + i and holds [ADX, mean smoothed TR, mean smoothed DM+, mean smoothed DM-].
+    if length < period + 1:
+        raise ValueError(f"Not enough data to calculate ADX. At least {period + 1} periods are required.")
+
+    tr, dm_plus, dm_minus = _pair_movements(np.asarray(high, dtype=float), np.asarray(low, dtype=float),
+                                            np.asarray(close, dtype=float))
+    return _adx_of_windows(sliding_window_view(tr, length - 1), sliding_window_view(dm_plus, length - 1),
+                           sliding_window_view(dm_minus, length - 1), period)
+
+
+def calculate_adx_windows(high, low, close, period=14):
+    # calculate_adx of each row of (windows x candles) OHLC arrays, e.g. the latest window of every ticker in a
+    # panel (see vpa/panel.py). Returns the same columns as calculate_adx_batch.
+    high, low, close = (np.asarray(values, dtype=float) for values in (high, low, close))
+    if high.shape[-1] < period + 1:
+        raise ValueError(f"Not enough data to calculate ADX. At least {period + 1} periods are required.")
+    return _adx_of_windows(*_pair_movements(high, low, close), period)
+
+
+def _adx_of_windows(tr, dm_plus, dm_minus, period):
+    tr_smooth = _wilder_smooth(tr, period)
+    dm_plus_smooth = _wilder_smooth(dm_plus, period)
+    dm_minus_smooth = _wilder_smooth(dm_minus, period)
+
+    di_plus = 100 * (dm_plus_smooth[:, :period] / tr_smooth[:, :period])
+    di_minus = 100 * (dm_minus_smooth[:, :period] / tr_smooth[:, :period])
+    dx = 100 * np.abs(di_plus - di_minus) / (di_plus + di_minus)
+
+    # A window shorter than 2 * period has fewer than `period` DX values, which calculate_adx sums as they are
+    adx = dx[:, 0] + 0
+    for i in range(1, min(period, dx.shape[1])):
+        adx = adx + dx[:, i]
+    adx = adx / period
+
+    return np.stack([adx, tr_smooth.mean(axis=1), dm_plus_smooth.mean(axis=1), dm_minus_smooth.mean(axis=1)], axis=1)
+
+
+def _wilder_smooth_values(values, period):
+    # Same smoothing as calculate_adx for a single list of values
+    smoothed = [sum(values[:period])]
+    for value in values[period:]:
+        smoothed.append(smoothed[-1] - (smoothed[-1] / period) + value)
+    return smoothed
+
+
+_PreviousCandle = namedtuple("_PreviousCandle", ["high", "low", "close"])
+
+
+class ADXState:
+    # Incremental version of calculate_adx over a rolling window of `length` candles. Each new candle adds one
+    # TR/DM+/DM- value and drops the oldest, and the smoothed values are carried forward rather than recomputed.
+    #
+    # calculate_adx starts the Wilder smoothing again at the beginning of the window, so the mean of a smoothed series
+    # over the window is a fixed weighting of the window's values:
+    #   sum(smooth) = period * (head * (1 - a^(m+1)) + tail - weighted_tail)
+    # where a = 1 - 1/period, head is the sum of the first `period` values, tail is the sum of the remaining m values
+    # and weighted_tail is the tail weighted by a^(m+1-j). All three slide in O(1). The ADX itself only needs the first
+    # `period` smoothed DM+/DM- values, so each update costs O(period) however long the window is.
+
+    def __init__(self, length, period=14):
+        if length < period + 1:
+            raise ValueError(f"Not enough data to calculate ADX. At least {period + 1} periods are required.")
+        self.__length = length
+        self.__period = period
+        self.__decay = 1 - 1 / period
+        self.__tail_length = length - 1 - period
+        self.__previous_candle = None
+        self.__movements = {name: deque(maxlen=length - 1) for name in ["tr", "dm_plus", "dm_minus"]}
+        self.__sums = None
+        self.__updates_since_resync = 0
+
+    def __len__(self):
+        # Number of candles in the window
+        return len(self.__movements["tr"]) + (self.__previous_candle is not None)
+
+    def update(self, candle):
+        if self.__previous_candle is not None:
+            movements = {
+                "tr": calculate_true_range(self.__previous_candle, candle),
+                "dm_plus": calculate_dm_plus(self.__previous_candle, candle),
+                "dm_minus": calculate_dm_minus(self.__previous_candle, candle)
+            }
+            window_full = len(self.__movements["tr"]) == self.__length - 1
+            for name, value in movements.items():
+                window = self.__movements[name]
+                if window_full and self.__sums is not None:
+                    # The oldest value leaves the window and the first tail value moves into the head
+                    head, tail, weighted_tail = self.__sums[name]
+                    if self.__tail_length == 0:
+                        # A window of period + 1 candles is all head, so the new value goes straight into it
+                        self.__sums[name] = (head - window[0] + value, 0, 0)
+                    else:
+                        oldest, moving = window[0], window[self.__period]
+                        self.__sums[name] = (
+                            head - oldest + moving,
+                            tail - moving + value,
+                            self.__decay * (weighted_tail - self.__decay ** self.__tail_length * moving)
+                            + self.__decay * value
+                        )
+                window.append(value)
+            self.__updates_since_resync += 1
+            # Start the running sums once the window is full, and rebuild them once per window length so
+            # rounding errors cannot build up
+            if len(self.__movements["tr"]) == self.__length - 1 and (
+                    self.__sums is None or self.__updates_since_resync >= self.__length):
+                self.__resync()
+        # Only the prices are kept - the candle itself may be a view onto a buffer row that gets reused
+        self.__previous_candle = _PreviousCandle(candle.high, candle.low, candle.close)
+
+    def __resync(self):
+        self.__sums = {}
+        for name, window in self.__movements.items():
+            values = list(window)
+            weighted_tail = 0
+            for value in values[self.__period:]:
+                weighted_tail = self.__decay * (weighted_tail + value)
+            self.__sums[name] = (sum(values[:self.__period]), sum(values[self.__period:]), weighted_tail)
+        self.__updates_since_resync = 0
+
+    def state(self):
+        # Everything update() has built up, as plain lists and numbers. The running sums are kept as they are rather
+        # than rebuilt, so a restored state carries on with exactly the values it would have had.
+        return {
+            "previous_candle": None if self.__previous_candle is None else list(self.__previous_candle),
+            "movements": {name: list(window) for name, window in self.__movements.items()},
+            "sums": None if self.__sums is None else {name: list(sums) for name, sums in self.__sums.items()},
+            "updates_since_resync": self.__updates_since_resync
+        }
+
+    def restore(self, state):
+        self.__previous_candle = None if state["previous_candle"] is None else _PreviousCandle(*state["previous_candle"])
+        for name, window in self.__movements.items():
+            window.clear()
+            window.extend(state["movements"][name])
+        self.__sums = None if state["sums"] is None else {name: tuple(sums) for name, sums in state["sums"].items()}
+        self.__updates_since_resync = state["updates_since_resync"]
+
+    def values(self):
+        # Returns [ADX, mean smoothed TR, mean smoothed DM+, mean smoothed DM-] like calculate_adx
+        if len(self) < self.__period + 1:
+            raise ValueError(f"Not enough data to calculate ADX. At least {self.__period + 1} periods are required.")
+
+        if self.__sums is None:
+            # Still filling the window - smooth what there is from scratch
+            smoothed = {name: _wilder_smooth_values(list(window), self.__period)
+                        for name, window in self.__movements.items()}
+            means = [statistics.fmean(smoothed[name]) for name in ["tr", "dm_plus", "dm_minus"]]
+            dm_plus_smooth, dm_minus_smooth = smoothed["dm_plus"], smoothed["dm_minus"]
+        else:
+            smoothed_count = self.__tail_length + 1
+            means = []
+            for name in ["tr", "dm_plus", "dm_minus"]:
+                head, tail, weighted_tail = self.__sums[name]
+                total = self.__period * (head * (1 - self.__decay ** smoothed_count) + tail - weighted_tail)
+                means.append(total / smoothed_count)
+            # Only the first `period` smoothed DM+/DM- values are needed for the ADX
+            first_values = min(2 * self.__period - 1, self.__length - 1)
+            dm_plus_smooth, dm_minus_smooth = [
+                _wilder_smooth_values(list(islice(self.__movements[name], first_values)), self.__period)
+                for name in ["dm_plus", "dm_minus"]
+            ]
+
+        # DX only depends on the ratio of DM+ to DM- as the smoothed TR cancels out of DI+ and DI-
+        dx = [100 * abs(plus - minus) / (plus + minus)
+              for plus, minus in zip(dm_plus_smooth[:self.__period], dm_minus_smooth[:self.__period])]
+        return [sum(dx) / self.__period] + means
+
+
 def identify_acc_or_dist(period_three, period_one):
     volume_stats_list = []
     price_stats_list = []
@@ -86,21 +286,23 @@ def identify_acc_or_dist(period_three, period_one):
         volume_stats_list.append(getattr(item, "volume"))
         price_stats_list.append(getattr(item, "close"))
 
-    period_three_volume_percentiles = np.percentile(volume_stats_list, [65, 90])
-    period_three_price_percentiles = np.percentile(price_stats_list, [10, 20, 80])
+    return identify_acc_or_dist_arrays(volume_stats_list, price_stats_list,
+                                       [getattr(item, "volume") for item in period_one], period_one[-1].close)
+
+
+def identify_acc_or_dist_arrays(period_three_volumes, period_three_closes, period_one_volumes, last_close):
+    # identify_acc_or_dist for windows that are already columns (e.g. CandleBuffer windows)
+    period_three_volume_percentiles = np.percentile(period_three_volumes, [65, 90])
+    period_three_price_percentiles = np.percentile(period_three_closes, [10, 20, 80])
 
     # print(f"Volume Percentiles (65th, 90th): {period_three_volume_percentiles}")
     # print(f"Price Percentiles (10th, 20th, 80th): {period_three_price_percentiles}")
 
-    high_volume_count = 0
-    for item in period_one:
-#        logger.log(f"Volume: {getattr(item, 'volume')}", level="DEBUG")
-        if getattr(item, "volume") > period_three_volume_percentiles[0]:
-            high_volume_count += 1
+    high_volume_count = int((np.asarray(period_one_volumes) > period_three_volume_percentiles[0]).sum())
 
     # print(f"High Volume Count: {high_volume_count}")
-    near_lows = period_one[-1].close < period_three_price_percentiles[1]
-    near_highs = period_one[-1].close > period_three_price_percentiles[2]
+    near_lows = last_close < period_three_price_percentiles[1]
+    near_highs = last_close > period_three_price_percentiles[2]
 
     # print(f"Near Lows: {near_lows}, Near Highs: {near_highs}")
 
@@ -111,6 +313,77 @@ def identify_acc_or_dist(period_three, period_one):
     else:
         return False, ""
 
+PERIODS = ["period_one", "period_two", "period_three"]
+
+# Layout of a single candle. Candle objects and CandleBuffer rows share it, so a Candle can be a view onto a buffer row.
+CANDLE_DTYPE = np.dtype(
+    [("time", object), ("open", np.float64), ("high", np.float64), ("low", np.float64), ("close", np.float64),
+     ("volume", np.float64), ("up_bar", np.bool_), ("spread", np.float64), ("upper_wick", np.float64),
+     ("lower_wick", np.float64), ("shooting_star", np.bool_), ("hammer", np.bool_), ("lld", np.bool_)]
+    + [(f"spread_percentile_{period}", np.float64) for period in PERIODS]
+    + [(f"volume_percentile_{period}", np.float64) for period in PERIODS]
+)
+
+
+def candle_record(time, volume, candle_open, high, low, close):
+    # The properties that can easily be calculated from the provided properties such as the spread, whether it's an
+    # up or down candle and the candle pattern, as a CANDLE_DTYPE tuple. Percentiles start off unset (NaN).
+    spread = abs(close - candle_open)
+    upper_wick = high - close
+    lower_wick = close - low
+
+    # If the upper wick is two times bigger than the spread and the lower wick - shooting star candle
+    shooting_star = (upper_wick > (spread * Candle.CONFIG_SHOOTING_STAR_UPPER_WICK_X_TIMES_BIGGER_THAN_SPREAD)
+                     and upper_wick > (lower_wick * Candle.CONFIG_SHOOTING_STAR_UPPER_WICK_X_TIMES_BIGGER_THAN_LOWER_WICK))
+
+    # If the lower wick is two times bigger than the spread and the upper wick - Hammer candle
+    hammer = (lower_wick > (spread * Candle.CONFIG_HAMMER_LOWER_WICK_X_TIMES_BIGGER_THAN_SPREAD)
+              and lower_wick > (upper_wick * Candle.CONFIG_HAMMER_LOWER_WICK_X_TIMES_BIGGER_THAN_UPPER_WICK))
+
+    # If both the lower wick and the higher wick are double the spread - long-legged Doji
+    lld = (upper_wick > spread * Candle.CONFIG_LLD_BOTH_WICKS_X_TIMES_BIGGER_THAN_SPREAD
+           and lower_wick > spread * Candle.CONFIG_LLD_BOTH_WICKS_X_TIMES_BIGGER_THAN_SPREAD)
+    if lld:
+        # If it's a lld then probably shouldn't also be marked as a Hammer or Shooting star!
+        shooting_star = False
+        hammer = False
+
+    return ((time, candle_open, high, low, close, volume, close > candle_open, spread, upper_wick, lower_wick,
+             shooting_star, hammer, lld) + (np.nan,) * (2 * len(PERIODS)))
+
+
+class PercentileView(MutableMapping):
+    # Dictionary-style access to the per-period percentile fields of a candle row, e.g. candle.spread_percentiles["period_one"]
+
+    __slots__ = ("__row", "__prop")
+
+    def __init__(self, row, prop):
+        self.__row = row
+        self.__prop = prop
+
+    def __getitem__(self, period):
+        value = self.__row[f"{self.__prop}_percentile_{period}"]
+        if np.isnan(value):
+            raise KeyError(period)
+        return value
+
+    def __setitem__(self, period, value):
+        self.__row[f"{self.__prop}_percentile_{period}"] = value
+
+    def __delitem__(self, period):
+        self[period]
+        self.__row[f"{self.__prop}_percentile_{period}"] = np.nan
+
+    def __iter__(self):
+        return (period for period in PERIODS if not np.isnan(self.__row[f"{self.__prop}_percentile_{period}"]))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class Candle:
     DEBUG = False
 
@@ -120,169 +393,170 @@ class Candle:
     CONFIG_HAMMER_LOWER_WICK_X_TIMES_BIGGER_THAN_UPPER_WICK = 2
     CONFIG_LLD_BOTH_WICKS_X_TIMES_BIGGER_THAN_SPREAD = 2
 
+    # All values live in a single CANDLE_DTYPE record rather than in attributes of their own
+    __slots__ = ("__row",)
+
     # Candle is initialised with all the properties that are provided by a Candlestick - volume, open, high, low, close
     def __init__(self, time, volume, candle_open, high, low, close):
-        self.__volume_percentiles = {}
-        self.__spread_percentiles = {}
-        self.__anomaly = {}
-        self.__volume = volume
-        self.__open = candle_open
-        self.__high = high
-        self.__low = low
-        self.__close = close
-
-        # Nothing is currently done with the time element, but it may be useful
-        self.__time = time
-        # Nothing done with notes yet either but may be useful for debugging purposes in future
-        self.__notes = []
-
-        # The following section is properties that can easily be calculated from the provided properties
-        # such as the spread and whether it's an up or down candle.
-        self.__up_bar = close > candle_open
-        self.__spread = abs(close - candle_open)
-        self.__high_low_spread = high - low
-        self.__high_open_spread = high - candle_open
-        self.__low_close_spread = low - close
-        self.__high_close_spread = high - close
-
-        self.__upper_wick = high - close
-        self.__lower_wick = close - low
-
-        self.__shooting_star = False
-        self.__hammer = False
-        self.__lld = False
-
-        # If the upper wick is two times bigger than the spread and the lower wick - shooting star candle
-        if (self.__upper_wick > (self.__spread * Candle.CONFIG_SHOOTING_STAR_UPPER_WICK_X_TIMES_BIGGER_THAN_SPREAD)
-                and self.__upper_wick > (self.__lower_wick *
-                                         Candle.CONFIG_SHOOTING_STAR_UPPER_WICK_X_TIMES_BIGGER_THAN_LOWER_WICK)):
-            self.__shooting_star = True
-
-        # If the lower wick is two times bigger than the spread and the upper wick - Hammer candle
-        if (self.__lower_wick > (self.__spread * Candle.CONFIG_HAMMER_LOWER_WICK_X_TIMES_BIGGER_THAN_SPREAD)
-                and self.__lower_wick > (self.__upper_wick *
-                                         Candle.CONFIG_HAMMER_LOWER_WICK_X_TIMES_BIGGER_THAN_UPPER_WICK)):
-            self.__hammer = True
-
-        # If both the lower wick and the higher wick are double the spread - long-legged Doji
-        if (self.__upper_wick > self.__spread * Candle.CONFIG_LLD_BOTH_WICKS_X_TIMES_BIGGER_THAN_SPREAD
-                and self.__lower_wick > self.__spread * Candle.CONFIG_LLD_BOTH_WICKS_X_TIMES_BIGGER_THAN_SPREAD):
-            self.__lld = True
-            # If it's a lld then probably shouldn't also be marked as a Hammer or Shooting star!
-            self.__shooting_star = False
-            self.__hammer = False
+        self.__row = np.array([candle_record(time, volume, candle_open, high, low, close)], dtype=CANDLE_DTYPE)[0]
+
+    @classmethod
+    def view(cls, row):
+        # A Candle backed by an existing CANDLE_DTYPE row (e.g. in a CandleBuffer) - changes go straight to the row
+        candle = cls.__new__(cls)
+        candle.__row = row
+        return candle
 
     def __str__(self) -> str:
-        if self.__up_bar:
+        if self.up_bar:
             bar_type = "up_bar"
         else:
             bar_type = "down_bar"
 
         patterns = ""
-        if self.__shooting_star:
+        if self.shooting_star:
             patterns += ":Shooting Star:"
-        if self.__hammer:
+        if self.hammer:
             patterns += ":Hammer:"
-        if self.__lld:
+        if self.lld:
             patterns += ":Long Legged Doji:"
 
         return ("Candle {} is an {} opened at {} and closed at {}. High was {}. Low was {}. Spread was {}. Volume was {}. "
                 "Upper Wick was {}. Lower Wick was {}. Pattern was {}.  Spread Percentiles: {}:{}:{}, Volume Percentiles: {}:{}:{}").format(
-            self.__time,
+            self.time,
             bar_type,
-            self.__open,
-            self.__close,
-            self.__high,
-            self.__low,
+            self.open,
+            self.close,
+            self.high,
+            self.low,
             self.spread,
             self.volume,
-            self.__upper_wick,
-            self.__lower_wick,
+            self.__row["upper_wick"],
+            self.__row["lower_wick"],
             patterns,
-            self.__spread_percentiles.get("period_one"),
-            self.__spread_percentiles.get("period_two"),
-            self.__spread_percentiles.get("period_three"),
-            self.__volume_percentiles.get("period_one"),
-            self.__volume_percentiles.get("period_two"),
-            self.__volume_percentiles.get("period_three"))
+            self.spread_percentiles.get("period_one"),
+            self.spread_percentiles.get("period_two"),
+            self.spread_percentiles.get("period_three"),
+            self.volume_percentiles.get("period_one"),
+            self.volume_percentiles.get("period_two"),
+            self.volume_percentiles.get("period_three"))
 
     def is_candle_pattern(self):
-        if self.__shooting_star or self.__hammer or self.__lld:
+        if self.shooting_star or self.hammer or self.lld:
             return True
         else:
             return False
 
     @property
     def shooting_star(self):
-        return self.__shooting_star
+        return self.__row["shooting_star"]
 
     @property
     def hammer(self):
-        return self.__hammer
+        return self.__row["hammer"]
 
     @property
     def lld(self):
-        return self.__lld
+        return self.__row["lld"]
 
     @property
     def volume(self):
-        return self.__volume
+        return self.__row["volume"]
 
     @property
     def high(self):
-        return self.__high
+        return self.__row["high"]
 
     @property
     def low(self):
-        return self.__low
+        return self.__row["low"]
 
     @property
     def open(self):
-        return self.__open
+        return self.__row["open"]
 
     @property
     def close(self):
-        return self.__close
+        return self.__row["close"]
 
     @property
     def up_bar(self):
-        return self.__up_bar
+        return self.__row["up_bar"]
 
     @property
     def spread(self):
-        return self.__spread
+        return self.__row["spread"]
 
     @property
     def spread_percentiles(self):
-        return self.__spread_percentiles
+        return PercentileView(self.__row, "spread")
 
     @spread_percentiles.setter
     def spread_percentiles(self, value):
-        self.__spread_percentiles = value
+        for period in PERIODS:
+            self.__row[f"spread_percentile_{period}"] = value.get(period, np.nan)
 
     @property
     def volume_percentiles(self):
-        return self.__volume_percentiles
+        return PercentileView(self.__row, "volume")
 
     @property
     def time(self):
-        return self.__time
+        return self.__row["time"]
 
     @volume_percentiles.setter
     def volume_percentiles(self, value):
-        self.__volume_percentiles = value
-        if self.__spread_percentiles is not None:
-            for key in self.__volume_percentiles.keys():
-                self.__anomaly[key] = self.__volume_percentiles[key] - self.spread_percentiles[key]
+        for period in PERIODS:
+            self.__row[f"volume_percentile_{period}"] = value.get(period, np.nan)
+
+DEBUG_LOG_BATCH_SIZE = 500
+
+
+def _write_log_batches(log_queue, log_file, echo, batch_size=DEBUG_LOG_BATCH_SIZE):
+    # DebugLog writer thread - drain whatever is queued (up to batch_size messages) and write it in one go,
+    # until the None sent by DebugLog.close()
+    while True:
+        batch = [log_queue.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        lines = "".join(f"{timestamp.strftime('%Y-%m-%d %H:%M:%S')} - {level} - {message}\n"
+                        for timestamp, level, message in filter(None, batch))
+        if lines:
+            log_file.write(lines)
+            log_file.flush()
+            if echo:
+                sys.stdout.write(lines)
+                sys.stdout.flush()
+        for _ in batch:
+            log_queue.task_done()
+        if None in batch:
+            return
+
 
 class DebugLog:
+    # Log messages go to vpa/log/<file_prefix>_<date>.txt and stdout. Messages below the level are dropped before
+    # they are formatted - pass a format string and arguments ("{} percentiles: {}", key, values) or a callable and
+    # they are only turned into a string when the message will be written. Writing is done in batches by a
+    # background thread fed through a bounded queue, so a log call does not wait on the file or the console.
     LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+    QUEUE_SIZE = 10000
 
-    def __init__(self, level="DEBUG", file_prefix="debug_log"):
+    # One logger per file prefix for DebugLog.shared()
+    __shared = {}
+    __shared_lock = threading.Lock()
+    # Open loggers, flushed and closed at exit
+    __open = weakref.WeakSet()
+
+    def __init__(self, level="DEBUG", file_prefix="debug_log", echo=True, queue_size=QUEUE_SIZE):
         self.level = self.LEVELS.get(level, 10)
+        self.echo = echo
         absolute_path = os.path.dirname(__file__)
         relative_path = "log/"
         full_path = os.path.join(absolute_path, relative_path)
+        os.makedirs(full_path, exist_ok=True)
 
         # Get the current date and time
         current_time = datetime.now().strftime("%Y%m%d")
@@ -291,13 +565,75 @@ class DebugLog:
         self.log_file = open(os.path.join(full_path, log_filename), "a")
         print("Writing log messages to: ", self.log_file.name)
 
-    def log(self, message, level="DEBUG"):
-        if self.LEVELS.get(level, 10) >= self.level:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_message = f"{timestamp} - {level} - {message}"
-            self.log_file.write(log_message + "\n")
-            self.log_file.flush()
-            print(log_message)
+        self.__queue_size = queue_size
+        self.__closed = False
+        self.__start_writer()
+        DebugLog.__open.add(self)
+
+    @classmethod
+    def shared(cls, level="DEBUG", file_prefix="debug_log"):
+        # The logger for a file prefix, created on first use, so many analyzers (e.g. a scan) write to one file
+        # through one writer thread. The level of an existing logger is lowered if a more verbose one is asked for.
+        with cls.__shared_lock:
+            logger = cls.__shared.get(file_prefix)
+            if logger is None or logger.closed:
+                logger = cls(level=level, file_prefix=file_prefix)
+                cls.__shared[file_prefix] = logger
+            logger.level = min(logger.level, cls.LEVELS.get(level, 10))
+            return logger
 
-    def __del__(self):
+    @property
+    def closed(self):
+        return self.__closed
+
+    def __start_writer(self):
+        # Also used after a fork - a forked process gets a copy of the queue but not the thread that drains it
+        self.__pid = os.getpid()
+        self.__queue = queue.Queue(maxsize=self.__queue_size)
+        # The thread is not given self so an unused logger can still be garbage collected (and closed)
+        self.__writer = threading.Thread(target=_write_log_batches, args=(self.__queue, self.log_file, self.echo),
+                                         name="DebugLog writer", daemon=True)
+        self.__writer.start()
+
+    def is_enabled(self, level):
+        return self.LEVELS.get(level, 10) >= self.level
+
+    def log(self, message, *args, level="DEBUG"):
+        if self.LEVELS.get(level, 10) < self.level or self.__closed:
+            return
+        if callable(message):
+            message = message()
+        elif args:
+            message = message.format(*args)
+        if self.__pid != os.getpid():
+            self.__start_writer()
+        # The text is built now, the arguments may change once we return (e.g. a Candle view of a buffer row)
+        self.__queue.put((datetime.now(), level, str(message)))
+
+    def flush(self):
+        # Wait until everything logged so far has been written
+        if not self.__closed and self.__pid == os.getpid():
+            self.__queue.join()
+
+    def close(self):
+        if self.__closed:
+            return
+        self.__closed = True
+        if self.__pid == os.getpid():
+            self.__queue.put(None)
+            self.__writer.join()
         self.log_file.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    @classmethod
+    def close_all(cls):
+        for logger in list(cls.__open):
+            logger.close()
+
+
+atexit.register(DebugLog.close_all)
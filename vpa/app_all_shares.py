@@ -1,61 +1,68 @@
 import os
-from vpa.app_runner import MarketAnalyzer
-import pandas as pd
+import json
 from datetime import datetime
-
-tickers = []
-
-# Open the file in read mode
-
-absolute_path = os.path.dirname(__file__)
-relative_path = "data/"
-full_path = os.path.join(absolute_path, relative_path)
-
-with open(os.path.join(full_path, 'SP500-tickers.csv'), 'r') as file:
-    # Read each line in the file
-    for line in file:
-        # Process the line (e.g., print it)
-        tickers.append(line.strip().replace(".", "-"))
-
-print(tickers)
-
-# Create an empty dataframe with the specified columns
-df = pd.DataFrame(columns=['ticker', 'signal_score'])
-
-for ticker in tickers:
-    analyzer = MarketAnalyzer(config_path="config/config.json", ticker_symbol=ticker, log_level="ERROR")
-    signal_score = analyzer.process_data()
-
-    new_row = {'ticker': ticker, 'signal_score': round(signal_score, 1)}
-    df.loc[len(df)] = new_row
-
-print(df)
-
-# Sort the dataframe by signal_score in descending order
-df_sorted = df.sort_values(by='signal_score', ascending=False)
-
-absolute_path = os.path.dirname(__file__)
-relative_path = "log/"
-full_path = os.path.join(absolute_path, relative_path)
-# Get the current date and time
-current_time = datetime.now().strftime("%Y%m%d")
-log_filename = f"share_output_{current_time}.txt"
-
-log_file = open(os.path.join(full_path, log_filename), "a")
-
-# Print the top five rows
-log_file.write("\nTop 5 rows:\n")
-log_file.write(df_sorted.head(5).to_string())
-
-# Print the bottom five rows
-log_file.write("\nBottom 5 rows:\n")
-log_file.write(df_sorted.tail(5).to_string())
-
-log_file.flush()
-log_file.close()
-
-
-
-
-
-
+from vpa.scanner import COMBINED, load_universes, scan_universes, write_report
+from vpa.cache import configured_provider
+from vpa.metrics import ScanMetrics, metrics_format, write_metrics
+from vpa.charts import ChartRenderer, chart_settings, chart_tickers, render_scan_charts
+from vpa.data_provider import history_window
+from vpa.checkpoint import configured_checkpoint_dir
+
+if __name__ == "__main__":
+    absolute_path = os.path.dirname(__file__)
+    relative_path = "data/"
+    full_path = os.path.join(absolute_path, relative_path)
+
+    with open("config/config.json", 'r') as file:
+        config = json.load(file)
+
+    # Every ticker list in the "universes" section is scanned in this one run (only the S&P 500 without it)
+    universes = load_universes(config.get("universes", {"SP500": {"file": "SP500-tickers.csv"}}), full_path)
+    for name, tickers in universes.items():
+        print(name, tickers)
+
+    relative_path = "log/"
+    log_path = os.path.join(absolute_path, relative_path)
+
+    # The data is downloaded in batches (only the days not already in the local cache), then each ticker is
+    # analysed on a pool of worker processes ("scan_workers" in the config, 0 = one per CPU)
+    provider = configured_provider(config)
+    # Stage timings per ticker and for the whole scan, when enabled in the config or with VPA_METRICS
+    metrics = ScanMetrics() if metrics_format(config) is not None else None
+    # Each score is appended to log/scan_results_<date>/<universe>/ as it arrives and only the top and bottom rows
+    # are kept in memory for the report (vpa.results.read_results reads a whole universe back)
+    results_path = os.path.join(log_path, f"scan_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    # Enough rows are kept for the report and for the charts of the top and bottom tickers
+    settings = chart_settings(config)
+    # Tickers listed twice are only analysed once, and "max_workers" caps how many of a universe's tickers are in the
+    # pool at once. With "scan_panel" every ticker is scored together in this process instead (see vpa/panel.py).
+    # With "checkpoints" enabled each ticker carries on from yesterday's checkpoint and only the new bars are added.
+    sinks = scan_universes(universes, config_path="config/config.json", rows=max(5, settings["scan_rows"]),
+                           results_dir=results_path, log_level="ERROR", provider=provider, metrics=metrics,
+                           panel=config.get("scan_panel", False),
+                           checkpoint_dir=configured_checkpoint_dir(config, absolute_path),
+                           source_limits={name: universe.get("max_workers", 0)
+                                          for name, universe in config.get("universes", {}).items()})
+    if hasattr(provider, "cache"):
+        print(f"Data cache: {provider.cache.stats()}")
+
+    for name, sink in sinks.items():
+        print(name, f"- {sink.count} tickers scored")
+        print(sink.ranked())
+    for failure in sinks[COMBINED].failures:
+        print(f"Failed: {failure['ticker']} - {failure['error']}")
+    print(f"Results in {results_path}")
+
+    # A section per universe, then the combined ranking with the failed tickers
+    for name in universes:
+        write_report(sinks[name].ranked(), [], log_path, title=name)
+    df_sorted = sinks[COMBINED].ranked()
+    write_report(df_sorted, sinks[COMBINED].failures, log_path, title="All universes")
+
+    # Charts of only the tickers in the report, drawn in the background. Their data is already in the local cache.
+    if settings["enabled"] and settings["scan_rows"] > 0:
+        frames = provider.fetch(chart_tickers(df_sorted, settings["scan_rows"]), *history_window())
+        with ChartRenderer(settings["workers"]) as chart_renderer:
+            render_scan_charts(df_sorted, frames, config, log_path, chart_renderer)
+    if metrics is not None:
+        print("Metrics written to", write_metrics(metrics, log_path, metrics_format(config), name="scan"))
@@ -1,6 +1,6 @@
 import time
 from vpa.app_runner import MarketAnalyzer
-import pandas as pd
+from vpa.forexsb import read_forexsb_tail
 import time
 import json
 from selenium import webdriver
@@ -80,18 +80,17 @@ else:
 
 recent_files.sort(key=lambda f: os.path.getmtime(os.path.join(downloads_folder, f)), reverse=True)
 
-my_df = pd.read_csv(os.path.join(downloads_folder, recent_files[0]), sep="\t", index_col=False).tail(51)
+# Only the last 51 rows are needed, so only the end of the file is read
+my_df = read_forexsb_tail(os.path.join(downloads_folder, recent_files[0]), 51)
 os.remove(os.path.join(downloads_folder, recent_files[0]))
 
-my_df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-my_df['Date'] = pd.to_datetime(my_df['Date'])
-
 print(my_df.head(5))
 
 analyzer = MarketAnalyzer(config_path="config/config.json", log_level="INFO", fixed_df=my_df, ticker_symbol="GBPUSD", log_prefix="GBPUSD")
 trade_signal = analyzer.process_data()
 
 analyzer.graph_intervals()
+analyzer.write_metrics()
 
 if trade_signal >= 15:
     analyzer.log("BUY Recommendation")
@@ -1,30 +1,69 @@
 import os
+import copy
 import json
-from collections import deque
 import numpy as np
-import yfinance as yf
-import datetime
-from vpa.app import DebugLog, Candle, calculate_adx, identify_acc_or_dist
-import pandas as pd
-import mplfinance as mpf
-
-#Passing a ticker_symbol will load data from yfinance. Passing a dataframe will directly use that dataframe
+from vpa.app import PERIODS, DebugLog, ADXState
+from vpa.candle_buffer import CandleBuffer
+from vpa.vectorized import compute_signals
+from vpa.rolling import RollingPercentile
+from vpa.signal_table import SIGNAL_TABLE_DTYPE, signal_record, signal_labels, table_from_signals
+from vpa.rule_plan import (ACC_DIST_VOLUME_PERCENTILE, ACC_DIST_LOW_PRICE_PERCENTILE, ACC_DIST_HIGH_PRICE_PERCENTILE,
+                           RulePlan, acc_or_dist)
+from vpa.metrics import StageMetrics, metrics_format, write_metrics
+from vpa.charts import ChartRenderer, chart_settings, render_charts, window_frame
+from vpa.checkpoint import (checkpoint_path, checkpoint_settings, configured_checkpoint_dir, continues_from,
+                            load_checkpoint, newer_rows, prices_changed, save_checkpoint)
+
+#Passing a ticker_symbol will load data from yfinance (or the data_provider given). Passing a dataframe will directly use that dataframe
+#Passing a logger (e.g. DebugLog.shared()) writes to that log instead of opening a new one
+#Passing a config dict (in the config.json layout) uses it instead of reading config_path
+#Passing metrics (a vpa.metrics.StageMetrics) collects the stage timings there, otherwise the config decides
 class MarketAnalyzer:
-    def __init__(self, config_path, ticker_symbol=None, log_level="INFO", fixed_df=None, log_prefix="debug_log"):
+    def __init__(self, config_path, ticker_symbol=None, log_level="INFO", fixed_df=None, log_prefix="debug_log",
+                 data_provider=None, logger=None, config=None, metrics=None):
         # Load configuration from the JSON file
         self.__ticker_symbol = ticker_symbol
         self.__config = None
-        self.load_config(config_path)
-        self.__logger = DebugLog(level=log_level, file_prefix=log_prefix)
-        # Set up rolling windows for different periods
-        self.__deque_dictionary = {
-            "period_one": deque(maxlen=self.__config["PERIOD_ONE_LENGTH"]),
-            "period_two": deque(maxlen=self.__config["PERIOD_TWO_LENGTH"]),
-            "period_three": deque(maxlen=self.__config["PERIOD_THREE_LENGTH"])
-        }
+        if config is not None:
+            self.__config = copy.deepcopy(config)
+        else:
+            self.load_config(config_path)
+        # The configured provider is only built when data is downloaded (see load_data)
+        self.__data_provider = data_provider
+        # Time spent per stage and counters, only recorded when enabled (see vpa/metrics.py)
+        self.__metrics = metrics if metrics is not None else StageMetrics(
+            enabled=metrics_format(self.__config) is not None)
+        # A logger can be passed in to share one log file (and writer thread) between many analyzers
+        self.__logger = logger if logger is not None else DebugLog(level=log_level, file_prefix=log_prefix)
+        # Set up rolling windows for different periods - every window is a view of the newest rows of one buffer
+        self.__candles = CandleBuffer({
+            "period_one": self.__config["PERIOD_ONE_LENGTH"],
+            "period_two": self.__config["PERIOD_TWO_LENGTH"],
+            "period_three": self.__config["PERIOD_THREE_LENGTH"]
+        })
         # Template variable for storing the current percentile numbers for "spread" and "volume"
         self.__percentiles_store = {"spread": {}, "volume": {}}
+        # Sorted copies of the spread and volume in each rolling window, so percentiles are updated incrementally
+        self.__rolling_percentiles = {
+            prop: {
+                key: RollingPercentile(length, self.__config["PERCENTILE_START"],
+                                       self.__config["PERCENTILE_INCREMENTS"],
+                                       mode=self.__config.get("PERCENTILE_MODE", "bucketed"))
+                for key, length in self.__candles.period_lengths.items()
+            }
+            for prop in ["spread", "volume"]
+        }
+        # ADX over the period_three window, updated as each candle arrives
+        self.__adx_state = ADXState(self.__config["PERIOD_THREE_LENGTH"])
+        # Sorted period_three closes for the accumulation/distribution price levels
+        self.__rolling_closes = RollingPercentile(self.__config["PERIOD_THREE_LENGTH"])
+        # The signal rules with the thresholds from the config, compiled once
+        self.__rule_plan = RulePlan(self.__config)
         self.__rolling_window_complete_msg_display = self.__config["rolling_window_complete_msg_display"]
+        # Scores and flags of every bar scored by the last process_data run (see vpa/signal_table.py)
+        self.__signal_table = np.zeros(0, dtype=SIGNAL_TABLE_DTYPE)
+        # Close of the last bar added, which is the open of the next one
+        self.__previous_close = 0
 
         if fixed_df is None:
             # Load data from the Yahoo Finance module or CSV file
@@ -48,23 +87,29 @@ class MarketAnalyzer:
                 ticker_symbol = self.__config["ticker_symbol"]
             else:
                 ticker_symbol = self.__ticker_symbol
-            # Get the current date
-            end_date = datetime.datetime.now().date()
-            # Get the date one year ago from today
-            start_date = end_date - datetime.timedelta(days=100)
-            # Fetch the data for the last year
-            self.myDF = yf.download(ticker_symbol, start=start_date, end=end_date, auto_adjust=True, progress=False)
-            self.myDF = self.myDF.reset_index()
-            self.myDF.columns = ['Date', 'Close', 'High', 'Low', 'Open', 'Volume']
+            # Fetch the last 100 days of data. The providers (pandas, yfinance) are imported here rather than with
+            # this module, so analysing a frame that is handed in only needs NumPy.
+            from vpa.data_provider import history_window
+            from vpa.cache import configured_provider
+            if self.__data_provider is None:
+                self.__data_provider = configured_provider(self.__config)
+            start_date, end_date = history_window()
+            with self.__metrics.timer("download"):
+                self.myDF = self.__data_provider.fetch_one(ticker_symbol, start_date, end_date)
         else:
             absolute_path = os.path.dirname(__file__)
             relative_path = "data/"
             full_path = os.path.join(absolute_path, relative_path)
+            import pandas as pd
             self.myDF = pd.read_csv(full_path + "spy_data.csv")
         self.myDF = self.myDF.sort_values("Date", axis=0)
-        self.__logger.log(f"Data loaded: {self.myDF.shape} rows", level="INFO")
+        self.__logger.log("Data loaded: {} rows", self.myDF.shape, level="INFO")
 
     def process_data(self):
+        with self.__metrics.timer("process_data"):
+            return self.__process_data()
+
+    def __process_data(self):
         # Step 2: Loop around each item in the data frame
 
         trade_signal = 0
@@ -72,296 +117,299 @@ class MarketAnalyzer:
         # Get the last index
         last_index = self.myDF.index[-1]
 
-        previous_close = 0
+        self.__previous_close = 0
+
+        # One row per scored bar, at most one per row of the frame
+        signal_table = np.zeros(len(self.myDF), dtype=SIGNAL_TABLE_DTYPE)
+        signal_count = 0
 
         for index, row in self.myDF.iterrows():
             if not self.__config["use_real_data"] and 0 < self.__config["MAX_ROWS"] <= index:
                 break
-            self.__logger.log(f"Processing row: {index}", level="DEBUG")
-            # Step 3: Create a new Candle object with the supplied properties for each new row
-
-            if previous_close != 0:
-                open_price = previous_close
-            else:
-                open_price = row['Open']
-
-            # Adjust high and low if needed
-            high = max(row['High'], open_price)
-            low = min(row['Low'], open_price)
-
-            this_candle = Candle(row['Date'], row['Volume'], open_price, high, low, row['Close'])
-            previous_close = this_candle.close
-
-            self.__logger.log(f"New candle created: {this_candle}", level="DEBUG")
-            # Step 3.1: The candle is added to each of our rolling windows
-            for key in self.__deque_dictionary.keys():
-                self.__deque_dictionary[key].append(this_candle)
-            # Step 4: We keep going without further action until we have enough data for all our rolling windows
-            if len(self.__deque_dictionary["period_three"]) < self.__config["PERIOD_THREE_LENGTH"]:
+            self.__logger.log("Processing row: {}", index, level="DEBUG")
+            # Steps 3 to 5: Add the candle to the rolling windows
+            this_candle = self.add_candle(row['Date'], row['Open'], row['High'], row['Low'], row['Close'],
+                                          row['Volume'])
+            if this_candle is None:
                 continue
-            elif len(self.__deque_dictionary["period_three"]) == self.__config["PERIOD_THREE_LENGTH"]:
-                if self.__rolling_window_complete_msg_display:
-                    self.__logger.log("We now have enough data for all our rolling windows", level="INFO")
-                    self.__rolling_window_complete_msg_display = False
-            # Step 5: Update the spread and volumetric percentiles to understand the relative size and strength of each Candle
-            self.update_percentiles()
 
             if index == last_index:
                 self.__logger.log("==================================================================================", level="INFO")
                 self.__logger.log(self.myDF.head(5), level="DEBUG")
                 self.__logger.log(self.myDF.tail(5), level="DEBUG")
 
-                for key in self.__deque_dictionary.keys():
-                    initial_close = self.__deque_dictionary[key][0].close
-                    final_close = self.__deque_dictionary[key][-1].close
+                for key in self.__candles.period_lengths.keys():
+                    initial_close = self.__candles.window(key)["close"][0]
+                    final_close = self.__candles.window(key)["close"][-1]
                     percentage_change = ((final_close - initial_close) / initial_close) * 100
-                    self.__logger.log(f"{key} initial close: {initial_close}", level="DEBUG")
-                    self.__logger.log(f"{key} final close: {final_close}", level="DEBUG")
-                    self.__logger.log(f"{key} change: {percentage_change:.2f}%", level="INFO")
+                    self.__logger.log("{} initial close: {}", key, initial_close, level="DEBUG")
+                    self.__logger.log("{} final close: {}", key, final_close, level="DEBUG")
+                    self.__logger.log("{} change: {:.2f}%", key, percentage_change, level="INFO")
 
             # Step 6: Detect signals based on the updated data
-            signals = self.detect_signals(this_candle)
-            self.__logger.log(f"signals: {signals}", level="INFO")
-            trade_signal = signals["single_candle_signal_score"] + signals["trend_signal_score"] + signals["multiple_bar_signal_score"] + signals["acc_dist_signal_score"]
+            signals = self.score_candle(this_candle)
+            trade_signal = signals["trade_signal"]
+            signal_table[signal_count] = signal_record(this_candle.time, signals)
+            signal_count += 1
+            self.__metrics.count("bars_scored")
+
+        self.__signal_table = signal_table[:signal_count]
+        return trade_signal
+
+    def on_bar(self, time, open_price, high, low, close, volume):
+        # Streaming use: add one new bar after the history (e.g. after process_data has warmed the windows up) and
+        # score it. Only the rolling windows are updated, so each bar takes the same time however many came before.
+        # Returns the signals of the bar with its "time" and "trade_signal", or None until the windows are full.
+        with self.__metrics.timer("on_bar"):
+            this_candle = self.add_candle(time, open_price, high, low, close, volume)
+            if this_candle is None:
+                return None
+            self.__metrics.count("bars_scored")
+            return self.score_candle(this_candle)
+
+    def add_candle(self, time, open_price, high, low, close, volume):
+        # Step 3: Create a new Candle with the supplied properties, opening at the previous close (unless that was zero)
+        if self.__previous_close != 0:
+            open_price = self.__previous_close
+
+        # Adjust high and low if needed
+        high = max(high, open_price)
+        low = min(low, open_price)
+
+        with self.__metrics.timer("candles"):
+            this_candle = self.__candles.append(time, volume, open_price, high, low, close)
+        self.__previous_close = this_candle.close
+        self.__metrics.count("bars")
+
+        self.__logger.log("New candle created: {}", this_candle, level="DEBUG")
+        # Step 3.1: The candle is added to each of our rolling windows
+        with self.__metrics.timer("percentiles"):
+            for key in self.__candles.period_lengths.keys():
+                self.__rolling_percentiles["spread"][key].push(this_candle.spread)
+                self.__rolling_percentiles["volume"][key].push(this_candle.volume)
+            self.__rolling_closes.push(this_candle.close)
+        with self.__metrics.timer("adx"):
+            self.__adx_state.update(this_candle)
+        # Step 4: We keep going without further action until we have enough data for all our rolling windows
+        if not self.__candles.is_full("period_three"):
+            return None
+        if self.__rolling_window_complete_msg_display:
+            self.__logger.log("We now have enough data for all our rolling windows", level="INFO")
+            self.__rolling_window_complete_msg_display = False
+        # Step 5: Update the spread and volumetric percentiles to understand the relative size and strength of each Candle
+        with self.__metrics.timer("percentiles"):
+            self.update_percentiles()
+        return this_candle
+
+    def score_candle(self, this_candle):
+        # Step 6: Detect the signals of the newest candle and add them up into the trade signal
+        signals = self.detect_signals(this_candle)
+        trade_signal = signals["single_candle_signal_score"] + signals["trend_signal_score"] + signals["multiple_bar_signal_score"] + signals["acc_dist_signal_score"]
+        with self.__metrics.timer("logging"):
+            self.__logger.log(lambda: f"signals: {dict(signals, **signal_labels(signals['flags']))}", level="INFO")
             direction = "BUY" if trade_signal > 0 else "SELL"
-            self.__logger.log(f"{this_candle.time} - trade_signal: {direction} : {trade_signal}", level="INFO")
+            self.__logger.log("{} - trade_signal: {} : {}", this_candle.time, direction, trade_signal, level="INFO")
+        signals["time"] = this_candle.time
+        signals["trade_signal"] = trade_signal
+        return signals
+
+    def process_new_data(self, checkpoint_path):
+        # Warm restart: restore the windows from the checkpoint (see vpa/checkpoint.py) and only add the bars that are
+        # newer than it, rather than replaying the whole history. Without a usable checkpoint every bar is processed
+        # as in process_data, as is a frame that starts after the checkpoint (the bars in between would be missing) or
+        # whose prices for the checkpoint's bars have since changed. Either way the checkpoint is then updated.
+        # Returns the trade_signal of the last bar.
+        checkpoint = load_checkpoint(checkpoint_path, self.__config)
+        if checkpoint is not None and len(self.myDF) > 0:
+            if not continues_from(self.myDF, checkpoint["last_time"]):
+                self.__logger.log("{} ends at {} but the data starts later, processing all bars", checkpoint_path,
+                                  checkpoint["last_time"], level="WARN")
+                checkpoint = None
+            elif prices_changed(self.myDF, checkpoint):
+                self.__logger.log("The prices of the bars in {} have changed, processing all bars", checkpoint_path,
+                                  level="WARN")
+                checkpoint = None
+        if checkpoint is None or len(self.myDF) == 0:
+            trade_signal = self.process_data()
+        else:
+            self.set_state(checkpoint)
+            trade_signal = checkpoint["trade_signal"]
+            new_rows = newer_rows(self.myDF, checkpoint["last_time"])
+            self.__logger.log("Restored {} at {}, {} new bars", checkpoint_path, checkpoint["last_time"], len(new_rows),
+                              level="INFO")
+            if len(new_rows) == 0:
+                return trade_signal
+            for row in new_rows.itertuples():
+                signals = self.on_bar(row.Date, row.Open, row.High, row.Low, row.Close, row.Volume)
+                if signals is not None:
+                    trade_signal = signals["trade_signal"]
+        save_checkpoint(checkpoint_path, self.state(), trade_signal, self.myDF["Date"].iloc[-1])
+        return trade_signal
+
+    def state(self):
+        # What the rolling windows have built up so far - enough to carry on with the next bar after set_state
+        candles = self.__candles.state()
+        return {
+            "settings": checkpoint_settings(self.__config),
+            "rows": candles["rows"],
+            "count": candles["count"],
+            "previous_close": self.__previous_close,
+            "adx": self.__adx_state.state()
+        }
 
+    def set_state(self, state):
+        if state["settings"] != checkpoint_settings(self.__config):
+            raise ValueError("The state was saved with different window or percentile settings")
+        self.__candles.restore(state["rows"], state["count"])
+        # The sorted windows hold the same values as the newest candles, so they are rebuilt from them
+        rows = state["rows"]
+        for key in self.__candles.period_lengths.keys():
+            self.__rolling_percentiles["spread"][key].reset(rows["spread"])
+            self.__rolling_percentiles["volume"][key].reset(rows["volume"])
+        self.__rolling_closes.reset(rows["close"])
+        self.__adx_state.restore(state["adx"])
+        self.__previous_close = state["previous_close"]
+        if self.__candles.is_full("period_three"):
+            self.__rolling_window_complete_msg_display = False
+
+    def process_data_vectorized(self):
+        # Alternative to process_data: every bar is scored at once with NumPy arrays (see vpa/vectorized.py).
+        # Returns the same final trade_signal as process_data without building Candles or logging each bar.
+        with self.__metrics.timer("process_data_vectorized"):
+            signals = compute_signals(self.myDF, self.__config)
+            self.__signal_table = table_from_signals(signals)
+        self.__metrics.count("bars", len(self.myDF))
+        self.__metrics.count("bars_scored", len(signals["trade_signal"]))
+        if len(signals["trade_signal"]) == 0:
+            return 0
+        trade_signal = signals["trade_signal"][-1]
+        direction = "BUY" if trade_signal > 0 else "SELL"
+        self.__logger.log("{} - trade_signal: {} : {}", signals['time'][-1], direction, trade_signal, level="INFO")
         return trade_signal
 
+    def signal_table(self):
+        # Per-bar scores and flags from the last process_data or process_data_vectorized run, as a structured array
+        # with the fields of SIGNAL_TABLE_DTYPE. vpa.signal_table.signal_frame turns it into a DataFrame.
+        return self.__signal_table
+
+    def metrics(self):
+        # Stage timings and counters of this analyzer (see vpa/metrics.py). Empty unless metrics are enabled.
+        return self.__metrics
+
+    def write_metrics(self, log_dir="log"):
+        # Export the metrics in the configured format (JSON or Prometheus text) to log_dir. Returns the file written,
+        # or None when metrics are off.
+        output_format = metrics_format(self.__config)
+        if output_format is None or not self.__metrics.enabled:
+            return None
+        return write_metrics(self.__metrics, log_dir, output_format, name=self.__ticker_symbol or "vpa")
 
     def update_percentiles(self):
         # Step 5.1: Working out the Percentiles for each Period for the spread and volume
+        # The rolling windows keep their values sorted, so each percentile step is read directly from them
         props = ["spread", "volume"]
         for prop in props:
-            for key in self.__deque_dictionary.keys():
-                stats_list = [getattr(item, prop) for item in self.__deque_dictionary[key]]
-                self.__percentiles_store[prop][key] = np.percentile(stats_list, range(self.__config["PERCENTILE_START"], 100, self.__config["PERCENTILE_INCREMENTS"]))
-                self.__logger.log(f"{prop} percentiles for {key}: {self.__percentiles_store[prop][key]}", level="DEBUG")
-        # Step 5.2: Update all Candles in our rolling windows with their relevant percentiles
-        for key in self.__deque_dictionary.keys():
-            for candle in self.__deque_dictionary[key]:
-                for prop in props:
-                    upper_percentile = self.__config["PERCENTILE_START"]
-                    for step in self.__percentiles_store[prop][key]:
-                        if getattr(candle, prop) <= step:
-                            upper_percentile += self.__config["PERCENTILE_INCREMENTS"]
-                    if prop == "spread":
-                        candle.spread_percentiles[key] = upper_percentile
-                    elif prop == "volume":
-                        candle.volume_percentiles[key] = upper_percentile
-                self.__logger.log(f"Updated candle: {candle}", level="DEBUG")
+            for key in self.__candles.period_lengths.keys():
+                self.__percentiles_store[prop][key] = self.__rolling_percentiles[prop][key].steps()
+                self.__logger.log("{} percentiles for {}: {}", prop, key, self.__percentiles_store[prop][key],
+                                  level="DEBUG")
+        # Step 5.2: Update all Candles in our rolling windows with their relevant percentiles - one array assignment
+        # per window and property. Every row is ranked again as the rules count the rows of each window whose spread
+        # and volume percentiles are far apart, but that is one binary search per row against the sorted steps.
+        for key in self.__candles.period_lengths.keys():
+            window = self.__candles.window(key)
+            for prop in props:
+                window[f"{prop}_percentile_{key}"] = self.__rolling_percentiles[prop][key].ranks(window[prop])
+        self.__logger.log("Updated candle: {}", self.__candles.latest(), level="DEBUG")
 
     def detect_signals(self, this_candle):
-
-        all_signals = {}
-
-        single_candle_signals = []
-        single_candle_signal_score = 0
-
-        #Is the candle up or down? - score 1
-        single_candle_signals.append("Up Bar" if this_candle.up_bar else "Down Bar")
-        single_candle_signal_score += 1 if this_candle.up_bar else -1
-
-        # Check for wide spread and high volume for each period, and adjust the score accordingly
-        for period in self.__deque_dictionary.keys():
-            if this_candle.spread_percentiles[period] > 70:
-                single_candle_signals.append(f"Wide Spread ({period})")
-                # Adjust score by 2.5 if up bar, otherwise subtract 2.5
-                single_candle_signal_score += 2.5 if this_candle.up_bar else -2.5
-                # Check for high volume if wide spread condition is met
-                if this_candle.volume_percentiles[period] > 70:
-                    single_candle_signals.append(f"High Volume ({period})")
-                    # Adjust score by 2.5 if up bar, otherwise subtract 2.5
-                    single_candle_signal_score += 2.5 if this_candle.up_bar else -2.5
-
-        if this_candle.shooting_star:
-            single_candle_signals.append("Shooting Star")
-            single_candle_signal_score -= 3
-        elif this_candle.hammer:
-            single_candle_signals.append("Hammer")
-            single_candle_signal_score += 3
-
-        # Log the results
-        self.__logger.log(f"Single Candle Signals: {single_candle_signals}", level="INFO")
-        self.__logger.log(f"Single Candle Signal Score: {single_candle_signal_score}", level="INFO")
-
-        all_signals["single_candle_signals"] = single_candle_signals
-        all_signals["single_candle_signal_score"] = single_candle_signal_score
-
-        trend_signals = []
-        trend_signal_score = 0
+        # Score the newest candle with the rules compiled from the config (see vpa/rule_plan.py). The signal labels
+        # are only made from the flags when they are logged.
+        plan = self.__rule_plan
 
         # Step 6: Understand if the market is trending and if so, in what direction
-        adx_values = calculate_adx(self.__deque_dictionary["period_three"])
-        self.__logger.log(f"{this_candle.time} - ADX values: {adx_values}", level="INFO")
-        self.__logger.log(f"ADX - over 25 is trending.  Average True Range - Higher is more volatile.  DM+ swings upward. DM- Swings downwards", level="INFO")
-        trending = adx_values[0] > 25
-        trending_up = adx_values[2] > adx_values[3]
-        trending_down = adx_values[3] > adx_values[2]
-        if trending:
-            self.__logger.log("Market is trending", level="INFO")
-            trend_signals.append("Market is trending")
-            if trending_up:
-                self.__logger.log("Market is trending up", level="INFO")
-                trend_signals.append("Trending Up")
-                trend_signal_score += 5
-            if trending_down:
-                self.__logger.log("Market is trending down", level="INFO")
-                trend_signals.append("Trending Down")
-                trend_signal_score -= 5
-
-        # Log the results
-        self.__logger.log(f"Trend Signals: {trend_signals}", level="INFO")
-        self.__logger.log(f"Trend Signal Score: {trend_signal_score}", level="INFO")
-
-        all_signals["trend_signals"] = trend_signals
-        all_signals["trend_signal_score"] = trend_signal_score
-
-        # Step 7: Count the relevant candle types in each time period
-        bar_counts = {}
-        signals = {
-            "period_one_bull": False,
-            "period_one_bear": False,
-            "period_one_volume_backed": False,
-            "period_two_bull": False,
-            "period_two_bear": False,
-            "period_two_volume_backed": False,
-            "period_three_bull": False,
-            "period_three_bear": False,
-            "period_three_volume_backed": False,
-        }
-        for key in self.__deque_dictionary.keys():
-            up_bar_count = sum(1 for candle in self.__deque_dictionary[key] if candle.up_bar)
-            high_spread_count = sum(1 for candle in self.__deque_dictionary[key] if candle.spread_percentiles[key] > self.__config["trading_parameters"][key]["High_Spread_Threshold"])
-            high_volume_count = sum(1 for candle in self.__deque_dictionary[key] if candle.volume_percentiles[key] > self.__config["trading_parameters"][key]["High_Volume_Threshold"])
-            anomaly_count = sum(1 for candle in self.__deque_dictionary[key] if abs(candle.spread_percentiles[key] - candle.volume_percentiles[key]) > self.__config["trading_parameters"][key]["Anomaly_Threshold"])
-            bar_counts[key] = {
-                "up_bars": up_bar_count,
-                "high_spread_count": high_spread_count,
-                "high_volume_count": high_volume_count,
-                "anomaly_count": anomaly_count
-            }
-            self.__logger.log(f"{key} Bar Counts: {bar_counts[key]}", level="DEBUG")
-            # Step 8: Decide whether a signal is being generated on each time period
-            if up_bar_count >= self.__config["trading_parameters"][key]["Signal_Bar_Count"]:
-                signals[f"{key}_bull"] = True
-                self.__logger.log(f"{key} Bullish Signal", level="INFO")
-            elif up_bar_count <= (self.__config["PERIOD_ONE_LENGTH"] - self.__config["trading_parameters"][key]["Signal_Bar_Count"]):
-                signals[f"{key}_bear"] = True
-                self.__logger.log(f"{key} Bearish Signal", level="INFO")
-            if signals[f"{key}_bear"] or signals[f"{key}_bull"]:
-                if high_spread_count >= self.__config["trading_parameters"][key]["High_Spread_Count"] and high_volume_count >= self.__config["trading_parameters"][key]["High_Volume_Count"] and anomaly_count <= self.__config["trading_parameters"][key]["Anomaly_Threshold"]:
-                    signals[f"{key}_volume_backed"] = True
-                    self.__logger.log(f"{this_candle.time} {key} Volume Backed Signal", level="INFO")
-
-        # Initialize multiple bar signals and score
-        multiple_bar_signals = []
-        multiple_bar_signal_score = 0
-
-        # Check for bull and bear signals for each period, and adjust the score accordingly
-        for period in self.__deque_dictionary.keys():
-            for signal_type in ["bull", "bear"]:
-                if signals[f"{period}_{signal_type}"]:
-                    multiple_bar_signals.append(f"{signal_type.capitalize()} Signal ({period})")
-                    score_adjustment = 2.5 if signal_type == "bull" else -2.5
-                    if signals[f"{period}_volume_backed"]:
-                        multiple_bar_signal_score += score_adjustment * 2
-                        multiple_bar_signals.append(f"Volume Backed ({period})")
-                    else:
-                        multiple_bar_signal_score += score_adjustment
+        with self.__metrics.timer("adx"):
+            adx_values = self.__adx_state.values()
+        with self.__metrics.timer("logging"):
+            self.__logger.log("{} - ADX values: {}", this_candle.time, adx_values, level="INFO")
+            self.__logger.log("ADX - over 25 is trending.  Average True Range - Higher is more volatile.  DM+ swings upward. DM- Swings downwards", level="INFO")
+
+        with self.__metrics.timer("signals"):
+            up_bar = self.__candles.window(plan.longest_period)["up_bar"]
+            spread_percentiles = self.__candles.percentiles("spread")
+            volume_percentiles = self.__candles.percentiles("volume")
+
+            # Step 7: Count the relevant candle types in each time period
+            if self.__logger.is_enabled("DEBUG"):
+                for key, up_bars, high_spread_count, high_volume_count, anomaly_count in zip(
+                        PERIODS, *plan.bar_counts(up_bar, spread_percentiles, volume_percentiles)):
+                    self.__logger.log("{} Bar Counts: {}", key, {"up_bars": int(up_bars),
+                                                                 "high_spread_count": int(high_spread_count),
+                                                                 "high_volume_count": int(high_volume_count),
+                                                                 "anomaly_count": int(anomaly_count)}, level="DEBUG")
+
+            # Step 9: Identify if the market is near accumulation or distribution points - the percentiles come from
+            # the sorted period_three windows
+            acc_or_dist_signal = acc_or_dist(self.__candles.window("period_one")["volume"], this_candle.close,
+                                             self.__rolling_percentiles["volume"]["period_three"].quantile(
+                                                 ACC_DIST_VOLUME_PERCENTILE / 100),
+                                             self.__rolling_closes.quantile(ACC_DIST_LOW_PRICE_PERCENTILE / 100),
+                                             self.__rolling_closes.quantile(ACC_DIST_HIGH_PRICE_PERCENTILE / 100))
+
+            # Steps 5, 6, 8 and 9: Score the single candle, trend, multiple bar and accumulation/distribution signals
+            all_signals = plan.score(up_bar, spread_percentiles, volume_percentiles, this_candle.shooting_star,
+                                     this_candle.hammer, this_candle.lld, adx_values, acc_or_dist_signal)
 
         # Log the results
-        self.__logger.log(f"Multiple Bar Signals: {multiple_bar_signals}", level="INFO")
-        self.__logger.log(f"Multiple Bar Signal Score: {multiple_bar_signal_score}", level="INFO")
-
-        all_signals["multiple_bar_signals"] = multiple_bar_signals
-        all_signals["multiple_bar_signal_score"] = multiple_bar_signal_score
-
-
-        # Initialize accumulation/distribution signals and score
-        acc_dist_signals = []
-        acc_dist_signal_score = 0
-
-        # Step 9: Identify if the market is near accumulation or distribution points
-        acc_or_dist_bool, acc_or_dist = identify_acc_or_dist(self.__deque_dictionary["period_three"], self.__deque_dictionary["period_one"])
-        if acc_or_dist_bool:
-            acc_dist_signals.append(f"Possible {acc_or_dist}")
-            acc_dist_signal_score += 10 if acc_or_dist == "Acc" else -10
-            self.__logger.log(f"{this_candle.time} Possible {acc_or_dist} IDENTIFIED #####", level="INFO")
-            if this_candle.spread_percentiles['period_one'] > 65 or this_candle.is_candle_pattern():
-                self.__logger.log(f"Potential Test IDENTIFIED ##########", level="DEBUG")
-                if this_candle.volume_percentiles['period_one'] < 50:
-                    acc_dist_signals.append("Test Pass")
-                    acc_dist_signal_score += 5 if acc_or_dist == "Acc" else -5
-                    self.__logger.log(f"Potential TEST PASS IDENTIFIED ##########", level="INFO")
-                else:
-                    acc_dist_signals.append("Test Fail")
-                    # Test fail makes the signal weaker
-                    acc_dist_signal_score -= 2 if acc_or_dist == "Acc" else 2
-                    self.__logger.log("Potential TEST FAIL IDENTIFIED ##########", level="INFO")
-            if this_candle.spread_percentiles['period_two'] < 40 and this_candle.volume_percentiles['period_two'] > 60:
-                acc_dist_signals.append("Climax")
-                acc_dist_signal_score += 10 if acc_or_dist == "Acc" else -10
-                self.__logger.log(f"Potential Climax IDENTIFIED ##########", level="INFO")
-
-        # Log the results
-        self.__logger.log(f"Accumulation/Distribution Signals: {acc_dist_signals}", level="INFO")
-        self.__logger.log(f"Accumulation/Distribution Signal Score: {acc_dist_signal_score}", level="INFO")
-
-        all_signals["acc_dist_signals"] = acc_dist_signals
-        all_signals["acc_dist_signal_score"] = acc_dist_signal_score
+        if self.__logger.is_enabled("INFO"):
+            with self.__metrics.timer("logging"):
+                labels = signal_labels(all_signals["flags"])
+                if acc_or_dist_signal:
+                    self.__logger.log("{} Possible {} IDENTIFIED #####", this_candle.time, acc_or_dist_signal,
+                                      level="INFO")
+                for name, title in [("single_candle", "Single Candle"), ("trend", "Trend"),
+                                    ("multiple_bar", "Multiple Bar"), ("acc_dist", "Accumulation/Distribution")]:
+                    self.__logger.log("{} Signals: {}", title, labels[f"{name}_signals"], level="INFO")
+                    self.__logger.log("{} Signal Score: {}", title, all_signals[f"{name}_signal_score"],
+                                      level="INFO")
         return all_signals
 
-    def graph_intervals(self):
-        for period, candles in self.__deque_dictionary.items():
-            if not candles:
-                continue
+    def graph_intervals(self, renderer=None):
+        # Candlestick chart and CSV of each period window in log/ (see vpa/charts.py), when "charts" are enabled in
+        # the config. Drawn here and the files returned, or with a ChartRenderer drawn in the background and a future
+        # of the files returned.
+        if not chart_settings(self.__config)["enabled"]:
+            return []
+        with self.__metrics.timer("charts"):
+            frames = {period: window_frame(self.__candles.window(period))
+                      for period in self.__candles.period_lengths.keys()}
+            self.__metrics.count("charts", sum(len(df) > 0 for df in frames.values()))
+            if renderer is not None:
+                return renderer.submit(self.__ticker_symbol, frames, "log")
+            return render_charts(self.__ticker_symbol, frames, "log")
 
-            # Convert to DataFrame
-            data = {
-                'Date': [candle.time for candle in candles],
-                'Open': [candle.open for candle in candles],
-                'High': [candle.high for candle in candles],
-                'Low': [candle.low for candle in candles],
-                'Close': [candle.close for candle in candles],
-                'Volume': [candle.volume for candle in candles]  # Include volume
-            }
-            df = pd.DataFrame(data)
-            df.set_index('Date', inplace=True)
-
-            # Save chart to file
-            chart_filename = f"log/{self.__ticker_symbol}_{period}_candlestick.png"
-            mpf.plot(
-                df,
-                type='candle',
-                style='charles',
-                title=f'{self.__ticker_symbol} - {period} - Candlestick Chart',
-                ylabel='Price',
-                volume=True,
-                tight_layout=True,
-                datetime_format='%Y-%m-%d',
-                xrotation=90,
-                savefig=chart_filename
-            )
-
-            # Save raw data to CSV
-            csv_filename = f"log/{self.__ticker_symbol}_{period}_data.csv"
-            # Save raw data to CSV with 2 decimal places
-            df.round(1).to_csv(csv_filename)
-
-    def log(self, log_message):
-        self.__logger.log(log_message, level="INFO")
+    def log(self, log_message, *args):
+        self.__logger.log(log_message, *args, level="INFO")
 
 
 if __name__ == "__main__":
     analyzer = MarketAnalyzer(config_path="config/config.json", ticker_symbol="SPY", log_prefix="SPY")
-    trade_signal = analyzer.process_data()
+    # With "checkpoints" enabled in the config only the bars since the last run are added
+    with open("config/config.json", 'r') as file:
+        checkpoint_dir = configured_checkpoint_dir(json.load(file), os.path.dirname(__file__))
+    if checkpoint_dir is None:
+        trade_signal = analyzer.process_data()
+    else:
+        trade_signal = analyzer.process_new_data(checkpoint_path(checkpoint_dir, "SPY"))
 
-    analyzer.graph_intervals()
+    # The charts are drawn in the background while the recommendation is logged
+    with ChartRenderer(workers=1) as chart_renderer:
+        analyzer.graph_intervals(chart_renderer)
 
-    if trade_signal >= 15:
-        analyzer.log("BUY Recommendation")
-    elif trade_signal <= -15:
-        analyzer.log("SELL Recommendation")
-    else:
-        analyzer.log("DO NOT TRADE")
\ No newline at end of file
+        if trade_signal >= 15:
+            analyzer.log("BUY Recommendation")
+        elif trade_signal <= -15:
+            analyzer.log("SELL Recommendation")
+        else:
+            analyzer.log("DO NOT TRADE")
+    analyzer.write_metrics()
\ No newline at end of file
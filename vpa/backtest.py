@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+from vpa.execution import trade_size
+from vpa.vectorized import candle_arrays, compute_signals, rows_to_process
+
+# Trades the per-bar trade_signal of a ticker: BUY at or above the buy threshold, SELL at or below the sell threshold
+# (the same +/-15 as app_runner), with each position sized by execution.trade_size from the cash at entry and a stop
+# a multiple of the average true range away. A position is held until the opposite signal, where it is reversed, or
+# until its stop is hit, after which the next signal in either direction opens a new one.
+#
+# Only the trades are stepped through in Python. Finding the next exit of a trade, the equity curve and the
+# statistics are array operations over the bars, so thousands of bars take milliseconds.
+
+BACKTEST_DEFAULTS = {
+    "initial_cash": 30000,
+    "buy_threshold": 15,
+    "sell_threshold": -15,
+    "risk_per_trade_theory": 0.01,
+    "risk_per_trade_exposure_max": 0.1,
+    "stop_atr_multiple": 2,
+    "atr_length": 14
+}
+
+TRADE_COLUMNS = ["entry_time", "exit_time", "direction", "size", "entry_price", "exit_price", "pnl", "bars_held",
+                 "exit_reason"]
+
+
+def backtest_settings(config):
+    # The "backtest" section of the config over the defaults
+    return {**BACKTEST_DEFAULTS, **config.get("backtest", {})}
+
+
+def average_true_range(high, low, close, length):
+    # Simple moving average of the true range. The first bars average what there is so far.
+    previous_close = np.concatenate(([close[0]], close[:-1]))
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous_close), np.abs(low - previous_close)))
+    total = np.cumsum(true_range)
+    average = total / np.arange(1, len(total) + 1)
+    average[length:] = (total[length:] - total[:-length]) / length
+    return average
+
+
+def backtest(df, config, signals=None):
+    # Backtest a price frame with the config's signal rules and "backtest" settings. signals can be the trade_signal
+    # series already worked out for the frame (e.g. MarketAnalyzer.signal_table()), otherwise it is computed with
+    # the vectorized engine.
+    if signals is None:
+        signals = compute_signals(df, config)
+    df = rows_to_process(df, config)
+    candles = candle_arrays(df)
+    atr = average_true_range(candles["high"], candles["low"], candles["close"],
+                             backtest_settings(config)["atr_length"])
+    # The signals are for the last bars of the frame
+    first = len(candles["close"]) - len(signals["trade_signal"])
+    prices = {name: candles[name][first:] for name in ["time", "high", "low", "close"]}
+    # The candles open at the previous close, so stops are filled against the bar's real open to catch gaps
+    prices["open"] = df["Open"].to_numpy(dtype=float)[first:]
+    return run_backtest(prices, np.asarray(signals["trade_signal"], dtype=float), atr[first:], config)
+
+
+def run_backtest(prices, trade_signal, atr, config):
+    # prices holds time/open/high/low/close arrays aligned with trade_signal and atr.
+    # Returns the equity curve, drawdown and position per bar, a DataFrame of trades and a dict of statistics.
+    settings = backtest_settings(config)
+    close, high, low, candle_open = prices["close"], prices["high"], prices["low"], prices["open"]
+    bar_count = len(close)
+    direction = np.where(trade_signal >= settings["buy_threshold"], 1,
+                         np.where(trade_signal <= settings["sell_threshold"], -1, 0))
+    signal_bars = np.flatnonzero(direction)
+    buy_bars = np.flatnonzero(direction > 0)
+    sell_bars = np.flatnonzero(direction < 0)
+
+    position = np.zeros(bar_count)
+    entry_prices = np.zeros(bar_count)
+    realized = np.zeros(bar_count)
+    trades = []
+    cash = settings["initial_cash"]
+    next_signal = 0
+    while next_signal < len(signal_bars):
+        entry = signal_bars[next_signal]
+        if entry == bar_count - 1:
+            break
+        side = direction[entry]
+        stop_distance = settings["stop_atr_multiple"] * atr[entry]
+        if stop_distance <= 0:
+            next_signal += 1
+            continue
+        size = trade_size(cash, settings["risk_per_trade_theory"], settings["risk_per_trade_exposure_max"],
+                          close[entry], stop_distance)
+        stop_price = close[entry] - side * stop_distance
+
+        # Held until the next opposite signal (or the last bar), unless the stop is hit first
+        opposite_bars = sell_bars if side > 0 else buy_bars
+        opposite = np.searchsorted(opposite_bars, entry, side="right")
+        last = opposite_bars[opposite] if opposite < len(opposite_bars) else bar_count - 1
+        if side > 0:
+            stop_hits = low[entry + 1:last + 1] <= stop_price
+        else:
+            stop_hits = high[entry + 1:last + 1] >= stop_price
+        if stop_hits.any():
+            exit_bar = entry + 1 + int(np.argmax(stop_hits))
+            # A bar that gaps through the stop fills at its open
+            exit_price = min(candle_open[exit_bar], stop_price) if side > 0 else max(candle_open[exit_bar], stop_price)
+            exit_reason = "stop"
+        else:
+            exit_bar = last
+            exit_price = close[exit_bar]
+            exit_reason = "signal" if opposite < len(opposite_bars) else "end"
+
+        pnl = side * size * (exit_price - close[entry])
+        cash += pnl
+        position[entry:exit_bar] = side * size
+        entry_prices[entry:exit_bar] = close[entry]
+        realized[exit_bar] += pnl
+        trades.append((prices["time"][entry], prices["time"][exit_bar], int(side), size, close[entry], exit_price, pnl,
+                       exit_bar - entry, exit_reason))
+        if exit_reason == "end":
+            break
+        # A reversal enters on the exit bar itself. After a stop the next signal from the exit bar's close is taken.
+        next_signal = np.searchsorted(signal_bars, exit_bar, side="left")
+
+    equity = settings["initial_cash"] + np.cumsum(realized) + position * (close - entry_prices)
+    drawdown = equity / np.maximum.accumulate(equity) - 1 if bar_count else np.zeros(0)
+    trades = pd.DataFrame(trades, columns=TRADE_COLUMNS)
+    return {
+        "time": prices["time"],
+        "equity": equity,
+        "drawdown": drawdown,
+        "position": position,
+        "trades": trades,
+        "stats": trade_statistics(equity, drawdown, position, trades, settings["initial_cash"])
+    }
+
+
+def trade_statistics(equity, drawdown, position, trades, initial_cash):
+    pnl = trades["pnl"].to_numpy()
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = -pnl[pnl < 0].sum()
+    final_equity = equity[-1] if len(equity) else initial_cash
+    return {
+        "final_equity": float(final_equity),
+        "total_return": float(final_equity / initial_cash - 1),
+        "max_drawdown": float(drawdown.min()) if len(drawdown) else 0.0,
+        "trades": int(len(pnl)),
+        "long_trades": int((trades["direction"] > 0).sum()),
+        "short_trades": int((trades["direction"] < 0).sum()),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else 0.0,
+        "average_pnl": float(pnl.mean()) if len(pnl) else 0.0,
+        "profit_factor": float(gross_profit / gross_loss) if gross_loss > 0 else float("inf") if gross_profit > 0 else 0.0,
+        "average_bars_held": float(trades["bars_held"].mean()) if len(pnl) else 0.0,
+        "exposure": float((position != 0).mean()) if len(position) else 0.0
+    }
@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from vpa.app import DebugLog, ADXState, calculate_adx, identify_acc_or_dist
+from vpa.app_runner import MarketAnalyzer
+from vpa.candle_buffer import CandleBuffer
+from vpa.forexsb import read_forexsb_csv
+from vpa.panel import panel_scores
+
+# Benchmarks of the VPA and option pricing hot paths on the data files in vpa/data, so they run offline:
+#   python -m vpa.benchmark                              run everything and write log/benchmark_<time>.json
+#   python -m vpa.benchmark --filter price_option        only the benchmarks with "price_option" in their name
+#   python -m vpa.benchmark --save-baseline base.json    run and keep the results as the baseline
+#   python -m vpa.benchmark --baseline base.json         run and flag benchmarks slower than the baseline
+#
+# Each benchmark is a setup function returning the callable to time. The setup runs again before every repeat, so
+# work that changes state (process_data fills the analyzer's windows) starts from the same point each time, and the
+# callable is called `number` times per repeat for the ones too quick to time singly. Times are seconds per call.
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config", "config.json")
+REGRESSION_THRESHOLD = 0.2
+
+
+def _config():
+    with open(CONFIG_PATH, 'r') as file:
+        return json.load(file)
+
+
+def _spy_data():
+    return pd.read_csv(os.path.join(DATA_DIR, "spy_data.csv")).sort_values("Date", axis=0)
+
+
+def _gbpusd_data():
+    return read_forexsb_csv(os.path.join(DATA_DIR, "GBPUSD_D1.csv"))
+
+
+def _analyzer(df):
+    return MarketAnalyzer(config_path=None, ticker_symbol="benchmark", fixed_df=df, config=_config(),
+                          logger=DebugLog.shared(level="ERROR", file_prefix="benchmark"))
+
+
+def _windows(df):
+    # Candle windows of the last rows of a frame, for the functions that take lists of candles
+    config = _config()
+    candles = CandleBuffer({
+        "period_one": config["PERIOD_ONE_LENGTH"],
+        "period_two": config["PERIOD_TWO_LENGTH"],
+        "period_three": config["PERIOD_THREE_LENGTH"]
+    })
+    for row in df.tail(config["PERIOD_THREE_LENGTH"]).itertuples():
+        candles.append(row.Date, row.Volume, row.Open, row.High, row.Low, row.Close)
+    return {key: candles.candles(key) for key in candles.period_lengths}
+
+
+def _process_data(load):
+    return _analyzer(load()).process_data
+
+
+def _process_data_vectorized(load):
+    return _analyzer(load()).process_data_vectorized
+
+
+def _panel_scores(tickers):
+    # Scoring a universe of `tickers` frames (different slices of the SPY history) in one panel
+    df = _spy_data().reset_index(drop=True)
+    frames = {f"T{i}": df.iloc[i % 150:i % 150 + 100] for i in range(tickers)}
+    config = _config()
+    return lambda: panel_scores(frames, config)
+
+
+def _on_bar():
+    # One bar through a warmed up analyzer, i.e. adding the candle, update_percentiles and detect_signals
+    df = _spy_data()
+    analyzer = _analyzer(df)
+    analyzer.process_data()
+    rows = iter(df.itertuples())
+
+    def run():
+        row = next(rows)
+        analyzer.on_bar(row.Date, row.Open, row.High, row.Low, row.Close, row.Volume)
+    return run
+
+
+def _update_percentiles():
+    # Percentiles and ranks of every window after a new candle
+    df = _spy_data()
+    analyzer = _analyzer(df)
+    analyzer.process_data()
+    rows = iter(df.itertuples())
+
+    def run():
+        row = next(rows)
+        analyzer.add_candle(row.Date, row.Open, row.High, row.Low, row.Close, row.Volume)
+    return run
+
+
+def _calculate_adx():
+    period_three = _windows(_spy_data())["period_three"]
+    return lambda: calculate_adx(period_three)
+
+
+def _adx_state():
+    period_three = _windows(_spy_data())["period_three"]
+    state = ADXState(len(period_three))
+    for candle in period_three:
+        state.update(candle)
+    candles = iter(period_three * 1000)
+
+    def run():
+        state.update(next(candles))
+        state.values()
+    return run
+
+
+def _identify_acc_or_dist():
+    windows = _windows(_spy_data())
+    return lambda: identify_acc_or_dist(windows["period_three"], windows["period_one"])
+
+
+def _option_inputs(pricing_steps):
+    # The binomial trees for an AMERICAN call, built as options/price_calc.py builds them
+    from utils.utils import build_binomial_trees, calculate_binomial_parameters
+    current_stock_price, strike_price = 238.87, 175
+    up_branch_move, down_branch_move, factor_step_discount, up_branch_probability, down_branch_probability = \
+        calculate_binomial_parameters(0.32, 0.53 * 252, 252, pricing_steps, 0.045, 0.0042)
+    stock_price_tree, option_value_tree = build_binomial_trees(current_stock_price, strike_price, pricing_steps,
+                                                               up_branch_move, down_branch_move, "call")
+    return (stock_price_tree, option_value_tree, pricing_steps, up_branch_probability, down_branch_probability,
+            factor_step_discount, "call", strike_price, "AMERICAN")
+
+
+def _price_option(pricing_steps):
+    from utils.utils import price_option
+    inputs = _option_inputs(pricing_steps)
+    return lambda: price_option(*inputs)
+
+
+def _implied_volatility(pricing_steps):
+    from utils.utils import implied_volatility
+    return lambda: implied_volatility(69.2, "call", 238.87, 175, 0.53, 0.045, 0.0042, pricing_steps, "AMERICAN", 252)
+
+
+# name -> (setup, calls per repeat)
+BENCHMARKS = {
+    "process_data[spy_data]": (lambda: _process_data(_spy_data), 1),
+    "process_data[GBPUSD_D1]": (lambda: _process_data(_gbpusd_data), 1),
+    "process_data_vectorized[spy_data]": (lambda: _process_data_vectorized(_spy_data), 5),
+    "process_data_vectorized[GBPUSD_D1]": (lambda: _process_data_vectorized(_gbpusd_data), 1),
+    "panel_scores[500]": (lambda: _panel_scores(500), 1),
+    "on_bar[spy_data]": (_on_bar, 200),
+    "update_percentiles[spy_data]": (_update_percentiles, 200),
+    "calculate_adx[period_three]": (_calculate_adx, 200),
+    "adx_state[period_three]": (_adx_state, 1000),
+    "identify_acc_or_dist[period_three]": (_identify_acc_or_dist, 1000),
+    **{f"price_option[{steps}]": ((lambda steps=steps: _price_option(steps)), max(1, 20000 // steps ** 2))
+       for steps in [50, 100, 200, 500]},
+    **{f"implied_volatility[{steps}]": ((lambda steps=steps: _implied_volatility(steps)), 1)
+       for steps in [25, 50, 100]}
+}
+
+
+def time_benchmark(setup, number, repeat):
+    timings = []
+    for _ in range(repeat):
+        run = setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - start) / number)
+    timings = np.array(timings)
+    return {"median": float(np.median(timings)), "min": float(timings.min()), "mean": float(timings.mean()),
+            "repeat": repeat, "number": number}
+
+
+def run_benchmarks(names=None, repeat=5):
+    names = list(BENCHMARKS) if names is None else names
+    return {
+        "meta": {
+            "time": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform()
+        },
+        "results": {name: time_benchmark(*BENCHMARKS[name], repeat) for name in names}
+    }
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    # Median time per benchmark against the baseline. More than `threshold` slower is a regression, more than
+    # `threshold` faster an improvement. Returns a DataFrame with a row per benchmark in the results.
+    rows = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        ratio = result["median"] / base["median"] if base else np.nan
+        status = ("new" if base is None else "regression" if ratio > 1 + threshold
+                  else "improvement" if ratio < 1 - threshold else "ok")
+        rows.append({"benchmark": name, "baseline": base["median"] if base else np.nan, "current": result["median"],
+                     "ratio": ratio, "status": status})
+    return pd.DataFrame(rows, columns=["benchmark", "baseline", "current", "ratio", "status"])
+
+
+def write_benchmark_results(results, file_path):
+    with open(file_path + ".tmp", 'w') as file:
+        json.dump(results, file, indent=2)
+    os.replace(file_path + ".tmp", file_path)
+    return file_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the VPA and option pricing hot paths")
+    parser.add_argument("--filter", default=None, help="only run benchmarks with this in their name")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="JSON results file, by default log/benchmark_<time>.json")
+    parser.add_argument("--baseline", default=None, help="compare against this results file")
+    parser.add_argument("--save-baseline", default=None, help="also write the results to this baseline file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    selected = [name for name in BENCHMARKS if args.filter is None or args.filter in name]
+    benchmark_results = run_benchmarks(selected, args.repeat)
+    log_dir = os.path.join(os.path.dirname(__file__), "log")
+    os.makedirs(log_dir, exist_ok=True)
+    output = args.output or os.path.join(log_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    print("Results written to", write_benchmark_results(benchmark_results, output))
+    if args.save_baseline:
+        write_benchmark_results(benchmark_results, args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            comparison = compare(benchmark_results, json.load(file), args.threshold)
+        print(comparison.to_string(index=False))
+        # A non-zero exit code lets a CI job fail on a regression
+        sys.exit(1 if (comparison["status"] == "regression").any() else 0)
+    for name, result in benchmark_results["results"].items():
+        print(f"{name:40s} {result['median'] * 1000:12.4f} ms")
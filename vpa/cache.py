@@ -0,0 +1,247 @@
+import os
+import json
+import datetime
+import numpy as np
+import pandas as pd
+from vpa.data_provider import OHLCV_COLUMNS, DataProvider, YahooProvider
+
+# Local on-disk store of the OHLCV data that has already been downloaded. Each ticker/interval is one memory-mappable
+# NumPy file (<ticker>_<interval>.npy) plus a small JSON file recording which date range has been fetched, so a
+# daily run only has to ask the data provider for the days since the last run.
+
+CACHE_DTYPE = np.dtype([("Date", "datetime64[ns]"), ("Close", np.float64), ("High", np.float64), ("Low", np.float64),
+                        ("Open", np.float64), ("Volume", np.float64)])
+
+
+def _to_day(value):
+    return pd.Timestamp(value).date()
+
+
+def records_from_frame(df):
+    # DataFrame with the OHLCV columns -> CACHE_DTYPE array. Dates are stored as naive UTC.
+    dates = pd.to_datetime(df["Date"])
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    records = np.zeros(len(df), dtype=CACHE_DTYPE)
+    records["Date"] = dates.to_numpy(dtype="datetime64[ns]")
+    for column in OHLCV_COLUMNS[1:]:
+        records[column] = df[column].to_numpy(dtype=np.float64)
+    return records
+
+
+def frame_from_records(records, copy=True):
+    # CACHE_DTYPE array -> DataFrame. With copy=False the columns are read-only views of the records, so the frame is
+    # only usable while the memory behind them is (e.g. a shared memory block, see vpa/shared_data.py).
+    if copy:
+        return pd.DataFrame({column: np.array(records[column]) for column in OHLCV_COLUMNS})
+    columns = {}
+    for column in OHLCV_COLUMNS:
+        columns[column] = records[column].view()
+        columns[column].flags.writeable = False
+    return pd.DataFrame(columns, copy=False)
+
+
+def merge_records(existing, new):
+    # Combine and sort by date. Where both have a date the new row wins - the last bar may have been partial.
+    combined = np.concatenate([new, existing])
+    _, first = np.unique(combined["Date"], return_index=True)
+    return combined[first]
+
+
+class OHLCVCache:
+
+    def __init__(self, cache_dir, interval="1d"):
+        self.cache_dir = cache_dir
+        self.interval = interval
+        os.makedirs(cache_dir, exist_ok=True)
+        # Tickers served entirely from disk / tickers that needed a fetch
+        self.hits = 0
+        self.misses = 0
+
+    def __path(self, ticker, extension):
+        safe_ticker = ticker.replace(os.sep, "_").replace("/", "_")
+        return os.path.join(self.cache_dir, f"{safe_ticker}_{self.interval}.{extension}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def coverage(self, ticker):
+        # (start, end) of the date range fetched so far, end exclusive, or None if the ticker is not cached
+        meta_path = self.__path(ticker, "json")
+        if not os.path.exists(meta_path) or not os.path.exists(self.__path(ticker, "npy")):
+            return None
+        with open(meta_path, 'r') as file:
+            meta = json.load(file)
+        return _to_day(meta["start"]), _to_day(meta["end"])
+
+    def load(self, ticker, mmap_mode="r"):
+        if self.coverage(ticker) is None:
+            return None
+        return np.load(self.__path(ticker, "npy"), mmap_mode=mmap_mode)
+
+    def store(self, ticker, records, start_date, end_date):
+        # Written to temporary files first so a crash mid-write never leaves a half written cache entry
+        data_path = self.__path(ticker, "npy")
+        with open(data_path + ".tmp", 'wb') as file:
+            np.save(file, records)
+        os.replace(data_path + ".tmp", data_path)
+        self.__write_meta(ticker, start_date, end_date)
+
+    def __write_meta(self, ticker, start_date, end_date):
+        meta_path = self.__path(ticker, "json")
+        with open(meta_path + ".tmp", 'w') as file:
+            json.dump({"start": str(start_date), "end": str(end_date),
+                       "last_used": datetime.datetime.now().isoformat()}, file)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def missing_range(self, ticker, start_date, end_date):
+        # The range that has to be fetched to serve [start_date, end_date), or None if it is all on disk.
+        # A top-up starts from the bar before the last stored one, so that a bar fetched part way through the day is
+        # refreshed and at least one complete bar is fetched again for history_changed to compare.
+        start_date, end_date = _to_day(start_date), _to_day(end_date)
+        coverage = self.coverage(ticker)
+        if coverage is None:
+            return start_date, end_date
+        covered_start, covered_end = coverage
+        fetch_start, fetch_end = None, None
+        if start_date < covered_start:
+            fetch_start, fetch_end = start_date, covered_start
+        if end_date > covered_end:
+            records = self.load(ticker)
+            top_up_start = _to_day(records["Date"][max(len(records) - 2, 0)]) if len(records) else covered_end
+            fetch_start = top_up_start if fetch_start is None else fetch_start
+            fetch_end = end_date
+        if fetch_start is None:
+            return None
+        return fetch_start, fetch_end
+
+    def history_changed(self, ticker, df):
+        # Whether freshly fetched rows disagree with the stored copy of the same bars. Prices are adjusted for
+        # dividends and splits, so a corporate action rescales the whole history and the stored bars go stale. The
+        # last stored bar is left out as it may have been fetched part way through the day.
+        records = self.load(ticker)
+        if records is None or df is None or len(records) < 2:
+            return False
+        new = records_from_frame(df)
+        stored = records[:-1]
+        index = np.searchsorted(stored["Date"], new["Date"]).clip(max=len(stored) - 1)
+        overlap = stored["Date"][index] == new["Date"]
+        if not overlap.any():
+            return False
+        return not all(np.allclose(stored[column][index[overlap]], new[column][overlap], rtol=1e-6)
+                       for column in OHLCV_COLUMNS[1:5])
+
+    def remove(self, ticker):
+        for extension in ["npy", "json"]:
+            os.remove(self.__path(ticker, extension))
+
+    def update(self, ticker, df, start_date, end_date):
+        # Merge newly fetched rows into the cache and widen the recorded range
+        start_date, end_date = _to_day(start_date), _to_day(end_date)
+        coverage = self.coverage(ticker)
+        existing = self.load(ticker, mmap_mode=None)
+        new = records_from_frame(df) if df is not None else np.zeros(0, dtype=CACHE_DTYPE)
+        records = new if existing is None else merge_records(existing, new)
+        if coverage is not None:
+            start_date, end_date = min(start_date, coverage[0]), max(end_date, coverage[1])
+        self.store(ticker, records, start_date, end_date)
+
+    def read(self, ticker, start_date, end_date):
+        # Rows with start_date <= Date < end_date as a DataFrame in the OHLCV layout
+        records = self.load(ticker)
+        if records is None:
+            return None
+        # Reading counts as use for eviction
+        self.__write_meta(ticker, *self.coverage(ticker))
+        dates = records["Date"]
+        first = np.searchsorted(dates, np.datetime64(pd.Timestamp(_to_day(start_date))), side="left")
+        last = np.searchsorted(dates, np.datetime64(pd.Timestamp(_to_day(end_date))), side="left")
+        return frame_from_records(records[first:last])
+
+    def tickers(self):
+        suffix = f"_{self.interval}.json"
+        return sorted(name[:-len(suffix)] for name in os.listdir(self.cache_dir) if name.endswith(suffix))
+
+    def last_used(self, ticker):
+        with open(self.__path(ticker, "json"), 'r') as file:
+            return datetime.datetime.fromisoformat(json.load(file)["last_used"])
+
+    def evict(self, older_than_days=None, max_tickers=None):
+        # Remove tickers that have not been used for `older_than_days`, then the least recently used beyond
+        # `max_tickers`. Returns the tickers removed.
+        by_last_used = sorted(self.tickers(), key=self.last_used)
+        evicted = []
+        if older_than_days is not None:
+            cutoff = datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+            evicted += [ticker for ticker in by_last_used if self.last_used(ticker) < cutoff]
+        if max_tickers is not None:
+            remaining = [ticker for ticker in by_last_used if ticker not in evicted]
+            evicted += remaining[:max(len(remaining) - max_tickers, 0)]
+        for ticker in evicted:
+            self.remove(ticker)
+        return evicted
+
+    def compact(self, keep_days):
+        # Drop rows older than `keep_days` from every ticker so files stay the size of the history actually used
+        cutoff = datetime.datetime.now().date() - datetime.timedelta(days=keep_days)
+        for ticker in self.tickers():
+            covered_start, covered_end = self.coverage(ticker)
+            if covered_start >= cutoff:
+                continue
+            records = self.load(ticker, mmap_mode=None)
+            records = records[records["Date"] >= np.datetime64(pd.Timestamp(cutoff))]
+            self.store(ticker, records, cutoff, covered_end)
+
+
+def configured_provider(config):
+    # Yahoo Finance, served through the local cache when "data_cache_dir" is set in the config. A relative
+    # directory is relative to the vpa package, like the log/ and data/ directories.
+    cache_dir = config.get("data_cache_dir")
+    if not cache_dir:
+        return YahooProvider()
+    return CachedProvider(YahooProvider(), OHLCVCache(os.path.join(os.path.dirname(__file__), cache_dir)))
+
+
+class CachedProvider(DataProvider):
+    # Wraps another provider with an OHLCVCache. Only the date ranges that are not on disk are requested, and tickers
+    # missing the same range are fetched from the underlying provider in one batch.
+
+    def __init__(self, provider, cache):
+        self.provider = provider
+        self.cache = cache
+
+    def fetch(self, tickers, start_date, end_date):
+        to_fetch = {}
+        for ticker in tickers:
+            missing = self.cache.missing_range(ticker, start_date, end_date)
+            if missing is None:
+                self.cache.hits += 1
+            else:
+                self.cache.misses += 1
+                to_fetch.setdefault(missing, []).append(ticker)
+
+        # Tickers whose stored history no longer matches the provider's are dropped and fetched again in full
+        to_refetch = {}
+        for (fetch_start, fetch_end), batch in to_fetch.items():
+            frames = self.provider.fetch(batch, fetch_start, fetch_end)
+            for ticker in batch:
+                coverage = self.cache.coverage(ticker)
+                if coverage is not None and self.cache.history_changed(ticker, frames.get(ticker)):
+                    self.cache.remove(ticker)
+                    full_range = min(_to_day(start_date), coverage[0]), max(_to_day(end_date), coverage[1])
+                    to_refetch.setdefault(full_range, []).append(ticker)
+                elif ticker in frames or coverage is not None:
+                    self.cache.update(ticker, frames.get(ticker), fetch_start, fetch_end)
+
+        for (fetch_start, fetch_end), batch in to_refetch.items():
+            frames = self.provider.fetch(batch, fetch_start, fetch_end)
+            for ticker in batch:
+                if ticker in frames:
+                    self.cache.update(ticker, frames[ticker], fetch_start, fetch_end)
+
+        frames = {}
+        for ticker in tickers:
+            df = self.cache.read(ticker, start_date, end_date)
+            if df is not None and not df.empty:
+                frames[ticker] = df
+        return frames
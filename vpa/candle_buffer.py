@@ -0,0 +1,87 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from vpa.app import PERIODS, CANDLE_DTYPE, Candle, candle_record
+
+
+class CandleBuffer:
+    # The most recent candles for every rolling window held in one structured NumPy array (see CANDLE_DTYPE), in place
+    # of a Candle object per bar referenced from a deque per period. Each period window is a zero-copy view of the
+    # newest rows, so window statistics are single array operations on its columns.
+    #
+    # The array has room for twice the longest window. Rows are appended until it is full, then the newest rows are
+    # copied back to the start, so the windows are always contiguous and the copy happens once per window length.
+
+    def __init__(self, period_lengths):
+        self.__period_lengths = dict(period_lengths)
+        self.__length = max(self.__period_lengths.values())
+        self.__data = np.zeros(2 * self.__length, dtype=CANDLE_DTYPE)
+        self.__end = 0
+        self.__count = 0
+        # The spread_percentile_<period> (and volume) fields sit next to each other in CANDLE_DTYPE, so they can be
+        # read as one (rows, periods) float array without copying
+        self.__percentile_columns = {
+            prop: as_strided(self.__data[f"{prop}_percentile_{PERIODS[0]}"], shape=(len(self.__data), len(PERIODS)),
+                             strides=(CANDLE_DTYPE.itemsize, np.dtype(np.float64).itemsize), writeable=False)
+            for prop in ["spread", "volume"]
+        }
+
+    def __len__(self):
+        # Number of candles held, i.e. the size of the longest window so far
+        return min(self.__count, self.__length)
+
+    @property
+    def period_lengths(self):
+        return self.__period_lengths
+
+    @property
+    def count(self):
+        # Total number of candles appended
+        return self.__count
+
+    @property
+    def nbytes(self):
+        return self.__data.nbytes
+
+    def append(self, time, volume, candle_open, high, low, close):
+        if self.__end == len(self.__data):
+            keep = self.__length - 1
+            self.__data[:keep] = self.__data[self.__end - keep:self.__end]
+            self.__end = keep
+        self.__data[self.__end] = candle_record(time, volume, candle_open, high, low, close)
+        self.__end += 1
+        self.__count += 1
+        return self.latest()
+
+    def latest(self):
+        # The newest candle as a Candle view onto its row. Valid until the next append.
+        return Candle.view(self.__data[self.__end - 1])
+
+    def window(self, period):
+        # The rows currently in a period's rolling window, oldest first
+        size = min(self.__count, self.__period_lengths[period])
+        return self.__data[self.__end - size:self.__end]
+
+    def percentiles(self, prop):
+        # The "spread" or "volume" percentiles of the rows in the longest window, one column per period in PERIODS
+        # order. A column is only up to date for the rows inside that period's window.
+        size = min(self.__count, self.__length)
+        return self.__percentile_columns[prop][self.__end - size:self.__end]
+
+    def is_full(self, period):
+        return self.__count >= self.__period_lengths[period]
+
+    def state(self):
+        # The rows in the longest window (a copy) and the number of candles appended, for restore()
+        return {"rows": self.__data[self.__end - len(self):self.__end].copy(), "count": self.__count}
+
+    def restore(self, rows, count):
+        # Put back the rows and count from state(), in place of whatever the buffer holds
+        rows = rows[len(rows) - min(len(rows), self.__length):]
+        self.__data[:] = np.zeros(len(self.__data), dtype=CANDLE_DTYPE)
+        self.__data[:len(rows)] = rows
+        self.__end = len(rows)
+        self.__count = count
+
+    def candles(self, period):
+        # Candle views of the rows in a period window, for code that works on candle objects
+        return [Candle.view(row) for row in self.window(period)]
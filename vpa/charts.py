@@ -0,0 +1,143 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from vpa.vectorized import candle_arrays, rows_to_process
+
+# Candlestick charts of the rolling windows (a PNG and a CSV per period, in log/), as graph_intervals has always
+# drawn them. mplfinance (and with it matplotlib) is only imported when a chart is actually drawn, so runs that never
+# draw one - such as the scanner - do not pay for loading it. pandas is likewise imported by the functions that
+# build the frames, so importing this module (and app_runner with it) only needs NumPy.
+#
+# Drawing can be handed to a ChartRenderer, which draws in a background pool of processes while the caller carries
+# on, and a scan can draw just the tickers that made its top and bottom rows once it has finished. The "charts"
+# section of the config turns drawing on (it is off unless asked for) and sets the pool size and the number of scan
+# rows drawn.
+
+CHART_DEFAULTS = {
+    "enabled": False,
+    "workers": 2,
+    "scan_rows": 5
+}
+
+
+def chart_settings(config):
+    return {**CHART_DEFAULTS, **config.get("charts", {})}
+
+
+def chart_frames(df, config):
+    # The candles of each period window at the end of a price frame - the same rows (with the same open/high/low
+    # adjustments) the CandleBuffer of an analyzer holds after process_data
+    candles = candle_arrays(rows_to_process(df, config))
+    frames = {}
+    for key, length_key in [("period_one", "PERIOD_ONE_LENGTH"), ("period_two", "PERIOD_TWO_LENGTH"),
+                            ("period_three", "PERIOD_THREE_LENGTH")]:
+        rows = slice(max(len(candles["close"]) - config[length_key], 0), None)
+        frames[key] = window_frame({name: candles[name][rows] for name in candles})
+    return frames
+
+
+def window_frame(candles):
+    # Date indexed OHLCV frame of a window's columns (a CandleBuffer window or the arrays from candle_arrays)
+    import pandas as pd
+    df = pd.DataFrame({
+        'Date': candles['time'],
+        'Open': candles['open'],
+        'High': candles['high'],
+        'Low': candles['low'],
+        'Close': candles['close'],
+        'Volume': candles['volume']  # Include volume
+    })
+    df.set_index('Date', inplace=True)
+    return df
+
+
+def render_charts(ticker_symbol, frames, log_dir="log"):
+    # Draw and save each period's frame. Returns the files written.
+    import mplfinance as mpf
+    import pandas as pd
+    files = []
+    for period, df in frames.items():
+        if len(df) == 0:
+            continue
+        df = df.set_axis(pd.to_datetime(df.index))
+
+        # Save chart to file
+        chart_filename = os.path.join(log_dir, f"{ticker_symbol}_{period}_candlestick.png")
+        mpf.plot(
+            df,
+            type='candle',
+            style='charles',
+            title=f'{ticker_symbol} - {period} - Candlestick Chart',
+            ylabel='Price',
+            volume=True,
+            tight_layout=True,
+            datetime_format='%Y-%m-%d',
+            xrotation=90,
+            savefig=chart_filename
+        )
+
+        # Save raw data to CSV
+        csv_filename = os.path.join(log_dir, f"{ticker_symbol}_{period}_data.csv")
+        # Save raw data to CSV with 2 decimal places
+        df.round(1).to_csv(csv_filename)
+        files += [chart_filename, csv_filename]
+    return files
+
+
+def _init_chart_worker():
+    # The workers only ever write files
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+class ChartRenderer:
+    # Draws charts on a pool of worker processes, started on the first submit. submit() returns a future of the files
+    # written; wait() (or leaving a with block) waits for every chart submitted so far.
+
+    def __init__(self, workers=CHART_DEFAULTS["workers"]):
+        self.__workers = workers
+        self.__executor = None
+        self.__futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def submit(self, ticker_symbol, frames, log_dir="log"):
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.__workers, initializer=_init_chart_worker)
+        future = self.__executor.submit(render_charts, ticker_symbol, frames, log_dir)
+        self.__futures.append(future)
+        return future
+
+    def wait(self):
+        # Files written by every chart submitted, raising the first error a worker hit
+        futures, self.__futures = self.__futures, []
+        return [path for future in futures for path in future.result()]
+
+    def close(self):
+        try:
+            return self.wait()
+        finally:
+            if self.__executor is not None:
+                self.__executor.shutdown()
+                self.__executor = None
+
+
+def chart_tickers(df_sorted, rows):
+    # The tickers in the top and bottom `rows` of a sorted scan, as written by scanner.write_report
+    return list(dict.fromkeys(list(df_sorted["ticker"].head(rows)) + list(df_sorted["ticker"].tail(rows))))
+
+
+def render_scan_charts(df_sorted, frames, config, log_dir, renderer):
+    # Submit the charts of the top and bottom tickers of a scan. frames maps tickers to their price frames (e.g. from
+    # the scan's data provider). Returns the tickers submitted.
+    settings = chart_settings(config)
+    if not settings["enabled"]:
+        return []
+    tickers = [ticker for ticker in chart_tickers(df_sorted, settings["scan_rows"]) if ticker in frames]
+    for ticker in tickers:
+        renderer.submit(ticker, chart_frames(frames[ticker], config), log_dir)
+    return tickers
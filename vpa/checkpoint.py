@@ -0,0 +1,170 @@
+import os
+import json
+import numpy as np
+from vpa.app import CANDLE_DTYPE
+
+# Warm restarts of MarketAnalyzer. A checkpoint is what the analyzer has built up after its last bar - the candles in
+# its rolling windows (with their percentiles), the ADX smoothing state and the last close - in one small
+# compressed .npz per ticker (a few KB). The next run restores it and only adds the bars that are newer than the
+# checkpoint (see MarketAnalyzer.process_new_data), and a ticker with no new bars needs no analysis at all
+# (checkpoint_is_current). The sorted percentile windows are rebuilt from the candles, which is exact. Candle times are
+# stored as text and come back as the type they were saved as - a pandas Timestamp for any kind of date, else a str.
+#
+# A checkpoint is only used with the window and percentile settings it was made with; with any other settings (or a
+# checkpoint from an older version of this layout) the analyzer starts from scratch and the checkpoint is replaced.
+
+CHECKPOINT_VERSION = 2
+CHECKPOINT_SETTINGS = ["PERIOD_ONE_LENGTH", "PERIOD_TWO_LENGTH", "PERIOD_THREE_LENGTH", "PERCENTILE_START",
+                       "PERCENTILE_INCREMENTS", "PERCENTILE_MODE"]
+# The candle rows as stored - the time as text instead of an object
+STORED_CANDLE_DTYPE = np.dtype([(name, "U40" if name == "time" else CANDLE_DTYPE[name]) for name in CANDLE_DTYPE.names])
+ADX_MOVEMENTS = ["tr", "dm_plus", "dm_minus"]
+CHECKPOINT_DEFAULTS = {
+    "enabled": False,
+    "dir": "checkpoints/"
+}
+
+
+def configured_checkpoint_dir(config, base_dir):
+    # The "checkpoints" directory of the config (relative to base_dir), or None when checkpoints are off
+    settings = {**CHECKPOINT_DEFAULTS, **config.get("checkpoints", {})}
+    if not settings["enabled"]:
+        return None
+    return os.path.join(base_dir, settings["dir"])
+
+
+def checkpoint_path(checkpoint_dir, ticker_symbol):
+    return os.path.join(checkpoint_dir, f"{ticker_symbol}.npz")
+
+
+def checkpoint_settings(config):
+    return {key: config.get(key, "bucketed" if key == "PERCENTILE_MODE" else None) for key in CHECKPOINT_SETTINGS}
+
+
+def bar_time(value):
+    # A bar's date as comparable text - naive UTC, as the data cache stores dates - whatever type the frame held it as
+    import pandas as pd
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.isoformat()
+
+
+def _is_date(value):
+    import datetime
+    return isinstance(value, (datetime.date, np.datetime64))
+
+
+def _stored_time(value):
+    import pandas as pd
+    return pd.Timestamp(value).isoformat() if _is_date(value) else str(value)
+
+
+def save_checkpoint(path, state, trade_signal, last_time):
+    # state is MarketAnalyzer.state(); trade_signal and last_time are those of the last bar added
+    rows = np.zeros(len(state["rows"]), dtype=STORED_CANDLE_DTYPE)
+    for name in CANDLE_DTYPE.names:
+        rows[name] = [_stored_time(value) for value in state["rows"][name]] if name == "time" else state["rows"][name]
+    adx = state["adx"]
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "settings": state["settings"],
+        "count": state["count"],
+        "previous_close": float(state["previous_close"]),
+        "trade_signal": float(trade_signal),
+        "last_time": bar_time(last_time),
+        "time_type": "timestamp" if len(rows) and _is_date(state["rows"]["time"][0]) else "text",
+        "updates_since_resync": adx["updates_since_resync"]
+    }
+    arrays = {f"adx_{name}": np.asarray(adx["movements"][name], dtype=float) for name in ADX_MOVEMENTS}
+    arrays["adx_previous_candle"] = np.asarray(adx["previous_candle"] or [], dtype=float)
+    arrays["adx_sums"] = np.asarray([adx["sums"][name] for name in ADX_MOVEMENTS] if adx["sums"] else [], dtype=float)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Written next to the checkpoint and moved into place, so a crash never leaves half a checkpoint
+    temporary_path = path + ".tmp.npz"
+    np.savez_compressed(temporary_path, rows=rows, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(temporary_path, path)
+    return path
+
+
+def read_checkpoint_meta(path, config):
+    # The checkpoint's metadata, or None when there is no usable checkpoint for this config
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as checkpoint:
+        meta = json.loads(str(checkpoint["meta"]))
+    if meta.get("version") != CHECKPOINT_VERSION or meta.get("settings") != checkpoint_settings(config):
+        return None
+    return meta
+
+
+def load_checkpoint(path, config):
+    # The state to hand to MarketAnalyzer.set_state plus the checkpoint's "trade_signal" and "last_time", or None
+    meta = read_checkpoint_meta(path, config)
+    if meta is None:
+        return None
+    import pandas as pd
+    with np.load(path) as checkpoint:
+        stored = checkpoint["rows"]
+        rows = np.zeros(len(stored), dtype=CANDLE_DTYPE)
+        for name in CANDLE_DTYPE.names:
+            rows[name] = stored[name] if name != "time" else [
+                pd.Timestamp(str(value)) if meta["time_type"] == "timestamp" else str(value) for value in stored[name]]
+        sums = checkpoint["adx_sums"]
+        adx = {
+            "previous_candle": checkpoint["adx_previous_candle"].tolist() or None,
+            "movements": {name: checkpoint[f"adx_{name}"].tolist() for name in ADX_MOVEMENTS},
+            "sums": {name: sums[i].tolist() for i, name in enumerate(ADX_MOVEMENTS)} if len(sums) else None,
+            "updates_since_resync": meta["updates_since_resync"]
+        }
+    return {
+        "settings": meta["settings"],
+        "rows": rows,
+        "count": meta["count"],
+        "previous_close": meta["previous_close"],
+        "adx": adx,
+        "trade_signal": meta["trade_signal"],
+        "last_time": meta["last_time"]
+    }
+
+
+def _bar_dates(df):
+    # The frame's dates as naive UTC, as bar_time compares them
+    import pandas as pd
+    dates = pd.to_datetime(df["Date"])
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    return dates
+
+
+def newer_rows(df, last_time):
+    # The rows of a frame dated after last_time (a bar_time)
+    import pandas as pd
+    return df[(_bar_dates(df) > pd.Timestamp(last_time)).to_numpy()]
+
+
+def continues_from(df, last_time):
+    # Whether the frame picks up where the checkpoint left off, i.e. it has the checkpoint's last bar (or earlier
+    # ones) and no bars are missing in between. A frame starting after last_time cannot be added to the checkpoint.
+    import pandas as pd
+    return len(df) > 0 and _bar_dates(df.head(1)).iloc[0] <= pd.Timestamp(last_time)
+
+
+def prices_changed(df, checkpoint):
+    # Whether the frame has different closes for the bars in the checkpoint's windows. Prices are adjusted for
+    # dividends and splits, so a corporate action rescales the whole history and the restored windows go stale.
+    import pandas as pd
+    rows = checkpoint["rows"]
+    if len(rows) == 0 or len(df) == 0:
+        return False
+    closes = pd.Series(df["Close"].to_numpy(dtype=float), index=_bar_dates(df).to_numpy())
+    closes = closes[~closes.index.duplicated(keep="last")]
+    frame_closes = closes.reindex(pd.to_datetime([bar_time(value) for value in rows["time"]])).to_numpy()
+    overlap = ~np.isnan(frame_closes)
+    return not np.allclose(frame_closes[overlap], rows["close"][overlap], rtol=1e-6)
+
+
+def checkpoint_is_current(path, config, df):
+    # Whether the checkpoint already covers the last bar of the frame, i.e. there is nothing new to analyse
+    meta = read_checkpoint_meta(path, config)
+    return meta is not None and len(df) > 0 and len(newer_rows(df.tail(1), meta["last_time"])) == 0
@@ -0,0 +1,100 @@
+import os
+import datetime
+import pandas as pd
+
+# Where MarketAnalyzer gets its candles from. A provider fetches many tickers at once and hands back one frame per
+# ticker in the layout MarketAnalyzer has always used, so the frames can go straight into its fixed_df path.
+
+OHLCV_COLUMNS = ['Date', 'Close', 'High', 'Low', 'Open', 'Volume']
+HISTORY_DAYS = 100
+
+
+def history_window(days=HISTORY_DAYS):
+    # The date range MarketAnalyzer.load_data asks for - the last `days` days up to today
+    end_date = datetime.datetime.now().date()
+    start_date = end_date - datetime.timedelta(days=days)
+    return start_date, end_date
+
+
+def to_ohlcv_frame(df):
+    # Keep the OHLCV columns in the standard order, drop days with no prices and sort by date
+    df = df[OHLCV_COLUMNS].dropna(subset=['Close'])
+    return df.sort_values("Date", axis=0).reset_index(drop=True)
+
+
+class DataProvider:
+    # Base class for data providers. fetch() returns {ticker: DataFrame} for the tickers it found data for;
+    # tickers with no data are left out rather than raising, so one bad symbol does not fail a batch.
+
+    def fetch(self, tickers, start_date, end_date):
+        raise NotImplementedError
+
+    def fetch_one(self, ticker, start_date, end_date):
+        frames = self.fetch([ticker], start_date, end_date)
+        if ticker not in frames:
+            raise ValueError(f"No data returned for {ticker}")
+        return frames[ticker]
+
+
+class YahooProvider(DataProvider):
+    # Downloads from Yahoo Finance, `batch_size` tickers per yf.download call instead of one call per ticker
+
+    def __init__(self, batch_size=100, threads=True):
+        self.batch_size = batch_size
+        self.threads = threads
+
+    def fetch(self, tickers, start_date, end_date):
+        # yfinance (and the requests stack under it) is only imported once something is downloaded
+        import yfinance as yf
+        frames = {}
+        for i in range(0, len(tickers), self.batch_size):
+            batch = list(tickers[i:i + self.batch_size])
+            downloaded = yf.download(batch, start=start_date, end=end_date, auto_adjust=True, progress=False,
+                                     group_by="ticker", threads=self.threads)
+            frames.update(self.split(downloaded, batch))
+        return frames
+
+    @staticmethod
+    def split(downloaded, tickers):
+        # yf.download returns one frame with (ticker, field) columns - split it into a frame per ticker
+        frames = {}
+        if downloaded is None or downloaded.empty:
+            return frames
+        available = set(downloaded.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker not in available:
+                continue
+            df = downloaded[ticker].reset_index()
+            df = df.rename(columns={df.columns[0]: 'Date'})
+            df = to_ohlcv_frame(df)
+            if not df.empty:
+                frames[ticker] = df
+        return frames
+
+
+class CsvDirectoryProvider(DataProvider):
+    # Local source: <data_dir>/<ticker>.csv with Date/Open/High/Low/Close/Volume columns. start_date and end_date
+    # are ignored so fixed sample files can be used whatever today's date is.
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def fetch(self, tickers, start_date=None, end_date=None):
+        frames = {}
+        for ticker in tickers:
+            file_path = os.path.join(self.data_dir, f"{ticker}.csv")
+            if os.path.exists(file_path):
+                frames[ticker] = to_ohlcv_frame(pd.read_csv(file_path))
+        return frames
+
+
+class FrameProvider(DataProvider):
+    # In-memory provider, e.g. for tests - serves copies of the frames it was given
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.requests = []
+
+    def fetch(self, tickers, start_date=None, end_date=None):
+        self.requests.append(list(tickers))
+        return {ticker: to_ohlcv_frame(self.frames[ticker].copy()) for ticker in tickers if ticker in self.frames}
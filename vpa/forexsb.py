@@ -0,0 +1,87 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from vpa.cache import CACHE_DTYPE, records_from_frame
+
+# Readers for the tab separated CSV files exported by forexsb.com (e.g. data/GBPUSD_D1.csv):
+#   Time<tab>Open<tab>High<tab>Low<tab>Close<tab>Volume
+#   2009-05-05 00:00:00<tab>1.5072<tab>1.50965<tab>1.50255<tab>1.5048<tab>21584<tab>16
+# The data rows have a sixth, unnamed column (the spread) which is dropped, and the times all have the same format
+# so they are parsed without pandas guessing it.
+#
+# A daily run only needs the last few dozen rows, so read_forexsb_tail reads the file backwards from the end in
+# blocks until it has them. For long histories convert_forexsb_csv writes the file once to a memory-mappable NumPy
+# file in the OHLCVCache layout (see vpa/cache.py); store_slice then selects a date range of it without copying
+# and cache.frame_from_records turns the selection into a DataFrame.
+
+FOREXSB_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+FOREXSB_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def _parse_rows(source, skip_header):
+    df = pd.read_csv(source, sep="\t", header=None, skiprows=1 if skip_header else 0, usecols=range(6),
+                     names=FOREXSB_COLUMNS, index_col=False)
+    df["Date"] = pd.to_datetime(df["Date"], format=FOREXSB_TIME_FORMAT)
+    return df
+
+
+def read_forexsb_csv(file_path):
+    return _parse_rows(file_path, skip_header=True)
+
+
+def read_forexsb_tail(file_path, rows, block_size=TAIL_BLOCK_SIZE):
+    # The last `rows` rows of the file (or all of them if there are fewer), read from the end of the file
+    if rows <= 0:
+        return pd.DataFrame({column: [] for column in FOREXSB_COLUMNS})
+    with open(file_path, 'rb') as file:
+        position = file.seek(0, os.SEEK_END)
+        data = b""
+        # Once there are `rows` line breaks before the last line, the last `rows` lines are all complete
+        while position > 0 and data.rstrip(b"\r\n").count(b"\n") < rows:
+            step = min(block_size, position)
+            position -= step
+            file.seek(position)
+            data = file.read(step) + data
+    lines = data.rstrip(b"\r\n").split(b"\n")
+    if position == 0:
+        lines = lines[1:]
+    return _parse_rows(io.BytesIO(b"\n".join(lines[-rows:])), skip_header=False)
+
+
+def store_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".npy"
+
+
+def convert_forexsb_csv(csv_path, store_path=None):
+    # Write the CSV as a CACHE_DTYPE NumPy file, by default next to it with a .npy extension. Returns the path.
+    store_path = store_path or store_path_for(csv_path)
+    records = records_from_frame(read_forexsb_csv(csv_path))
+    with open(store_path + ".tmp", 'wb') as file:
+        np.save(file, records)
+    os.replace(store_path + ".tmp", store_path)
+    return store_path
+
+
+def open_forexsb_store(csv_path, store_path=None):
+    # The CSV's records memory-mapped read only, converting it first if the store is missing or older than the CSV
+    store_path = store_path or store_path_for(csv_path)
+    if not os.path.exists(store_path) or os.path.getmtime(store_path) < os.path.getmtime(csv_path):
+        convert_forexsb_csv(csv_path, store_path)
+    records = np.load(store_path, mmap_mode="r")
+    if records.dtype != CACHE_DTYPE:
+        raise ValueError(f"{store_path} is not an OHLCV store")
+    return records
+
+
+def store_slice(records, start=None, end=None):
+    # Rows with start <= Date < end, as a view of the memory-mapped records
+    dates = records["Date"]
+    first = np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side="left") if start is not None else 0
+    last = np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side="left") if end is not None else len(dates)
+    return records[first:last]
+
+
+def store_tail(records, rows):
+    return records[max(len(records) - rows, 0):]
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+# Time spent per stage of MarketAnalyzer (download, candles, percentiles, adx, signals, logging, charts ...) and
+# counters such as the bars processed, aggregated per ticker and per scan. Switched on by the "metrics" section of
+# the config or, without touching the config, the VPA_METRICS environment variable:
+#   VPA_METRICS=json          write log/metrics_<name>_<time>.json
+#   VPA_METRICS=prometheus    write log/<name>_metrics.prom for the node_exporter textfile collector, as gauges
+#                             of the last run (each run starts from zero, so they are not Prometheus counters)
+#   VPA_METRICS=off           disable it whatever the config says
+# When it is off, timer() hands back a shared do-nothing context manager, so the instrumented code costs next to
+# nothing.
+
+METRICS_ENV = "VPA_METRICS"
+METRICS_FORMATS = ("json", "prometheus")
+
+_NOT_TIMED = nullcontext()
+
+
+def metrics_format(config):
+    # "json", "prometheus" or None when metrics are off
+    setting = os.environ.get(METRICS_ENV)
+    if setting is not None and setting.strip():
+        setting = setting.strip().lower()
+        return setting if setting in METRICS_FORMATS else None
+    section = config.get("metrics", {})
+    if not section.get("enabled", False):
+        return None
+    if section.get("format", "json") not in METRICS_FORMATS:
+        raise ValueError(f"Unknown metrics format: {section['format']}. Use one of {METRICS_FORMATS}")
+    return section.get("format", "json")
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_time(self.stage, (time.perf_counter_ns() - self.start) / 1e9)
+        return False
+
+
+class StageMetrics:
+    # Seconds and calls per stage plus named counters. Stages can nest, e.g. "process_data" covers "percentiles".
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.__seconds = {}
+        self.__calls = {}
+        self.__counters = {}
+
+    def timer(self, stage):
+        # with metrics.timer("percentiles"): ...
+        return _StageTimer(self, stage) if self.enabled else _NOT_TIMED
+
+    def add_time(self, stage, seconds, calls=1):
+        self.__seconds[stage] = self.__seconds.get(stage, 0.0) + seconds
+        self.__calls[stage] = self.__calls.get(stage, 0) + calls
+
+    def count(self, counter, value=1):
+        if self.enabled:
+            self.__counters[counter] = self.__counters.get(counter, 0) + value
+
+    def seconds(self, stage):
+        return self.__seconds.get(stage, 0.0)
+
+    def calls(self, stage):
+        return self.__calls.get(stage, 0)
+
+    def counter(self, counter):
+        return self.__counters.get(counter, 0)
+
+    def merge(self, other):
+        # Add another StageMetrics (or its to_dict()) into this one
+        other = other.to_dict() if isinstance(other, StageMetrics) else other
+        for stage, totals in other["stages"].items():
+            self.add_time(stage, totals["seconds"], totals["calls"])
+        for counter, value in other["counters"].items():
+            self.__counters[counter] = self.__counters.get(counter, 0) + value
+        return self
+
+    def to_dict(self):
+        return {
+            "stages": {stage: {"seconds": self.__seconds[stage], "calls": self.__calls[stage]}
+                       for stage in self.__seconds},
+            "counters": dict(self.__counters)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls().merge(data)
+
+
+class ScanMetrics:
+    # The metrics of each ticker in a scan, plus the stages timed for the scan as a whole (e.g. the batched download)
+
+    def __init__(self):
+        self.scan = StageMetrics()
+        self.tickers = {}
+
+    def add_ticker(self, ticker, metrics):
+        self.tickers[ticker] = metrics if isinstance(metrics, StageMetrics) else StageMetrics.from_dict(metrics)
+
+    def total(self):
+        total = StageMetrics().merge(self.scan)
+        for metrics in self.tickers.values():
+            total.merge(metrics)
+        return total
+
+    def to_dict(self):
+        return {
+            "scan": self.scan.to_dict(),
+            "total": self.total().to_dict(),
+            "tickers": {ticker: metrics.to_dict() for ticker, metrics in self.tickers.items()}
+        }
+
+    def groups(self):
+        return [({"scope": "scan"}, self.scan)] + [({"ticker": ticker}, metrics)
+                                                   for ticker, metrics in self.tickers.items()]
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def prometheus_text(groups):
+    # Prometheus text exposition of (labels, StageMetrics) pairs, as gauges of the run they were recorded in
+    families = [
+        ("vpa_stage_seconds", "Seconds spent in each MarketAnalyzer stage in the last run",
+         lambda labels, metrics: [(_labels(labels, stage=stage), metrics.seconds(stage))
+                                  for stage in metrics.to_dict()["stages"]]),
+        ("vpa_stage_calls", "Times each MarketAnalyzer stage ran in the last run",
+         lambda labels, metrics: [(_labels(labels, stage=stage), metrics.calls(stage))
+                                  for stage in metrics.to_dict()["stages"]]),
+        ("vpa_events", "MarketAnalyzer counters such as bars processed in the last run",
+         lambda labels, metrics: [(_labels(labels, counter=counter), value)
+                                  for counter, value in metrics.to_dict()["counters"].items()])
+    ]
+    lines = []
+    for name, description, samples in families:
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+        for labels, metrics in groups:
+            lines += [f"{name}{sample_labels} {value}" for sample_labels, value in samples(labels, metrics)]
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(metrics, log_dir, metrics_format="json", name="vpa"):
+    # Write a StageMetrics (labelled with `name` as the ticker) or a ScanMetrics to log_dir. Returns the file path.
+    # The Prometheus file keeps the same name, so the collector always reads the latest run.
+    if metrics_format not in METRICS_FORMATS:
+        raise ValueError(f"Unknown metrics format: {metrics_format}. Use one of {METRICS_FORMATS}")
+    os.makedirs(log_dir, exist_ok=True)
+    if metrics_format == "json":
+        file_path = os.path.join(log_dir, f"metrics_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        content = json.dumps({"name": name, "time": datetime.now().isoformat(), **(
+            metrics.to_dict() if isinstance(metrics, ScanMetrics) else {"tickers": {name: metrics.to_dict()}})},
+            indent=2)
+    else:
+        file_path = os.path.join(log_dir, f"{name}_metrics.prom")
+        groups = metrics.groups() if isinstance(metrics, ScanMetrics) else [({"ticker": name}, metrics)]
+        content = prometheus_text(groups)
+    with open(file_path + ".tmp", 'w') as file:
+        file.write(content)
+    os.replace(file_path + ".tmp", file_path)
+    return file_path
@@ -0,0 +1,70 @@
+import numpy as np
+from vpa.app import calculate_adx_windows
+from vpa.vectorized import adjusted_candles, period_lengths, rows_to_process, score_features, window_features
+
+# Cross-sectional scoring of a whole universe at once. The score a scan reports for a ticker is the trade_signal of
+# its last bar, which only depends on the last period_three candles (and the close before them). So rather than
+# running a MarketAnalyzer per ticker, the latest window of every ticker is loaded into one (ticker x time) panel and
+# the spreads, percentile ranks, ADX, accumulation/distribution and scores are worked out for every ticker together,
+# with the same code vpa/vectorized.py runs along the bars of one frame.
+#
+# Histories are ragged - a ticker can have fewer candles than the window - so each panel carries a mask of the cells
+# that hold a candle. A ticker whose window is not full scores 0, as process_data does before its windows fill up.
+
+PANEL_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def load_panel(frames, config):
+    # {ticker: DataFrame} -> the latest period_three candles of each ticker, right aligned in (ticker x time) arrays
+    lengths = period_lengths(config)
+    width = lengths["period_three"]
+    tickers = list(frames)
+    panel = {column: np.ones((len(tickers), width)) for column in PANEL_COLUMNS}
+    panel["mask"] = np.zeros((len(tickers), width), dtype=bool)
+    # The close before each window, 0 when the frame starts with the window (so the first open is not adjusted)
+    panel["previous_close"] = np.zeros(len(tickers))
+    panel["time"] = np.empty(len(tickers), dtype=object)
+    panel["tickers"] = tickers
+    for row, ticker in enumerate(tickers):
+        df = rows_to_process(frames[ticker], config)
+        latest = df.iloc[-(width + 1):]
+        count = min(len(latest), width)
+        for column in PANEL_COLUMNS:
+            panel[column][row, width - count:] = latest[column].to_numpy(dtype=float)[-count:] if count else []
+        panel["mask"][row, width - count:] = True
+        if len(latest) > width:
+            panel["previous_close"][row] = latest["Close"].iloc[0]
+        if count:
+            panel["time"][row] = latest["Date"].iloc[-1]
+    return panel
+
+
+def panel_signals(panel, config):
+    # Score the last bar of every ticker in a panel. Returns the arrays of compute_signals with one entry per ticker,
+    # plus "complete", whether the ticker had a full window (the others score 0).
+    complete = panel["mask"].all(axis=1)
+    if len(complete) == 0:
+        signals = score_features({"bar_count": 0, "time": panel["time"]}, config)
+        signals.update({"tickers": panel["tickers"], "complete": complete})
+        return signals
+    previous_close = np.concatenate((panel["previous_close"][:, None], panel["Close"][:, :-1]), axis=1)
+    candles = adjusted_candles(panel["Open"], panel["High"], panel["Low"], panel["Close"], previous_close)
+    candles["volume"] = panel["Volume"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adx_values = calculate_adx_windows(candles["high"], candles["low"], candles["close"])
+        features = window_features(candles, adx_values, config)
+        features["time"] = panel["time"]
+        signals = score_features(features, config)
+    for name in ["single_candle_signal_score", "trend_signal_score", "multiple_bar_signal_score",
+                 "acc_dist_signal_score", "trade_signal"]:
+        signals[name] = np.where(complete, signals[name], 0.0)
+    signals["flags"] = np.where(complete, signals["flags"], 0).astype(np.uint32)
+    signals["tickers"] = panel["tickers"]
+    signals["complete"] = complete
+    return signals
+
+
+def panel_scores(frames, config):
+    # {ticker: signal_score} for every ticker of {ticker: DataFrame}, rounded as scanner.scan_ticker rounds them
+    signals = panel_signals(load_panel(frames, config), config)
+    return {ticker: round(float(score), 1) for ticker, score in zip(signals["tickers"], signals["trade_signal"])}
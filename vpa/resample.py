@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+import pandas as pd
+from vpa.app import DebugLog
+from vpa.app_runner import MarketAnalyzer
+
+# Builds higher timeframe bars from a single lower timeframe stream (e.g. H1 into H4, D1 and W1) instead of
+# downloading the same instrument once per timeframe. A bar is the open of its first source bar, the highest high,
+# the lowest low, the close of its last source bar and the summed volume.
+#
+# Periods start at midnight for the intraday timeframes and D1, and on Sunday for W1 - forex weeks (and the forexsb
+# D1 files) open on Sunday evening.
+
+TIMEFRAMES = {
+    "M1": timedelta(minutes=1),
+    "M5": timedelta(minutes=5),
+    "M15": timedelta(minutes=15),
+    "M30": timedelta(minutes=30),
+    "H1": timedelta(hours=1),
+    "H4": timedelta(hours=4),
+    "D1": timedelta(days=1),
+    "W1": timedelta(weeks=1)
+}
+
+
+def as_datetime(time):
+    # Bar times can be datetimes or the "YYYY-MM-DD HH:MM:SS" strings of the CSV files
+    return datetime.fromisoformat(time) if isinstance(time, str) else time
+
+
+def check_timeframe(timeframe):
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {timeframe}. Use one of {list(TIMEFRAMES)}")
+
+
+def period_start(time, timeframe):
+    # Start of the timeframe period a bar time falls in
+    check_timeframe(timeframe)
+    time = as_datetime(time)
+    midnight = time.replace(hour=0, minute=0, second=0, microsecond=0)
+    if timeframe == "W1":
+        return midnight - timedelta(days=(midnight.weekday() + 1) % 7)
+    length = TIMEFRAMES[timeframe] // timedelta(seconds=1)
+    elapsed = (time - midnight) // timedelta(seconds=1)
+    return midnight + timedelta(seconds=elapsed - elapsed % length)
+
+
+class BarResampler:
+    # Aggregates a stream of bars into one timeframe. update() returns the bars completed by the new bar: the
+    # previous period once a bar from a later period arrives or, when the source timeframe is known, the current
+    # period as soon as its last source bar is in. Bars are (time, open, high, low, close, volume) tuples with the
+    # period start as the time, the same order as MarketAnalyzer.on_bar takes them.
+
+    def __init__(self, timeframe, source_timeframe=None):
+        check_timeframe(timeframe)
+        self.__timeframe = timeframe
+        self.__source_length = TIMEFRAMES[source_timeframe] if source_timeframe is not None else None
+        self.__bar = None
+        self.__period_end = None
+
+    @property
+    def timeframe(self):
+        return self.__timeframe
+
+    @property
+    def partial(self):
+        # The bar of the period still being built, or None
+        return tuple(self.__bar) if self.__bar is not None else None
+
+    def update(self, time, open_price, high, low, close, volume):
+        time = as_datetime(time)
+        completed = []
+        start = period_start(time, self.__timeframe)
+        if self.__bar is not None and start != self.__bar[0]:
+            completed.append(self.flush())
+        if self.__bar is None:
+            self.__bar = [start, open_price, high, low, close, volume]
+            self.__period_end = start + TIMEFRAMES[self.__timeframe]
+        else:
+            bar = self.__bar
+            bar[2] = max(bar[2], high)
+            bar[3] = min(bar[3], low)
+            bar[4] = close
+            bar[5] += volume
+        if self.__source_length is not None and time + self.__source_length >= self.__period_end:
+            completed.append(self.flush())
+        return completed
+
+    def flush(self):
+        # End the current period early, e.g. at the end of the data. Returns its bar, or None if there is none.
+        bar = self.partial
+        self.__bar = None
+        return bar
+
+
+def resample_frame(df, timeframe):
+    # Batch version of BarResampler for a Date/Open/High/Low/Close/Volume frame, e.g. to warm up from history. The
+    # last period is included even if it is not complete.
+    check_timeframe(timeframe)
+    times = pd.to_datetime(df["Date"])
+    if timeframe == "W1":
+        starts = times.dt.normalize() - pd.to_timedelta((times.dt.dayofweek + 1) % 7, unit="D")
+    else:
+        starts = times.dt.floor(TIMEFRAMES[timeframe])
+    resampled = df.groupby(starts.to_numpy(), sort=False).agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"})
+    resampled.index.name = "Date"
+    return resampled.reset_index()
+
+
+class MultiTimeframeAnalyzer:
+    # One MarketAnalyzer per timeframe, all driven from one bar stream. History (a frame of source bars) is resampled
+    # and run through process_data to warm each analyzer up. After that on_bar feeds new source bars through the
+    # resamplers and returns the signals (see MarketAnalyzer.on_bar) of each timeframe that completed a bar.
+    def __init__(self, config, timeframes=("H1", "H4", "D1"), source_timeframe=None, history=None,
+                 ticker_symbol=None, log_level="INFO", log_prefix="debug_log", logger=None):
+        self.__logger = logger if logger is not None else DebugLog.shared(level=log_level, file_prefix=log_prefix)
+        self.__resamplers = {timeframe: BarResampler(timeframe, source_timeframe) for timeframe in timeframes}
+        self.__analyzers = {}
+        for timeframe in timeframes:
+            # Every bar but the last period's is complete, the last one is left to the resampler to finish
+            bars = resample_frame(history, timeframe) if history is not None and len(history) else None
+            complete = bars.iloc[:-1] if bars is not None else pd.DataFrame()
+            self.__analyzers[timeframe] = MarketAnalyzer(
+                config_path=None, ticker_symbol=f"{ticker_symbol}_{timeframe}" if ticker_symbol else timeframe,
+                fixed_df=complete, config=config, logger=self.__logger)
+            if len(complete):
+                self.__analyzers[timeframe].process_data()
+            if bars is not None:
+                last_start = bars["Date"].iloc[-1]
+                last_period = history[pd.to_datetime(history["Date"]) >= last_start]
+                for row in last_period.itertuples():
+                    for bar in self.__resamplers[timeframe].update(row.Date, row.Open, row.High, row.Low, row.Close,
+                                                                   row.Volume):
+                        self.__analyzers[timeframe].on_bar(*bar)
+
+    @property
+    def analyzers(self):
+        return self.__analyzers
+
+    def on_bar(self, time, open_price, high, low, close, volume):
+        # Returns {timeframe: signals} for the timeframes that completed a bar, with None as the signals while an
+        # analyzer's windows are still filling
+        time = as_datetime(time)
+        results = {}
+        for timeframe, resampler in self.__resamplers.items():
+            for bar in resampler.update(time, open_price, high, low, close, volume):
+                results[timeframe] = self.__analyzers[timeframe].on_bar(*bar)
+        return results
+
+    def flush(self):
+        # Score the unfinished bar of every timeframe, e.g. at the end of the data
+        results = {}
+        for timeframe, resampler in self.__resamplers.items():
+            bar = resampler.flush()
+            if bar is not None:
+                results[timeframe] = self.__analyzers[timeframe].on_bar(*bar)
+        return results
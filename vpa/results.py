@@ -0,0 +1,124 @@
+import os
+import heapq
+import numpy as np
+
+# Collects the results of a scan as the workers hand them back, without ever holding the whole universe in memory:
+#  - every scored ticker is appended to a columnar results directory (one raw file per column, see RESULT_COLUMNS),
+#    so the full ranking can still be read back afterwards with read_results()
+#  - the best and worst `rows` tickers are kept in two bounded heaps, which is all write_report needs
+#  - failed tickers are kept as they come, as scan() has always returned them
+# ranked() gives the top and bottom rows as a frame laid out like the head and tail of scan()'s sorted DataFrame
+# (same order, same index), so it can go straight to write_report and the chart helpers.
+
+RESULT_COLUMNS = {
+    "ticker": np.dtype("S16"),
+    "signal_score": np.dtype("<f8")
+}
+
+
+class _Descending:
+    # Inverts the ordering of a ticker, so one heap key ranks by score and then by ticker in the opposite direction
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def column_path(path, column):
+    return os.path.join(path, f"{column}.{RESULT_COLUMNS[column].str.lstrip('<|')}")
+
+
+def read_results(path):
+    # Every result appended to a results directory, in the order the tickers finished. Rows a crash left half written
+    # (one column longer than another) are dropped.
+    import pandas as pd
+    columns = {column: np.fromfile(column_path(path, column), dtype=dtype) if os.path.exists(column_path(path, column))
+               else np.zeros(0, dtype=dtype) for column, dtype in RESULT_COLUMNS.items()}
+    count = min(len(values) for values in columns.values())
+    columns["ticker"] = np.char.decode(columns["ticker"][:count], "ascii")
+    columns["signal_score"] = columns["signal_score"][:count]
+    return pd.DataFrame(columns, columns=list(RESULT_COLUMNS))
+
+
+class ScanResultSink:
+    # Pass to scanner.scan_to_sink (or add() the results of scan_ticker yourself). Without a path nothing is written
+    # to disk and only the top and bottom rows are kept.
+
+    def __init__(self, path=None, rows=5):
+        self.path = path
+        self.rows = rows
+        self.count = 0
+        self.failures = []
+        # The top heap's root is the weakest of the best rows, the bottom heap's root the strongest of the worst
+        self.__top = []
+        self.__bottom = []
+        self.__files = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self.__files = {column: open(column_path(path, column), "ab") for column in RESULT_COLUMNS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def add(self, result):
+        # A scan_ticker result - {"ticker", "signal_score", "error"}
+        if result["error"] is not None:
+            self.failures.append(result)
+            return
+        ticker, signal_score = result["ticker"], result["signal_score"]
+        if self.__files is not None:
+            encoded = ticker.encode("ascii")
+            if len(encoded) > RESULT_COLUMNS["ticker"].itemsize:
+                raise ValueError(f"Ticker {ticker} is longer than {RESULT_COLUMNS['ticker'].itemsize} characters")
+            self.__files["ticker"].write(np.array(encoded, dtype=RESULT_COLUMNS["ticker"]).tobytes())
+            self.__files["signal_score"].write(np.array(signal_score, dtype=RESULT_COLUMNS["signal_score"]).tobytes())
+        self.count += 1
+        if self.rows <= 0:
+            return
+        # Ranked by score, highest first, then by ticker - the order of scan()'s sorted DataFrame
+        self.__keep(self.__top, (signal_score, _Descending(ticker)))
+        self.__keep(self.__bottom, (-signal_score, ticker))
+
+    def __keep(self, heap, key):
+        if len(heap) < self.rows:
+            heapq.heappush(heap, key)
+        elif heap[0] < key:
+            heapq.heapreplace(heap, key)
+
+    def top(self):
+        # [(ticker, signal_score)] best first
+        return [(key[1].value, key[0]) for key in sorted(self.__top, reverse=True)]
+
+    def bottom(self):
+        # [(ticker, signal_score)] in ranking order, so the worst is last
+        return [(key[1], -key[0]) for key in sorted(self.__bottom)]
+
+    def ranked(self):
+        # The top and bottom rows as a DataFrame indexed by rank. When everything fits in the two heaps this is the
+        # whole sorted scan.
+        import pandas as pd
+        ranks = dict(enumerate(self.top()))
+        ranks.update({self.count - len(self.__bottom) + i: row for i, row in enumerate(self.bottom())})
+        index = sorted(ranks)
+        return pd.DataFrame([ranks[rank] for rank in index], index=index, columns=list(RESULT_COLUMNS))
+
+    def flush(self):
+        if self.__files is not None:
+            for file in self.__files.values():
+                file.flush()
+
+    def close(self):
+        if self.__files is not None:
+            for file in self.__files.values():
+                file.close()
+            self.__files = None
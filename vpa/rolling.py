@@ -0,0 +1,157 @@
+import bisect
+import math
+from collections import deque
+import numpy as np
+
+PERCENTILE_MODES = ("bucketed", "rank")
+
+
+class RollingPercentile:
+    # Rolling window of the last `length` values kept both in arrival order and in sorted order. The sorted values
+    # live in a preallocated array: adding a value (and evicting the oldest) is a binary search plus a shift of the
+    # values after it, and a percentile step or the rank of a value is then read straight from the array by index or
+    # binary search - O(log W) - instead of calling np.percentile over the whole window on every bar.
+    #
+    # mode="bucketed" reproduces the percentiles MarketAnalyzer has always used: a value's percentile is
+    # PERCENTILE_START plus PERCENTILE_INCREMENTS for every np.percentile step it is less than or equal to.
+    # mode="rank" uses the exact percentile rank instead - the percentage of the window less than or equal to the value.
+
+    def __init__(self, length, percentile_start=5, percentile_increments=5, mode="bucketed"):
+        if mode not in PERCENTILE_MODES:
+            raise ValueError(f"Unknown percentile mode: {mode}. Use one of {PERCENTILE_MODES}")
+        self.__length = length
+        self.__percentile_start = percentile_start
+        self.__percentile_increments = percentile_increments
+        self.__mode = mode
+        self.__values = deque()
+        self.__buffer = np.empty(length, dtype=float)
+        self.__count = 0
+        # Same quantiles np.percentile would use for range(PERCENTILE_START, 100, PERCENTILE_INCREMENTS)
+        self.__quantiles = [q / 100 for q in range(percentile_start, 100, percentile_increments)]
+        self.__steps = None
+        self.__sorted_steps = None
+        # Interpolation positions of the quantiles for the window size they were last worked out for
+        self.__step_positions = None
+
+    def __len__(self):
+        return len(self.__values)
+
+    @property
+    def length(self):
+        return self.__length
+
+    @property
+    def mode(self):
+        return self.__mode
+
+    @property
+    def values(self):
+        return self.__values
+
+    @property
+    def __sorted(self):
+        # The window's values in ascending order - a view of the buffer
+        return self.__buffer[:self.__count]
+
+    def push(self, value):
+        buffer = self.__buffer
+        if len(self.__values) == self.__length:
+            oldest = self.__values.popleft()
+            index = int(np.searchsorted(self.__sorted, oldest, side="left"))
+            buffer[index:self.__count - 1] = buffer[index + 1:self.__count]
+            self.__count -= 1
+        self.__values.append(value)
+        index = int(np.searchsorted(self.__sorted, value, side="right"))
+        buffer[index + 1:self.__count + 1] = buffer[index:self.__count]
+        buffer[index] = value
+        self.__count += 1
+        self.__steps = None
+        self.__sorted_steps = None
+
+    def reset(self, values):
+        # Replace the window with the last `length` of the values, oldest first
+        self.__values = deque(list(values)[-self.__length:] if self.__length else [])
+        self.__count = len(self.__values)
+        self.__buffer[:self.__count] = sorted(self.__values)
+        self.__steps = None
+        self.__sorted_steps = None
+
+    def quantile(self, q):
+        # Linear interpolation between the closest ranks, done exactly as np.percentile does it
+        virtual_index = (self.__count - 1) * q
+        previous_index = math.floor(virtual_index)
+        if virtual_index >= self.__count - 1:
+            return float(self.__buffer[self.__count - 1])
+        gamma = virtual_index - previous_index
+        below = float(self.__buffer[previous_index])
+        above = float(self.__buffer[previous_index + 1])
+        difference = above - below
+        if gamma >= 0.5:
+            return above - difference * (1 - gamma)
+        return below + difference * gamma
+
+    def steps(self):
+        # The percentile values for PERCENTILE_START to 95 - cached until the next push. All the quantiles are
+        # interpolated in one go with the same arithmetic as quantile(), from just the values either side of each.
+        if self.__steps is None:
+            below, above, gamma, upper_half = self.__positions(self.__count)
+            below, above = self.__buffer[below], self.__buffer[above]
+            difference = above - below
+            steps = np.where(upper_half, above - difference * (1 - gamma), below + difference * gamma)
+            self.__steps = steps.tolist()
+            self.__sorted_steps = sorted(self.__steps)
+        return self.__steps
+
+    def __positions(self, count):
+        # For each quantile: the sorted indexes either side of it, how far between them it is and which of them
+        # it is interpolated from. Only changes while the window is filling up.
+        if self.__step_positions is None or self.__step_positions[0] != count:
+            virtual_index = (count - 1) * np.array(self.__quantiles)
+            below = np.floor(virtual_index).astype(int)
+            gamma = virtual_index - below
+            # At or past the last value the quantile is the last value itself
+            past_end = virtual_index >= count - 1
+            below[past_end] = count - 1
+            gamma[past_end] = 0
+            self.__step_positions = (count, below, np.minimum(below + 1, count - 1), gamma, gamma >= 0.5)
+        return self.__step_positions[1:]
+
+    def rank(self, value):
+        # Percentile of a value against the current window
+        if self.__mode == "rank":
+            return 100 * int(np.searchsorted(self.__sorted, value, side="right")) / self.__count
+        self.steps()
+        steps_at_or_above = len(self.__sorted_steps) - bisect.bisect_left(self.__sorted_steps, value)
+        return self.__percentile_start + self.__percentile_increments * steps_at_or_above
+
+    def ranks(self, values=None):
+        # Percentile of every value in the window, in arrival order. `values` can be the window's values as an array
+        # already (e.g. a CandleBuffer column), which saves converting them.
+        values = np.asarray(self.__values) if values is None else values
+        if self.__mode == "rank":
+            return 100 * np.searchsorted(self.__sorted, values, side="right") / self.__count
+        self.steps()
+        steps_at_or_above = len(self.__sorted_steps) - np.searchsorted(self.__sorted_steps, values, side="left")
+        return self.__percentile_start + self.__percentile_increments * steps_at_or_above
+
+    def count_above(self, threshold):
+        # How many values in the window have a percentile greater than threshold, without ranking each of them
+        count = self.__count
+        if count == 0:
+            return 0
+        if self.__mode == "rank":
+            # rank > threshold once at least `needed` values are less than or equal to it
+            needed = math.floor(threshold * count / 100) + 1
+            while needed <= count and 100 * needed / count <= threshold:
+                needed += 1
+            if needed > count:
+                return 0
+            return count - int(np.searchsorted(self.__sorted, self.__buffer[needed - 1], side="left"))
+        # bucketed percentile > threshold once a value is at or below `needed` of the steps
+        needed = math.floor((threshold - self.__percentile_start) / self.__percentile_increments) + 1
+        self.steps()
+        if needed <= 0:
+            return count
+        if needed > len(self.__sorted_steps):
+            return 0
+        return int(np.searchsorted(self.__sorted, self.__sorted_steps[-needed], side="right"))
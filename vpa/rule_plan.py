@@ -0,0 +1,172 @@
+import numpy as np
+from vpa.app import PERIODS
+from vpa.signal_table import FLAG_BITS
+
+# The signal rules of MarketAnalyzer.detect_signals with the config compiled into arrays. The thresholds from
+# "trading_parameters" are read once and held with one entry per period (in PERIODS order), so scoring a bar is a few
+# comparisons over all the periods at once instead of nested dict lookups and a pass per count per period.
+
+PERIOD_LENGTH_KEYS = {
+    "period_one": "PERIOD_ONE_LENGTH",
+    "period_two": "PERIOD_TWO_LENGTH",
+    "period_three": "PERIOD_THREE_LENGTH"
+}
+
+# Accumulation/distribution: at least ACC_DIST_HIGH_VOLUME_BARS period_one volumes above the 65th percentile of the
+# period_three volumes, with the close below the 20th (accumulation) or above the 80th (distribution) percentile of
+# the period_three closes
+ACC_DIST_VOLUME_PERCENTILE = 65
+ACC_DIST_LOW_PRICE_PERCENTILE = 20
+ACC_DIST_HIGH_PRICE_PERCENTILE = 80
+ACC_DIST_HIGH_VOLUME_BARS = 3
+
+
+class RulePlan:
+
+    def __init__(self, config):
+        parameters = config["trading_parameters"]
+
+        def per_period(name):
+            return np.array([parameters[period][name] for period in PERIODS], dtype=np.float64)
+
+        self.lengths = np.array([config[PERIOD_LENGTH_KEYS[period]] for period in PERIODS])
+        self.longest = int(self.lengths.max())
+        self.longest_period = PERIODS[int(np.argmax(self.lengths))]
+
+        self.signal_bar_count = per_period("Signal_Bar_Count")
+        # The bearish signal compares every period's up bar count against PERIOD_ONE_LENGTH, as detect_signals does
+        self.bear_bar_count = config["PERIOD_ONE_LENGTH"] - self.signal_bar_count
+        self.high_spread_threshold = per_period("High_Spread_Threshold")
+        self.high_volume_threshold = per_period("High_Volume_Threshold")
+        self.anomaly_threshold = per_period("Anomaly_Threshold")
+        self.high_spread_count = per_period("High_Spread_Count")
+        self.high_volume_count = per_period("High_Volume_Count")
+
+        # in_window[i, p] - whether row i of the longest window (oldest first) is inside period p's window
+        self.in_window = np.arange(self.longest)[:, None] >= (self.longest - self.lengths)[None, :]
+        self.__in_window_counts = self.in_window.astype(np.float64)
+        # The same for the high spread, high volume and anomaly conditions side by side
+        self.__in_window_conditions = np.tile(self.in_window, 3)
+
+        # The per-bar decisions are made over len(PERIODS) values, which is quicker on plain lists than arrays
+        self.__rules = list(zip(self.signal_bar_count.tolist(), self.bear_bar_count.tolist(),
+                                self.anomaly_threshold.tolist(), self.high_spread_count.tolist(),
+                                self.high_volume_count.tolist(),
+                                [FLAG_BITS[f"bull_{period}"] for period in PERIODS],
+                                [FLAG_BITS[f"bear_{period}"] for period in PERIODS],
+                                [FLAG_BITS[f"volume_backed_{period}"] for period in PERIODS]))
+        self.__single_candle_bits = list(zip([FLAG_BITS[f"wide_spread_{period}"] for period in PERIODS],
+                                             [FLAG_BITS[f"high_volume_{period}"] for period in PERIODS]))
+        self.__period_one = PERIODS.index("period_one")
+        self.__period_two = PERIODS.index("period_two")
+
+    def bar_counts(self, up_bar, spread_percentiles, volume_percentiles):
+        # Step 7: up bars, high spread, high volume and anomaly counts for every period in one pass. The arguments
+        # are the longest window (see CandleBuffer.percentiles), the results have one count per period.
+        first = self.longest - len(up_bar)
+        conditions = np.concatenate((spread_percentiles > self.high_spread_threshold,
+                                     volume_percentiles > self.high_volume_threshold,
+                                     np.abs(spread_percentiles - volume_percentiles) > self.anomaly_threshold), axis=1)
+        counts = (conditions & self.__in_window_conditions[first:]).sum(axis=0)
+        periods = len(PERIODS)
+        return (up_bar @ self.__in_window_counts[first:], counts[:periods], counts[periods:2 * periods],
+                counts[2 * periods:])
+
+    def score(self, up_bar, spread_percentiles, volume_percentiles, shooting_star, hammer, lld, adx_values,
+              acc_or_dist):
+        # Score the newest bar of the window. acc_or_dist is "Acc", "Dist" or "" (see acc_or_dist below).
+        # Returns the four sub-scores and the flags of the signals that fired - the labels can be made from the flags
+        # with vpa.signal_table.signal_labels.
+        flags = 0
+        up = bool(up_bar[-1])
+        direction = 2.5 if up else -2.5
+        spread_now = spread_percentiles[-1].tolist()
+        volume_now = volume_percentiles[-1].tolist()
+
+        # Single candle signals
+        single_candle_signal_score = 1 if up else -1
+        if up:
+            flags |= FLAG_BITS["up_bar"]
+        for spread, volume, (wide_spread_bit, high_volume_bit) in zip(spread_now, volume_now,
+                                                                     self.__single_candle_bits):
+            if spread > 70:
+                flags |= wide_spread_bit
+                single_candle_signal_score += direction
+                if volume > 70:
+                    flags |= high_volume_bit
+                    single_candle_signal_score += direction
+        if shooting_star:
+            flags |= FLAG_BITS["shooting_star"]
+            single_candle_signal_score -= 3
+        elif hammer:
+            flags |= FLAG_BITS["hammer"]
+            single_candle_signal_score += 3
+
+        # Trend signals
+        trend_signal_score = 0
+        if adx_values[0] > 25:
+            flags |= FLAG_BITS["trending"]
+            if adx_values[2] > adx_values[3]:
+                flags |= FLAG_BITS["trending_up"]
+                trend_signal_score += 5
+            if adx_values[3] > adx_values[2]:
+                flags |= FLAG_BITS["trending_down"]
+                trend_signal_score -= 5
+
+        # Multiple bar signals
+        multiple_bar_signal_score = 0
+        counts = zip(*(count.tolist() for count in self.bar_counts(up_bar, spread_percentiles, volume_percentiles)))
+        for (up_bar_count, high_spread_count, high_volume_count, anomaly_count), (
+                signal_bar_count, bear_bar_count, anomaly_threshold, min_high_spread, min_high_volume,
+                bull_bit, bear_bit, volume_backed_bit) in zip(counts, self.__rules):
+            if up_bar_count >= signal_bar_count:
+                flags |= bull_bit
+                score_adjustment = 2.5
+            elif up_bar_count <= bear_bar_count:
+                flags |= bear_bit
+                score_adjustment = -2.5
+            else:
+                continue
+            if (high_spread_count >= min_high_spread and high_volume_count >= min_high_volume
+                    and anomaly_count <= anomaly_threshold):
+                flags |= volume_backed_bit
+                score_adjustment *= 2
+            multiple_bar_signal_score += score_adjustment
+
+        # Accumulation/distribution signals
+        acc_dist_signal_score = 0
+        if acc_or_dist:
+            sign = 1 if acc_or_dist == "Acc" else -1
+            flags |= FLAG_BITS["accumulation" if sign > 0 else "distribution"]
+            acc_dist_signal_score += 10 * sign
+            if spread_now[self.__period_one] > 65 or shooting_star or hammer or lld:
+                if volume_now[self.__period_one] < 50:
+                    flags |= FLAG_BITS["test_pass"]
+                    acc_dist_signal_score += 5 * sign
+                else:
+                    # Test fail makes the signal weaker
+                    flags |= FLAG_BITS["test_fail"]
+                    acc_dist_signal_score -= 2
+            if spread_now[self.__period_two] < 40 and volume_now[self.__period_two] > 60:
+                flags |= FLAG_BITS["climax"]
+                acc_dist_signal_score += 10 * sign
+
+        return {
+            "single_candle_signal_score": single_candle_signal_score,
+            "trend_signal_score": trend_signal_score,
+            "multiple_bar_signal_score": multiple_bar_signal_score,
+            "acc_dist_signal_score": acc_dist_signal_score,
+            "flags": flags
+        }
+
+
+def acc_or_dist(period_one_volumes, last_close, volume_threshold, low_price, high_price):
+    # Step 9 with the percentiles already worked out: volume_threshold is the ACC_DIST_VOLUME_PERCENTILE of the
+    # period_three volumes, low_price and high_price the ACC_DIST_LOW/HIGH_PRICE_PERCENTILE of its closes
+    if int((period_one_volumes > volume_threshold).sum()) < ACC_DIST_HIGH_VOLUME_BARS:
+        return ""
+    if last_close < low_price:
+        return "Acc"
+    if last_close > high_price:
+        return "Dist"
+    return ""
@@ -0,0 +1,288 @@
+import os
+import json
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+import pandas as pd
+from vpa.app import DebugLog
+from vpa.app_runner import MarketAnalyzer
+from vpa.data_provider import history_window
+from vpa.metrics import StageMetrics
+from vpa.results import ScanResultSink
+from vpa.panel import panel_scores
+from vpa.shared_data import SharedMarketData
+from vpa.checkpoint import checkpoint_is_current, checkpoint_path, read_checkpoint_meta
+
+# Runs MarketAnalyzer over a list of tickers on a pool of worker processes. Each ticker is analysed independently,
+# so a failure (bad symbol, empty download, not enough data) only loses that ticker rather than the whole scan.
+
+
+COMBINED = "combined"
+
+
+def load_tickers(file_path, replace_dots=True):
+    # One symbol per line, e.g. data/SP500-tickers.csv. Yahoo uses "-" where the list has "." (BRK.B -> BRK-B), but
+    # the "." of an exchange suffix has to stay (III.L in data/FTSE_tickers.csv), so lists like that pass False
+    tickers = []
+    with open(file_path, 'r') as file:
+        for line in file:
+            if line.strip():
+                tickers.append(line.strip().replace(".", "-") if replace_dots else line.strip())
+    return tickers
+
+
+def load_universes(universes, data_dir):
+    # {name: tickers} from the "universes" section of the config, e.g.
+    #   "SP500": {"file": "SP500-tickers.csv", "replace_dots": true, "max_workers": 0}
+    # (max_workers is the universe's concurrency limit, see scan_universes)
+    if COMBINED in universes:
+        raise ValueError(f"'{COMBINED}' is the name of the combined ranking and cannot be a universe")
+    return {name: load_tickers(os.path.join(data_dir, universe["file"]), universe.get("replace_dots", True))
+            for name, universe in universes.items()}
+
+
+def scan_ticker(ticker, config_path, log_level="ERROR", fixed_df=None, vectorized=False, collect_metrics=False,
+                checkpoint_dir=None):
+    # Worker for a single ticker. Without a fixed_df the analyzer downloads its own data.
+    # Returns the ticker, its signal score and the error message if it failed, plus the ticker's stage metrics
+    # (see vpa/metrics.py) when collect_metrics is set or the config enables them.
+    # With a checkpoint_dir the analyzer restarts from the ticker's checkpoint and only adds the new bars (see
+    # vpa/checkpoint.py), and a ticker whose checkpoint already has the last bar of fixed_df is not analysed at all.
+    # All the tickers handled by a worker process write to one shared log.
+    metrics = StageMetrics() if collect_metrics else None
+    try:
+        if checkpoint_dir is not None and fixed_df is not None:
+            with open(config_path, 'r') as file:
+                config = json.load(file)
+            path = checkpoint_path(checkpoint_dir, ticker)
+            if checkpoint_is_current(path, config, fixed_df):
+                if metrics is not None:
+                    metrics.count("checkpoint_skips")
+                signal_score = read_checkpoint_meta(path, config)["trade_signal"]
+                result = {"ticker": ticker, "signal_score": round(float(signal_score), 1), "error": None}
+                result["metrics"] = metrics.to_dict() if metrics is not None else None
+                return result
+        analyzer = MarketAnalyzer(config_path=config_path, ticker_symbol=ticker, fixed_df=fixed_df,
+                                  logger=DebugLog.shared(level=log_level), metrics=metrics)
+        metrics = analyzer.metrics()
+        if checkpoint_dir is not None:
+            signal_score = analyzer.process_new_data(checkpoint_path(checkpoint_dir, ticker))
+        elif vectorized:
+            signal_score = analyzer.process_data_vectorized()
+        else:
+            signal_score = analyzer.process_data()
+        result = {"ticker": ticker, "signal_score": round(float(signal_score), 1), "error": None}
+    except Exception as e:
+        result = {"ticker": ticker, "signal_score": None, "error": f"{type(e).__name__}: {e}"}
+    result["metrics"] = metrics.to_dict() if metrics is not None and metrics.enabled else None
+    return result
+
+
+def scan_workers(config_path, workers=None):
+    # Number of worker processes - the argument, then "scan_workers" in the config (0 means one per CPU)
+    if workers is None:
+        with open(config_path, 'r') as file:
+            workers = json.load(file).get("scan_workers", 0)
+    return workers if workers and workers > 0 else os.cpu_count()
+
+
+def iter_scan(tickers, config_path, workers=None, log_level="ERROR", provider=None, vectorized=False, metrics=None,
+              sources=None, source_limits=None, panel=False, shared_memory=True, checkpoint_dir=None):
+    # Fan the tickers out to the worker pool and yield each scan_ticker result as it completes. With a provider (see
+    # vpa/data_provider.py) all the data is fetched up front in batches and put in a shared memory block the workers
+    # read from (see vpa/shared_data.py), or with shared_memory=False pickled to the workers a frame at a time.
+    # Passing metrics (a vpa.metrics.ScanMetrics) collects the stage timings of the scan and of every ticker in it.
+    # sources maps tickers to a source name and source_limits caps how many tickers of a source are in the pool at
+    # once (0 or missing = no cap). The sources take turns, so a capped one never holds up the others.
+    # With panel set every ticker is scored at once in this process instead (see vpa/panel.py) - the same scores
+    # without the worker pool. The data then always comes from a provider, the configured one if none is passed.
+    # checkpoint_dir warm restarts each ticker from its checkpoint (see scan_ticker). The panel does not use them.
+    if panel:
+        yield from _iter_panel_scan(tickers, config_path, provider, metrics)
+        return
+    workers = scan_workers(config_path, workers)
+    sources = sources or {}
+    source_limits = source_limits or {}
+    frames = None
+    shared = None
+    if provider is not None:
+        with (metrics.scan.timer("download") if metrics is not None else nullcontext()):
+            frames = dict(provider.fetch(tickers, *history_window()))
+        for ticker in tickers:
+            if ticker not in frames:
+                yield _counted({"ticker": ticker, "signal_score": None,
+                                "error": f"ValueError: No data returned for {ticker}"}, metrics)
+        tickers = [ticker for ticker in tickers if ticker in frames]
+        if shared_memory:
+            shared = SharedMarketData.create({ticker: frames[ticker] for ticker in tickers})
+            frames = None
+
+    pending = {}
+    for ticker in tickers:
+        pending.setdefault(sources.get(ticker), deque()).append(ticker)
+    running = {source: 0 for source in pending}
+    # Only a couple of tickers per worker are queued at a time, which is what lets the limits hold
+    queued = workers * 2
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=None if shared is None else _init_scan_worker,
+                                 initargs=() if shared is None else (shared.descriptor(),)) as executor:
+            futures = {}
+
+            def submit_ready():
+                submitted = True
+                while submitted:
+                    submitted = False
+                    for source, waiting in pending.items():
+                        limit = source_limits.get(source) or 0
+                        if len(futures) >= queued:
+                            return
+                        if waiting and (limit <= 0 or running[source] < limit):
+                            ticker = waiting.popleft()
+                            if shared is not None:
+                                future = executor.submit(_scan_shared_ticker, ticker, config_path, log_level,
+                                                         vectorized, metrics is not None, checkpoint_dir)
+                            else:
+                                future = executor.submit(scan_ticker, ticker, config_path, log_level,
+                                                         None if frames is None else frames[ticker], vectorized,
+                                                         metrics is not None, checkpoint_dir)
+                            futures[future] = (ticker, source)
+                            running[source] += 1
+                            submitted = True
+
+            submit_ready()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ticker, source = futures.pop(future)
+                    running[source] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker process itself died - record it against the ticker and carry on
+                        result = {"ticker": ticker, "signal_score": None, "error": f"{type(e).__name__}: {e}"}
+                    if frames is not None:
+                        # The worker has its copy, so the frame can go as soon as the ticker is done
+                        del frames[ticker]
+                    yield _counted(result, metrics)
+                submit_ready()
+    finally:
+        if shared is not None:
+            shared.close()
+
+
+# Per worker process state, set by _init_scan_worker
+_worker_market_data = None
+
+
+def _init_scan_worker(descriptor):
+    global _worker_market_data
+    _worker_market_data = SharedMarketData.attach(descriptor)
+
+
+def _scan_shared_ticker(ticker, config_path, log_level, vectorized, collect_metrics, checkpoint_dir):
+    # scan_ticker on the ticker's rows of the shared block
+    return scan_ticker(ticker, config_path, log_level, _worker_market_data.frame(ticker), vectorized, collect_metrics,
+                       checkpoint_dir)
+
+
+def _iter_panel_scan(tickers, config_path, provider, metrics):
+    with open(config_path, 'r') as file:
+        config = json.load(file)
+    if provider is None:
+        from vpa.cache import configured_provider
+        provider = configured_provider(config)
+    with (metrics.scan.timer("download") if metrics is not None else nullcontext()):
+        frames = provider.fetch(tickers, *history_window())
+    for ticker in tickers:
+        if ticker not in frames:
+            yield _counted({"ticker": ticker, "signal_score": None,
+                            "error": f"ValueError: No data returned for {ticker}"}, metrics)
+    with (metrics.scan.timer("panel") if metrics is not None else nullcontext()):
+        scores = panel_scores({ticker: frames[ticker] for ticker in tickers if ticker in frames}, config)
+    for ticker, signal_score in scores.items():
+        yield _counted({"ticker": ticker, "signal_score": signal_score, "error": None}, metrics)
+
+
+def _counted(result, metrics):
+    if metrics is not None:
+        metrics.scan.count("tickers")
+        metrics.scan.count("failures", int(result["error"] is not None))
+        if result.get("metrics") is not None:
+            metrics.add_ticker(result["ticker"], result["metrics"])
+    return result
+
+
+def scan(tickers, config_path, workers=None, log_level="ERROR", provider=None, vectorized=False, metrics=None,
+         panel=False, shared_memory=True, checkpoint_dir=None):
+    # Run the whole scan (see iter_scan) and collect the results.
+    # Returns a DataFrame of ticker/signal_score sorted by score (highest first) and a list of failed results.
+    results = list(iter_scan(tickers, config_path, workers, log_level, provider, vectorized, metrics, panel=panel,
+                             shared_memory=shared_memory, checkpoint_dir=checkpoint_dir))
+    failures = [result for result in results if result["error"] is not None]
+    df = pd.DataFrame([{"ticker": result["ticker"], "signal_score": result["signal_score"]}
+                       for result in results if result["error"] is None], columns=['ticker', 'signal_score'])
+    df_sorted = df.sort_values(by=['signal_score', 'ticker'], ascending=[False, True]).reset_index(drop=True)
+    return df_sorted, failures
+
+
+def scan_to_sink(tickers, config_path, sink, workers=None, log_level="ERROR", provider=None, vectorized=False,
+                 metrics=None, panel=False):
+    # Stream the results into a vpa.results.ScanResultSink as they complete instead of collecting them, so memory
+    # stays flat however many tickers are scanned. Returns the sink; sink.ranked() and sink.failures are what
+    # write_report needs.
+    for result in iter_scan(tickers, config_path, workers, log_level, provider, vectorized, metrics, panel=panel):
+        sink.add(result)
+    sink.flush()
+    return sink
+
+
+def scan_universes(universes, config_path, rows=5, results_dir=None, workers=None, log_level="ERROR", provider=None,
+                   vectorized=False, metrics=None, source_limits=None, panel=False, checkpoint_dir=None):
+    # Scan several ticker lists ({name: tickers}, see load_universes) in one run over one worker pool. A ticker in
+    # more than one list is only analysed once - it counts against the limit of the first list it is in
+    # (source_limits, {name: max tickers in the pool}) and is ranked in all of them.
+    # Returns {name: ScanResultSink} with a sink per universe plus COMBINED, the ranking of every ticker scanned.
+    # With a results_dir each sink also streams its results to results_dir/<name> (see vpa/results.py).
+    memberships = {}
+    for name, tickers in universes.items():
+        for ticker in tickers:
+            memberships.setdefault(ticker, []).append(name)
+    sinks = {name: ScanResultSink(None if results_dir is None else os.path.join(results_dir, name), rows)
+             for name in [COMBINED] + list(universes)}
+    try:
+        for result in iter_scan(list(memberships), config_path, workers, log_level, provider, vectorized, metrics,
+                                sources={ticker: names[0] for ticker, names in memberships.items()},
+                                source_limits=source_limits, panel=panel, checkpoint_dir=checkpoint_dir):
+            sinks[COMBINED].add(result)
+            for name in memberships[result["ticker"]]:
+                sinks[name].add(result)
+    finally:
+        for sink in sinks.values():
+            sink.close()
+    return sinks
+
+
+def write_report(df_sorted, failures, log_dir, rows=5, title=None):
+    # Top and bottom rows of the sorted scan, as app_all_shares has always written them, plus any failed tickers.
+    # A title heads the section, for a report with a section per universe.
+    current_time = datetime.now().strftime("%Y%m%d")
+    log_filename = f"share_output_{current_time}.txt"
+
+    with open(os.path.join(log_dir, log_filename), "a") as log_file:
+        if title is not None:
+            log_file.write(f"\n{title}:\n")
+
+        # Print the top five rows
+        log_file.write(f"\nTop {rows} rows:\n")
+        log_file.write(df_sorted.head(rows).to_string())
+
+        # Print the bottom five rows
+        log_file.write(f"\nBottom {rows} rows:\n")
+        log_file.write(df_sorted.tail(rows).to_string())
+
+        if failures:
+            log_file.write(f"\nFailed tickers ({len(failures)}):\n")
+            for failure in failures:
+                log_file.write(f"{failure['ticker']}: {failure['error']}\n")
+    return os.path.join(log_dir, log_filename)
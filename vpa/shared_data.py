@@ -0,0 +1,83 @@
+import numpy as np
+from multiprocessing import shared_memory
+from vpa.cache import CACHE_DTYPE, frame_from_records, records_from_frame
+
+# The OHLCV rows of a whole universe in one multiprocessing.shared_memory block, so the worker processes of a scan
+# read the data the parent downloaded in place instead of each receiving pickled DataFrames. The rows are CACHE_DTYPE
+# records (as in the local data cache), one ticker after another, with an index of each ticker's (start, stop) rows.
+#
+# The parent create()s the block and hands descriptor() - just the block's name and the index - to each worker, which
+# attach()es to it once. records() is a view into the block, and frame() is the DataFrame MarketAnalyzer takes over
+# read-only views of one ticker's rows, so nothing is copied when the worker gets to it. Whatever the number of workers
+# there is one copy of the universe.
+
+
+class SharedMarketData:
+
+    def __init__(self, block, index, owner):
+        self.__block = block
+        self.__index = index
+        self.__owner = owner
+        self.__records = np.ndarray(max(stop for _, stop in index.values()) if index else 0, dtype=CACHE_DTYPE,
+                                    buffer=block.buf)
+
+    @classmethod
+    def create(cls, frames):
+        # {ticker: DataFrame} -> a new block holding every ticker's rows. close() it when done with it (the parent
+        # owns the block, so closing also frees it).
+        records = {ticker: records_from_frame(df) for ticker, df in frames.items()}
+        index = {}
+        start = 0
+        for ticker, ticker_records in records.items():
+            index[ticker] = (start, start + len(ticker_records))
+            start += len(ticker_records)
+        # A block cannot be empty, even for a universe without any rows
+        block = shared_memory.SharedMemory(create=True, size=max(start * CACHE_DTYPE.itemsize, 1))
+        shared = cls(block, index, owner=True)
+        for ticker, (start, stop) in index.items():
+            shared.__records[start:stop] = records[ticker]
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor):
+        # Open a block made by create() in another process from its descriptor()
+        name, index = descriptor
+        return cls(shared_memory.SharedMemory(name=name), index, owner=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def descriptor(self):
+        return self.__block.name, self.__index
+
+    @property
+    def tickers(self):
+        return list(self.__index)
+
+    def __contains__(self, ticker):
+        return ticker in self.__index
+
+    def __len__(self):
+        return len(self.__index)
+
+    def records(self, ticker):
+        # The ticker's rows - a view of the shared block, not a copy
+        start, stop = self.__index[ticker]
+        return self.__records[start:stop]
+
+    def frame(self, ticker):
+        # Like records(), the frame must not be used after close()
+        return frame_from_records(self.records(ticker), copy=False)
+
+    def close(self):
+        # Views returned by records() must not be used after this
+        if self.__records is None:
+            return
+        self.__records = None
+        self.__block.close()
+        if self.__owner:
+            self.__block.unlink()
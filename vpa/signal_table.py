@@ -0,0 +1,99 @@
+import numpy as np
+from vpa.app import PERIODS
+
+# Per-bar record of what MarketAnalyzer scored: the date, the four sub-scores, the total trade_signal and the signals
+# that fired packed into one integer of flags. Filled in during process_data (or by the vectorized engine) so
+# backtests and dashboards can use every bar's signals without re-running the analysis or parsing the log.
+
+# One bit per signal, in this order. The per-period flags follow the labels detect_signals logs, e.g. "High Volume
+# (period_two)" is only set when the candle is also "Wide Spread (period_two)".
+SIGNAL_FLAGS = (
+    ["up_bar"]
+    + [f"wide_spread_{period}" for period in PERIODS]
+    + [f"high_volume_{period}" for period in PERIODS]
+    + ["shooting_star", "hammer", "trending", "trending_up", "trending_down"]
+    + [f"{signal}_{period}" for period in PERIODS for signal in ["bull", "bear", "volume_backed"]]
+    + ["accumulation", "distribution", "test_pass", "test_fail", "climax"]
+)
+FLAG_BITS = {name: 1 << bit for bit, name in enumerate(SIGNAL_FLAGS)}
+
+SCORE_COLUMNS = ["single_candle_signal_score", "trend_signal_score", "multiple_bar_signal_score",
+                 "acc_dist_signal_score", "trade_signal"]
+
+SIGNAL_TABLE_DTYPE = np.dtype([("time", object)] + [(column, np.float64) for column in SCORE_COLUMNS]
+                              + [("flags", np.uint32)])
+
+
+def signal_record(time, signals):
+    # One table row from the dict detect_signals returns
+    scores = [signals[column] for column in SCORE_COLUMNS[:-1]]
+    return (time, *scores, sum(scores), signals["flags"])
+
+
+def table_from_signals(signals):
+    # The table for the arrays returned by vectorized.compute_signals
+    table = np.zeros(len(signals["time"]), dtype=SIGNAL_TABLE_DTYPE)
+    table["time"] = signals["time"]
+    for column in SCORE_COLUMNS:
+        table[column] = signals[column]
+    table["flags"] = signals["flags"]
+    return table
+
+
+def flag_mask(table, name):
+    # Boolean array - the bars where the named signal fired
+    return (np.asarray(table["flags"]) & FLAG_BITS[name]) != 0
+
+
+def flag_names(flags):
+    # The signals set in one flags value
+    return [name for name in SIGNAL_FLAGS if int(flags) & FLAG_BITS[name]]
+
+
+def signal_labels(flags):
+    # The signal lists detect_signals used to build on every bar, made from the flags when they are wanted
+    flags = int(flags)
+
+    def fired(name):
+        return flags & FLAG_BITS[name] != 0
+
+    single_candle_signals = ["Up Bar" if fired("up_bar") else "Down Bar"]
+    for period in PERIODS:
+        if fired(f"wide_spread_{period}"):
+            single_candle_signals.append(f"Wide Spread ({period})")
+        if fired(f"high_volume_{period}"):
+            single_candle_signals.append(f"High Volume ({period})")
+    single_candle_signals += [label for name, label in [("shooting_star", "Shooting Star"), ("hammer", "Hammer")]
+                              if fired(name)]
+
+    trend_signals = [label for name, label in [("trending", "Market is trending"), ("trending_up", "Trending Up"),
+                                               ("trending_down", "Trending Down")] if fired(name)]
+
+    multiple_bar_signals = []
+    for period in PERIODS:
+        for signal_type in ["bull", "bear"]:
+            if fired(f"{signal_type}_{period}"):
+                multiple_bar_signals.append(f"{signal_type.capitalize()} Signal ({period})")
+                if fired(f"volume_backed_{period}"):
+                    multiple_bar_signals.append(f"Volume Backed ({period})")
+
+    acc_dist_signals = [label for name, label in [("accumulation", "Possible Acc"), ("distribution", "Possible Dist"),
+                                                  ("test_pass", "Test Pass"), ("test_fail", "Test Fail"),
+                                                  ("climax", "Climax")] if fired(name)]
+
+    return {
+        "single_candle_signals": single_candle_signals,
+        "trend_signals": trend_signals,
+        "multiple_bar_signals": multiple_bar_signals,
+        "acc_dist_signals": acc_dist_signals
+    }
+
+
+def signal_frame(table, expand_flags=False):
+    # The table as a DataFrame, optionally with a boolean column per flag
+    import pandas as pd
+    df = pd.DataFrame({name: table[name] for name in SIGNAL_TABLE_DTYPE.names})
+    if expand_flags:
+        for name in SIGNAL_FLAGS:
+            df[name] = flag_mask(table, name)
+    return df
@@ -0,0 +1,181 @@
+import os
+import copy
+import json
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from vpa.backtest import backtest
+from vpa.forexsb import read_forexsb_csv
+from vpa.vectorized import compute_features, score_features
+
+# Parameter sweep over config.json: every combination of a search space is scored with the vectorized engine and
+# backtested (see vpa/backtest.py), and the results are ranked. A search space maps config keys to the values to
+# try, with dots for nested keys and "*" for every key at that level:
+#   {"PERIOD_TWO_LENGTH": [20, 25, 30], "trading_parameters.*.High_Volume_Threshold": [50, 55, 60]}
+#
+# Combinations are grouped by the settings the features depend on (window lengths and percentile settings), so
+# the percentile ranks, ADX and candle scores are worked out once per group and only the thresholds are re-applied
+# per combination. Groups are split into chunks that run on a pool of worker processes, each holding the price
+# data and a cache of the features it has already computed.
+
+FEATURE_KEYS = ["PERIOD_ONE_LENGTH", "PERIOD_TWO_LENGTH", "PERIOD_THREE_LENGTH", "PERCENTILE_START",
+                "PERCENTILE_INCREMENTS", "PERCENTILE_MODE", "MAX_ROWS", "use_real_data"]
+RESULT_STATS = ["total_return", "max_drawdown", "trades", "win_rate", "profit_factor", "average_pnl", "exposure",
+                "final_equity"]
+
+
+def set_parameter(config, path, value):
+    # Set a dotted key such as "trading_parameters.period_one.Signal_Bar_Count" in place
+    *parents, name = path.split(".")
+    targets = [config]
+    for parent in parents:
+        targets = [target[key] for target in targets for key in (target if parent == "*" else [parent])]
+    for target in targets:
+        for key in (list(target) if name == "*" else [name]):
+            target[key] = value
+
+
+def apply_parameters(config, parameters):
+    # A copy of the config with a combination's values set
+    config = copy.deepcopy(config)
+    for path, value in parameters.items():
+        set_parameter(config, path, value)
+    return config
+
+
+def grid_search(space):
+    # Every combination of the search space
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def random_search(space, samples, seed=None):
+    # `samples` different combinations drawn at random, or the whole grid if it is not bigger than that
+    keys = list(space)
+    grid_size = int(np.prod([len(space[key]) for key in keys]))
+    if samples >= grid_size:
+        return grid_search(space)
+    rng = random.Random(seed)
+    chosen = set()
+    while len(chosen) < samples:
+        chosen.add(tuple(rng.randrange(len(space[key])) for key in keys))
+    return [{key: space[key][index] for key, index in zip(keys, indexes)} for indexes in sorted(chosen)]
+
+
+def feature_key(config):
+    return tuple(config.get(key) for key in FEATURE_KEYS)
+
+
+def evaluate(df, config, parameter_sets, cache=None):
+    # Backtest each parameter set against the frame. Sets sharing a feature_key reuse one set of features, and
+    # `cache` (a dict kept for this frame) shares the ranks and ADX between groups with the same window lengths.
+    # Returns one dict per set with the parameters and the backtest statistics (or the error it failed with).
+    cache = {} if cache is None else cache
+    configs = [apply_parameters(config, parameters) for parameters in parameter_sets]
+    order = sorted(range(len(configs)), key=lambda index: str(feature_key(configs[index])))
+    rows = [None] * len(configs)
+    features, features_key = None, None
+    for index in order:
+        row = dict(parameter_sets[index])
+        try:
+            if feature_key(configs[index]) != features_key:
+                features, features_key = None, feature_key(configs[index])
+                features = compute_features(df, configs[index], cache)
+            result = backtest(df, configs[index], score_features(features, configs[index]))
+            row.update({name: result["stats"][name] for name in RESULT_STATS})
+            row["error"] = None
+        except Exception as e:
+            row.update({name: np.nan for name in RESULT_STATS})
+            row["error"] = f"{type(e).__name__}: {e}"
+        rows[index] = row
+    return rows
+
+
+# Per worker process state, set by _init_worker
+_worker_df = None
+_worker_config = None
+_worker_cache = {}
+
+
+def _init_worker(df, config):
+    global _worker_df, _worker_config, _worker_cache
+    _worker_df, _worker_config, _worker_cache = df, config, {}
+
+
+def _evaluate_chunk(parameter_sets):
+    return evaluate(_worker_df, _worker_config, parameter_sets, _worker_cache)
+
+
+def chunk_parameter_sets(config, parameter_sets, chunk_size):
+    # Chunks of at most chunk_size sets, each from a single feature group so a worker computes features once a chunk
+    groups = {}
+    for parameters in parameter_sets:
+        groups.setdefault(str(feature_key(apply_parameters(config, parameters))), []).append(parameters)
+    return [group[start:start + chunk_size] for group in groups.values() for start in range(0, len(group), chunk_size)]
+
+
+def run_sweep(df, config, parameter_sets, workers=None, chunk_size=25, rank_by="total_return"):
+    # Evaluate the parameter sets (see grid_search / random_search) on a process pool - the workers argument, then
+    # "scan_workers" in the config (0 means one per CPU). With one worker everything runs in this process.
+    # Returns the results ranked by `rank_by`, best first, with failed combinations at the end.
+    workers = workers or config.get("scan_workers", 0) or os.cpu_count()
+    if workers == 1:
+        rows = evaluate(df, config, parameter_sets)
+    else:
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df, config)) as executor:
+            futures = [executor.submit(_evaluate_chunk, chunk)
+                       for chunk in chunk_parameter_sets(config, parameter_sets, chunk_size)]
+            for future in as_completed(futures):
+                rows.extend(future.result())
+
+    results = pd.DataFrame(rows, columns=list(parameter_sets[0]) + RESULT_STATS + ["error"])
+    results = results.sort_values(by=rank_by, ascending=False, na_position="last", kind="stable").reset_index(drop=True)
+    results.insert(0, "rank", range(1, len(results) + 1))
+    return results
+
+
+def write_sweep_results(results, log_dir):
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    file_path = os.path.join(log_dir, f"sweep_results_{current_time}.csv")
+    results.to_csv(file_path, index=False)
+    return file_path
+
+
+def read_price_csv(file_path):
+    # Yahoo style CSV (Date,Open,...) or a forexsb tab separated export (Time<tab>Open...)
+    with open(file_path, 'r') as file:
+        header = file.readline()
+    if "\t" in header:
+        df = read_forexsb_csv(file_path)
+    else:
+        df = pd.read_csv(file_path)
+    return df.sort_values("Date", axis=0).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep config.json parameters and rank them by backtest")
+    parser.add_argument("space", help="JSON file with the search space")
+    parser.add_argument("--data", default="data/GBPUSD_D1.csv")
+    parser.add_argument("--config", default="config/config.json")
+    parser.add_argument("--samples", type=int, default=None, help="random search with this many combinations")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rank-by", default="total_return")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as file:
+        base_config = json.load(file)
+    with open(args.space, 'r') as file:
+        search_space = json.load(file)
+    parameter_sets = (grid_search(search_space) if args.samples is None
+                      else random_search(search_space, args.samples, args.seed))
+    print(f"Evaluating {len(parameter_sets)} combinations")
+    sweep_results = run_sweep(read_price_csv(args.data), base_config, parameter_sets, workers=args.workers,
+                              rank_by=args.rank_by)
+    print(sweep_results.head(10).to_string())
+    print("Results written to", write_sweep_results(sweep_results, os.path.join(os.path.dirname(__file__), "log")))
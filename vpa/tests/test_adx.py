@@ -0,0 +1,75 @@
+import unittest
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+from vpa.app import Candle, ADXState, calculate_adx, calculate_adx_batch
+
+
+class TestADX(unittest.TestCase):
+    PERIOD_THREE_LENGTH = 50
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        relative_path = "../data/"
+        full_path = os.path.join(absolute_path, relative_path)
+
+        self.my_data_frame = pd.read_csv(full_path + "spy_data.csv")
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+        self.candles = [Candle(row['Date'], row['Volume'], row['Open'], row['High'], row['Low'], row['Close'])
+                        for index, row in self.my_data_frame.iterrows()]
+
+    def assert_state_matches_calculate_adx(self, length):
+        # Every window from the first that calculate_adx accepts up to the end of the file
+        adx_state = ADXState(length)
+        window = deque(maxlen=length)
+        for candle in self.candles:
+            adx_state.update(candle)
+            window.append(candle)
+            self.assertEqual(len(adx_state), len(window))
+            if len(window) < 15:
+                with self.assertRaises(ValueError):
+                    adx_state.values()
+                continue
+            np.testing.assert_allclose(adx_state.values(), calculate_adx(window), rtol=1e-9,
+                                       err_msg=f"length {length}")
+
+    def test_state_matches_calculate_adx(self):
+        self.assert_state_matches_calculate_adx(TestADX.PERIOD_THREE_LENGTH)
+
+    def test_state_matches_calculate_adx_on_short_windows(self):
+        # 15 is the shortest window ADX accepts, one candle per period plus the first; it has no tail to slide
+        for length in [15, 16, 27]:
+            self.assert_state_matches_calculate_adx(length)
+
+    def test_batch_matches_calculate_adx(self):
+        high = [candle.high for candle in self.candles]
+        low = [candle.low for candle in self.candles]
+        close = [candle.close for candle in self.candles]
+        batch = calculate_adx_batch(high, low, close, TestADX.PERIOD_THREE_LENGTH)
+        self.assertEqual(batch.shape, (len(self.candles) - TestADX.PERIOD_THREE_LENGTH + 1, 4))
+        for index, values in enumerate(batch):
+            window = self.candles[index:index + TestADX.PERIOD_THREE_LENGTH]
+            np.testing.assert_allclose(values, calculate_adx(window), rtol=1e-12)
+
+    def test_batch_matches_calculate_adx_on_short_windows(self):
+        # Windows with fewer than `period` DX values
+        high = [candle.high for candle in self.candles]
+        low = [candle.low for candle in self.candles]
+        close = [candle.close for candle in self.candles]
+        for length in [15, 20, 27, 28]:
+            batch = calculate_adx_batch(high, low, close, length)
+            self.assertEqual(batch.shape, (len(self.candles) - length + 1, 4))
+            for index, values in enumerate(batch):
+                np.testing.assert_allclose(values, calculate_adx(self.candles[index:index + length]), rtol=1e-12,
+                                           err_msg=f"length {length}")
+
+    def test_window_too_short(self):
+        with self.assertRaises(ValueError):
+            ADXState(14)
+        with self.assertRaises(ValueError):
+            calculate_adx_batch([1.0] * 20, [1.0] * 20, [1.0] * 20, 14)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+from vpa.backtest import average_true_range, backtest, backtest_settings, run_backtest
+from vpa.execution import trade_size
+from vpa.vectorized import candle_arrays, compute_signals
+
+
+def reference_equity(prices, trade_signal, atr, settings):
+    # Bar by bar version of run_backtest's trading rules
+    cash = settings["initial_cash"]
+    side, size, entry_price, stop_price = 0, 0, 0, 0
+    equity = []
+    for bar in range(len(trade_signal)):
+        if side != 0:
+            stopped = prices["low"][bar] <= stop_price if side > 0 else prices["high"][bar] >= stop_price
+            if stopped:
+                exit_price = (min(prices["open"][bar], stop_price) if side > 0
+                              else max(prices["open"][bar], stop_price))
+                cash += side * size * (exit_price - entry_price)
+                side = 0
+        signal = (1 if trade_signal[bar] >= settings["buy_threshold"]
+                  else -1 if trade_signal[bar] <= settings["sell_threshold"] else 0)
+        if signal != 0 and signal != side and bar < len(trade_signal) - 1 and atr[bar] > 0:
+            if side != 0:
+                cash += side * size * (prices["close"][bar] - entry_price)
+            side, entry_price = signal, prices["close"][bar]
+            stop_distance = settings["stop_atr_multiple"] * atr[bar]
+            size = trade_size(cash, settings["risk_per_trade_theory"], settings["risk_per_trade_exposure_max"],
+                              entry_price, stop_distance)
+            stop_price = entry_price - side * stop_distance
+        equity.append(cash + side * size * (prices["close"][bar] - entry_price))
+    return np.array(equity)
+
+
+class TestBacktest(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+
+        self.my_data_frame = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+        self.gbpusd = pd.read_csv(os.path.join(absolute_path, "../data/GBPUSD_D1.csv"), sep="\t", index_col=False,
+                                  names=["Date", "Open", "High", "Low", "Close", "Volume"], skiprows=1,
+                                  usecols=range(6))
+
+    def test_trades_on_known_prices(self):
+        # Long at 10, reversed to short at 12, stopped out at 13, then long again at 11 until the end
+        prices = {
+            "time": np.arange(8),
+            "open": np.array([10, 10, 11, 12, 12, 11, 11, 12.0]),
+            "high": np.array([10, 11, 12, 12, 14, 11, 12, 13.0]),
+            "low": np.array([10, 10, 11, 11, 12, 10, 11, 12.0]),
+            "close": np.array([10, 11, 12, 12, 13, 11, 12, 13.0])
+        }
+        trade_signal = np.array([20, 0, -15, 0, 0, 16, 0, 0.0])
+        atr = np.full(8, 0.5)
+        config = {"backtest": {"initial_cash": 1000, "risk_per_trade_theory": 0.01, "risk_per_trade_exposure_max": 1,
+                               "stop_atr_multiple": 2}}
+        result = run_backtest(prices, trade_signal, atr, config)
+
+        trades = result["trades"]
+        self.assertEqual(list(trades["direction"]), [1, -1, 1])
+        self.assertEqual(list(trades["exit_reason"]), ["signal", "stop", "end"])
+        self.assertEqual(list(trades["entry_price"]), [10, 12, 11])
+        self.assertEqual(list(trades["exit_price"]), [12, 13, 13])
+        # 1% of the cash at risk over a stop of 1
+        self.assertEqual(trades["size"][0], 10)
+        self.assertEqual(trades["pnl"][0], 20)
+        self.assertAlmostEqual(trades["size"][1], 10.2)
+        np.testing.assert_allclose(result["equity"], [1000, 1010, 1020, 1020, 1009.8, 1009.8, 1019.898, 1029.996])
+        self.assertEqual(result["stats"]["trades"], 3)
+        self.assertAlmostEqual(result["stats"]["max_drawdown"], 1009.8 / 1020 - 1)
+
+    def test_stop_gap_fills_at_the_open(self):
+        # Long at 10 with a stop at 9. The next bar opens at 8, below the stop, and fills at that real open rather
+        # than at the candle's adjusted open (the previous close).
+        df = pd.DataFrame({"Date": np.arange(3), "Open": [10, 8, 8.0], "High": [10.5, 9, 9.0], "Low": [9.5, 7.5, 8.0],
+                           "Close": [10, 8.5, 8.5], "Volume": [1, 1, 1.0]})
+        config = dict(self.config, backtest={"initial_cash": 1000, "risk_per_trade_exposure_max": 1,
+                                             "stop_atr_multiple": 1, "atr_length": 1})
+        result = backtest(df, config, {"trade_signal": np.array([20, 0, 0.0])})
+        self.assertEqual(list(result["trades"]["exit_reason"]), ["stop"])
+        self.assertEqual(result["trades"]["exit_price"][0], 8)
+
+    def test_matches_bar_by_bar_simulation(self):
+        result = backtest(self.gbpusd, self.config)
+        self.assertGreater(result["stats"]["trades"], 10)
+
+        candles = candle_arrays(self.gbpusd)
+        settings = backtest_settings(self.config)
+        atr = average_true_range(candles["high"], candles["low"], candles["close"], settings["atr_length"])
+        first = len(self.gbpusd) - len(result["equity"])
+        prices = {name: candles[name][first:] for name in ["high", "low", "close"]}
+        prices["open"] = self.gbpusd["Open"].to_numpy(dtype=float)[first:]
+        trade_signal = compute_signals(self.gbpusd, self.config)["trade_signal"]
+        np.testing.assert_allclose(result["equity"], reference_equity(prices, trade_signal, atr[first:], settings))
+        self.assertEqual(result["drawdown"].max(), 0)
+        self.assertAlmostEqual(result["stats"]["final_equity"], result["equity"][-1])
+
+    def test_signal_table_from_process_data(self):
+        analyzer = MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                                  fixed_df=self.my_data_frame, log_prefix="test_backtest")
+        analyzer.process_data()
+        from_table = backtest(self.my_data_frame, self.config, analyzer.signal_table())
+        vectorized = backtest(self.my_data_frame, self.config)
+        np.testing.assert_array_equal(from_table["equity"], vectorized["equity"])
+        pd.testing.assert_frame_equal(from_table["trades"], vectorized["trades"])
+
+    def test_full_history_under_a_second(self):
+        start = time.perf_counter()
+        backtest(self.gbpusd, self.config)
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
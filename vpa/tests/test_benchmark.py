@@ -0,0 +1,44 @@
+import unittest
+import os
+import json
+from vpa.benchmark import BENCHMARKS, compare, run_benchmarks, write_benchmark_results
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.log_dir = os.path.join(absolute_path, "../log/")
+        os.makedirs(self.log_dir, exist_ok=True)
+
+    def test_run_and_write_results(self):
+        names = ["on_bar[spy_data]", "identify_acc_or_dist[period_three]", "price_option[50]"]
+        results = run_benchmarks(names, repeat=2)
+        self.assertEqual(list(results["results"]), names)
+        for result in results["results"].values():
+            self.assertGreater(result["median"], 0)
+            self.assertLessEqual(result["min"], result["median"])
+            self.assertEqual(result["repeat"], 2)
+
+        file_path = write_benchmark_results(results, os.path.join(self.log_dir, "test_benchmark.json"))
+        with open(file_path, 'r') as file:
+            self.assertEqual(json.load(file), results)
+        os.remove(file_path)
+
+    def test_covers_the_hot_paths(self):
+        for name in ["process_data[spy_data]", "process_data[GBPUSD_D1]", "calculate_adx[period_three]",
+                     "update_percentiles[spy_data]", "identify_acc_or_dist[period_three]", "price_option[100]",
+                     "implied_volatility[50]"]:
+            self.assertIn(name, BENCHMARKS)
+
+    def test_compare_flags_regressions(self):
+        def results(**medians):
+            return {"results": {name: {"median": median} for name, median in medians.items()}}
+        baseline = results(a=1.0, b=1.0, c=1.0)
+        comparison = compare(results(a=1.1, b=1.5, c=0.5, d=1.0), baseline, threshold=0.2)
+        self.assertEqual(list(comparison["status"]), ["ok", "regression", "improvement", "new"])
+        self.assertAlmostEqual(comparison["ratio"][1], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
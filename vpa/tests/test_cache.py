@@ -0,0 +1,106 @@
+import unittest
+import os
+import datetime
+import tempfile
+import numpy as np
+import pandas as pd
+from vpa.cache import OHLCVCache, CachedProvider
+from vpa.data_provider import DataProvider, OHLCV_COLUMNS
+
+
+class DatedFrameProvider(DataProvider):
+    # Fake provider that serves the requested date range of in-memory frames and records each request
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.requests = []
+
+    def fetch(self, tickers, start_date, end_date):
+        self.requests.append((list(tickers), start_date, end_date))
+        frames = {}
+        for ticker in tickers:
+            if ticker in self.frames:
+                df = self.frames[ticker]
+                dates = pd.to_datetime(df["Date"]).dt.tz_localize(None)
+                frames[ticker] = df[(dates >= pd.Timestamp(start_date)) & (dates < pd.Timestamp(end_date))]
+        return frames
+
+
+class TestOHLCVCache(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        spy_data = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        spy_data["Date"] = pd.to_datetime(spy_data["Date"]).dt.tz_localize(None)
+        self.spy_data = spy_data[OHLCV_COLUMNS]
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = OHLCVCache(self.cache_dir.name)
+        self.provider = DatedFrameProvider({"SPY": self.spy_data, "QQQ": self.spy_data})
+        self.cached_provider = CachedProvider(self.provider, self.cache)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def expected(self, start_date, end_date):
+        df = self.spy_data[(self.spy_data["Date"] >= pd.Timestamp(start_date)) & (self.spy_data["Date"] < pd.Timestamp(end_date))]
+        return df.reset_index(drop=True)
+
+    def test_top_up_only_fetches_missing_days(self):
+        start_date, end_date = datetime.date(2023, 1, 1), datetime.date(2023, 3, 1)
+        frames = self.cached_provider.fetch(["SPY", "QQQ"], start_date, end_date)
+        pd.testing.assert_frame_equal(frames["SPY"], self.expected(start_date, end_date), check_dtype=False)
+        self.assertEqual(self.provider.requests, [(["SPY", "QQQ"], start_date, end_date)])
+        self.assertEqual(self.cache.stats(), {"hits": 0, "misses": 2})
+
+        # Same range again comes entirely from disk
+        frames = self.cached_provider.fetch(["SPY", "QQQ"], start_date, end_date)
+        self.assertEqual(len(self.provider.requests), 1)
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 2})
+        pd.testing.assert_frame_equal(frames["QQQ"], self.expected(start_date, end_date), check_dtype=False)
+
+        # A later end date only asks for the days from the last two stored bars on, for both tickers in one batch
+        new_end_date = datetime.date(2023, 4, 1)
+        frames = self.cached_provider.fetch(["SPY", "QQQ"], datetime.date(2023, 2, 1), new_end_date)
+        self.assertEqual(self.provider.requests[-1], (["SPY", "QQQ"], datetime.date(2023, 2, 27), new_end_date))
+        pd.testing.assert_frame_equal(frames["SPY"], self.expected(datetime.date(2023, 2, 1), new_end_date),
+                                      check_dtype=False)
+        self.assertEqual(self.cache.coverage("SPY"), (start_date, new_end_date))
+
+    def test_adjusted_history_change_refetches_full_range(self):
+        start_date, end_date = datetime.date(2023, 1, 1), datetime.date(2023, 3, 1)
+        self.cached_provider.fetch(["SPY", "QQQ"], start_date, end_date)
+
+        # A dividend on SPY rescales its whole adjusted history at the provider; QQQ is unchanged
+        adjusted = self.spy_data.copy()
+        adjusted[["Open", "High", "Low", "Close"]] *= 0.98
+        self.provider.frames["SPY"] = adjusted
+        new_end_date = datetime.date(2023, 4, 1)
+        frames = self.cached_provider.fetch(["SPY", "QQQ"], start_date, new_end_date)
+        self.assertEqual(self.provider.requests[1:], [(["SPY", "QQQ"], datetime.date(2023, 2, 27), new_end_date),
+                                                      (["SPY"], start_date, new_end_date)])
+        expected = adjusted[(adjusted["Date"] >= pd.Timestamp(start_date)) & (adjusted["Date"] < pd.Timestamp(new_end_date))]
+        pd.testing.assert_frame_equal(frames["SPY"], expected.reset_index(drop=True), check_dtype=False)
+        pd.testing.assert_frame_equal(frames["QQQ"], self.expected(start_date, new_end_date), check_dtype=False)
+        self.assertEqual(self.cache.coverage("SPY"), (start_date, new_end_date))
+
+    def test_unknown_ticker_is_not_cached(self):
+        frames = self.cached_provider.fetch(["NONE"], datetime.date(2023, 1, 1), datetime.date(2023, 2, 1))
+        self.assertEqual(frames, {})
+        self.assertIsNone(self.cache.coverage("NONE"))
+
+    def test_evict_and_compact(self):
+        self.cached_provider.fetch(["SPY"], datetime.date(2023, 1, 1), datetime.date(2023, 6, 1))
+        self.cached_provider.fetch(["QQQ"], datetime.date(2023, 1, 1), datetime.date(2023, 6, 1))
+        self.assertEqual(self.cache.tickers(), ["QQQ", "SPY"])
+        self.assertEqual(self.cache.evict(max_tickers=1), ["SPY"])
+        self.assertEqual(self.cache.tickers(), ["QQQ"])
+
+        keep_days = (datetime.datetime.now().date() - datetime.date(2023, 5, 1)).days
+        self.cache.compact(keep_days)
+        records = self.cache.load("QQQ")
+        self.assertGreaterEqual(records["Date"][0], np.datetime64("2023-05-01"))
+        self.assertEqual(self.cache.coverage("QQQ"), (datetime.date(2023, 5, 1), datetime.date(2023, 6, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
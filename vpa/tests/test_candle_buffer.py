@@ -0,0 +1,61 @@
+import unittest
+import os
+import numpy as np
+import pandas as pd
+from vpa.app import Candle
+from vpa.candle_buffer import CandleBuffer
+
+
+class TestCandleBuffer(unittest.TestCase):
+    PERIOD_LENGTHS = {"period_one": 5, "period_two": 25, "period_three": 50}
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        relative_path = "../data/"
+        full_path = os.path.join(absolute_path, relative_path)
+
+        self.my_data_frame = pd.read_csv(full_path + "spy_data.csv")
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+        self.buffer = CandleBuffer(TestCandleBuffer.PERIOD_LENGTHS)
+
+    def test_windows_follow_the_data(self):
+        closes = []
+        for index, row in self.my_data_frame.iterrows():
+            candle = self.buffer.append(row['Date'], row['Volume'], row['Open'], row['High'], row['Low'], row['Close'])
+            closes.append(row['Close'])
+            self.assertEqual(candle.close, row['Close'])
+            for period, length in TestCandleBuffer.PERIOD_LENGTHS.items():
+                window = self.buffer.window(period)
+                self.assertEqual(list(window["close"]), closes[-length:])
+                self.assertEqual(self.buffer.is_full(period), len(closes) >= length)
+        self.assertEqual(self.buffer.count, len(self.my_data_frame))
+        self.assertEqual(len(self.buffer), 50)
+        # The whole buffer for a ticker stays small
+        self.assertLess(self.buffer.nbytes, 16 * 1024)
+
+    def test_windows_are_views(self):
+        for index, row in self.my_data_frame.head(60).iterrows():
+            self.buffer.append(row['Date'], row['Volume'], row['Open'], row['High'], row['Low'], row['Close'])
+        period_one = self.buffer.window("period_one")
+        period_three = self.buffer.window("period_three")
+        self.assertTrue(np.shares_memory(period_one, period_three))
+
+        # Percentiles written to a window are seen by the Candle view of the same row
+        period_one["spread_percentile_period_one"] = 60
+        self.assertEqual(self.buffer.latest().spread_percentiles["period_one"], 60)
+        self.assertEqual(period_three["spread_percentile_period_one"][-1], 60)
+
+    def test_candle_view_matches_candle(self):
+        row = self.my_data_frame.iloc[10]
+        candle = Candle(row['Date'], row['Volume'], row['Open'], row['High'], row['Low'], row['Close'])
+        view = self.buffer.append(row['Date'], row['Volume'], row['Open'], row['High'], row['Low'], row['Close'])
+        for prop in ["time", "open", "high", "low", "close", "volume", "up_bar", "spread", "shooting_star", "hammer", "lld"]:
+            self.assertEqual(getattr(view, prop), getattr(candle, prop), prop)
+        self.assertEqual(str(view), str(candle))
+        with self.assertRaises(KeyError):
+            view.volume_percentiles["period_one"]
+        self.assertEqual(dict(candle.spread_percentiles), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
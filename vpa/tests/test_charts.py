@@ -0,0 +1,89 @@
+import unittest
+import os
+import sys
+import json
+import subprocess
+import tempfile
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+from vpa.charts import ChartRenderer, chart_frames, chart_tickers, render_scan_charts
+
+
+class RecordingRenderer:
+    # Stands in for ChartRenderer and keeps what was submitted instead of drawing it
+
+    def __init__(self):
+        self.submitted = {}
+
+    def submit(self, ticker_symbol, frames, log_dir="log"):
+        self.submitted[ticker_symbol] = frames
+        return frames
+
+
+class TestCharts(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        self.my_data_frame = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+
+    def analyzer(self, config):
+        return MarketAnalyzer(config_path=None, ticker_symbol="SPY", log_level="ERROR", fixed_df=self.my_data_frame,
+                              log_prefix="test_charts", config=config)
+
+    def test_plotting_is_not_imported_up_front(self):
+        root = os.path.join(os.path.dirname(__file__), "../..")
+        output = subprocess.run([sys.executable, "-c", "import sys, vpa.app_runner, vpa.scanner; "
+                                                       "print('mplfinance' in sys.modules, 'matplotlib' in sys.modules)"],
+                                cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False False")
+
+    def test_chart_frames_match_the_analyzer_windows(self):
+        analyzer = self.analyzer(dict(self.config, charts={"enabled": True}))
+        analyzer.process_data()
+        renderer = RecordingRenderer()
+        submitted = analyzer.graph_intervals(renderer)
+        expected = chart_frames(self.my_data_frame, self.config)
+        self.assertEqual(list(submitted), ["period_one", "period_two", "period_three"])
+        for period, df in submitted.items():
+            self.assertEqual(len(df), self.config[f"PERIOD_{period.split('_')[1].upper()}_LENGTH"])
+            pd.testing.assert_frame_equal(df, expected[period], check_dtype=False)
+
+    def test_disabled_in_config(self):
+        # Charts are only drawn when asked for - the shipped config and a config without a "charts" section draw none
+        config = dict(self.config)
+        del config["charts"]
+        for config in [self.config, config, dict(self.config, charts={"enabled": False})]:
+            analyzer = self.analyzer(config)
+            analyzer.process_data()
+            renderer = RecordingRenderer()
+            self.assertEqual(analyzer.graph_intervals(renderer), [])
+            self.assertEqual(renderer.submitted, {})
+
+    def test_background_rendering(self):
+        frames = chart_frames(self.my_data_frame, self.config)
+        with tempfile.TemporaryDirectory() as log_dir:
+            with ChartRenderer(workers=1) as renderer:
+                future = renderer.submit("SPY", {"period_one": frames["period_one"]}, log_dir)
+            self.assertTrue(future.done())
+            self.assertEqual(sorted(os.listdir(log_dir)), ["SPY_period_one_candlestick.png", "SPY_period_one_data.csv"])
+            self.assertEqual(sorted(future.result()), sorted(os.path.join(log_dir, name) for name in os.listdir(log_dir)))
+
+    def test_scan_charts_only_top_and_bottom(self):
+        df_sorted = pd.DataFrame({"ticker": list("ABCDEFG"), "signal_score": [7, 6, 5, 4, 3, 2, 1]})
+        self.assertEqual(chart_tickers(df_sorted, 2), ["A", "B", "F", "G"])
+        self.assertEqual(chart_tickers(df_sorted.head(3), 2), ["A", "B", "C"])
+
+        frames = {ticker: self.my_data_frame for ticker in "ABCDEFG"}
+        renderer = RecordingRenderer()
+        config = dict(self.config, charts={"enabled": True, "scan_rows": 1})
+        self.assertEqual(render_scan_charts(df_sorted, frames, config, "log", renderer), ["A", "G"])
+        self.assertEqual(sorted(renderer.submitted), ["A", "G"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import os
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+from vpa.app import DebugLog
+from vpa.app_runner import MarketAnalyzer
+from vpa.checkpoint import checkpoint_is_current, checkpoint_path, load_checkpoint, read_checkpoint_meta
+from vpa.data_provider import CsvDirectoryProvider
+from vpa.metrics import ScanMetrics
+from vpa.scanner import scan
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        self.gbpusd = pd.read_csv(os.path.join(absolute_path, "../data/GBPUSD_H1_CutDown.csv"), sep="\t",
+                                  index_col=False, names=["Date", "Open", "High", "Low", "Close", "Volume"],
+                                  skiprows=1, usecols=range(6))
+        self.logger = DebugLog.shared(level="ERROR", file_prefix="test_checkpoint")
+        self.checkpoint_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.checkpoint_dir.cleanup()
+
+    def analyzer(self, df, config=None):
+        return MarketAnalyzer(config_path=None, ticker_symbol="GBPUSD", fixed_df=df, config=config or self.config,
+                              logger=self.logger)
+
+    def test_warm_restarts_match_a_full_run(self):
+        # A run a day, each one only adding the bars since the last - including runs before the windows are full
+        path = checkpoint_path(self.checkpoint_dir.name, "GBPUSD")
+        for end in [20, 49, 50, 51, 120, 121, 121, 300, len(self.gbpusd)]:
+            df = self.gbpusd.iloc[:end]
+            self.assertEqual(self.analyzer(df).process_new_data(path), self.analyzer(df).process_data(), end)
+            self.assertEqual(read_checkpoint_meta(path, self.config)["last_time"],
+                             pd.Timestamp(df["Date"].iloc[-1]).isoformat())
+
+        # The restored windows are the ones a full run ends with
+        restored = self.analyzer(self.gbpusd.iloc[:0])
+        restored.set_state(load_checkpoint(path, self.config))
+        full = self.analyzer(self.gbpusd)
+        full.process_data()
+        for name in ["rows", "count", "previous_close", "adx"]:
+            if name == "rows":
+                np.testing.assert_array_equal(restored.state()[name]["close"], full.state()[name]["close"])
+                np.testing.assert_array_equal(restored.state()[name]["spread_percentile_period_one"],
+                                              full.state()[name]["spread_percentile_period_one"])
+            else:
+                self.assertEqual(restored.state()[name], full.state()[name])
+        self.assertLess(os.path.getsize(path), 16 * 1024)
+
+    def test_frame_after_the_checkpoint_starts_again(self):
+        # The bars between the checkpoint and the start of the frame are missing, so the frame is processed in full
+        path = checkpoint_path(self.checkpoint_dir.name, "GBPUSD")
+        self.analyzer(self.gbpusd.iloc[:100]).process_new_data(path)
+        df = self.gbpusd.iloc[150:190]
+        self.assertEqual(self.analyzer(df).process_new_data(path), self.analyzer(df).process_data())
+        self.assertEqual(read_checkpoint_meta(path, self.config)["last_time"],
+                         pd.Timestamp(df["Date"].iloc[-1]).isoformat())
+
+    def test_changed_prices_start_again(self):
+        # A dividend or split rescales the adjusted history, including the bars the checkpoint holds
+        path = checkpoint_path(self.checkpoint_dir.name, "GBPUSD")
+        self.analyzer(self.gbpusd.iloc[:200]).process_new_data(path)
+        df = self.gbpusd.iloc[:220].copy()
+        df[["Open", "High", "Low", "Close"]] *= 0.98
+        self.assertEqual(self.analyzer(df).process_new_data(path), self.analyzer(df).process_data())
+        np.testing.assert_allclose(load_checkpoint(path, self.config)["rows"]["close"], df["Close"].iloc[-50:])
+
+    def test_candle_times_keep_their_type(self):
+        path = checkpoint_path(self.checkpoint_dir.name, "GBPUSD")
+        self.analyzer(self.gbpusd.iloc[:100]).process_new_data(path)
+        self.assertEqual(list(load_checkpoint(path, self.config)["rows"]["time"]), list(self.gbpusd["Date"].iloc[50:100]))
+
+        path = checkpoint_path(self.checkpoint_dir.name, "GBPUSD_UTC")
+        df = self.gbpusd.iloc[:100].copy()
+        df["Date"] = pd.to_datetime(df["Date"]).dt.tz_localize("UTC")
+        self.analyzer(df).process_new_data(path)
+        times = load_checkpoint(path, self.config)["rows"]["time"]
+        self.assertEqual(list(times), list(df["Date"].iloc[50:100]))
+        self.assertIsInstance(times[0], pd.Timestamp)
+
+    def test_other_settings_start_again(self):
+        path = checkpoint_path(self.checkpoint_dir.name, "GBPUSD")
+        self.analyzer(self.gbpusd.iloc[:200]).process_new_data(path)
+        config = dict(self.config, PERCENTILE_MODE="rank")
+        self.assertIsNone(load_checkpoint(path, config))
+        self.assertEqual(self.analyzer(self.gbpusd, config).process_new_data(path),
+                         self.analyzer(self.gbpusd, config).process_data())
+        self.assertIsNotNone(load_checkpoint(path, config))
+        with self.assertRaises(ValueError):
+            self.analyzer(self.gbpusd).set_state(self.analyzer(self.gbpusd, config).state())
+
+    def test_scan_skips_tickers_without_new_bars(self):
+        spy_data = pd.read_csv(os.path.join(os.path.dirname(__file__), "../data/spy_data.csv"))
+        tickers = ["AAA", "BBB", "CCC"]
+        with tempfile.TemporaryDirectory() as data_dir:
+            def write_frames(extra):
+                for offset, ticker in enumerate(tickers):
+                    rows = spy_data.iloc[offset * 20:offset * 20 + 100 + (extra if ticker != "CCC" else 0)]
+                    rows.to_csv(os.path.join(data_dir, f"{ticker}.csv"), index=False)
+                return CsvDirectoryProvider(data_dir)
+
+            first, _ = scan(tickers, self.config_path, workers=2, provider=write_frames(0),
+                            checkpoint_dir=self.checkpoint_dir.name)
+            provider = write_frames(5)
+            self.assertTrue(checkpoint_is_current(checkpoint_path(self.checkpoint_dir.name, "CCC"), self.config,
+                                                  provider.fetch_one("CCC", None, None)))
+            metrics = ScanMetrics()
+            warm, _ = scan(tickers, self.config_path, workers=2, provider=provider, metrics=metrics,
+                           checkpoint_dir=self.checkpoint_dir.name)
+            cold, _ = scan(tickers, self.config_path, workers=2, provider=provider)
+        pd.testing.assert_frame_equal(warm, cold)
+        # CCC had no new bars, so it was not analysed again; the others only added their 5 new bars
+        self.assertEqual(metrics.tickers["CCC"].counter("checkpoint_skips"), 1)
+        self.assertEqual(metrics.tickers["CCC"].counter("bars"), 0)
+        self.assertEqual(metrics.tickers["AAA"].counter("bars"), 5)
+        self.assertEqual(first[first["ticker"] == "CCC"]["signal_score"].item(),
+                         warm[warm["ticker"] == "CCC"]["signal_score"].item())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+from vpa.data_provider import OHLCV_COLUMNS, YahooProvider, FrameProvider
+from vpa.scanner import scan
+
+
+class TestDataProvider(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        self.spy_data = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+
+    def test_split_batched_download(self):
+        # The shape yf.download returns for several tickers with group_by="ticker"
+        dates = pd.DatetimeIndex(pd.to_datetime(self.spy_data["Date"].head(3)), name="Date")
+        fields = ["Open", "High", "Low", "Close", "Volume"]
+        columns = pd.MultiIndex.from_product([["SPY", "BAD"], fields])
+        downloaded = pd.DataFrame(index=dates, columns=columns, dtype=float)
+        for field in fields:
+            downloaded[("SPY", field)] = self.spy_data[field].head(3).to_numpy()
+
+        frames = YahooProvider.split(downloaded, ["SPY", "BAD", "NOT_REQUESTED"])
+        self.assertEqual(list(frames.keys()), ["SPY"])
+        self.assertEqual(list(frames["SPY"].columns), OHLCV_COLUMNS)
+        self.assertEqual(list(frames["SPY"]["Close"]), list(self.spy_data["Close"].head(3)))
+
+    def test_analyzer_uses_provider(self):
+        provider = FrameProvider({"SPY": self.spy_data})
+        analyzer = MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                                  data_provider=provider, log_prefix="test_data_provider")
+        self.assertEqual(provider.requests, [["SPY"]])
+        self.assertEqual(list(analyzer.myDF.columns), OHLCV_COLUMNS)
+
+        fixed = MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                               fixed_df=self.spy_data, log_prefix="test_data_provider")
+        self.assertEqual(analyzer.process_data(), fixed.process_data())
+
+        with self.assertRaises(ValueError):
+            MarketAnalyzer(config_path=self.config_path, ticker_symbol="QQQ", log_level="ERROR",
+                           data_provider=provider, log_prefix="test_data_provider")
+
+    def test_scan_fetches_once(self):
+        provider = FrameProvider({"SPY": self.spy_data, "SPY2": self.spy_data.head(200)})
+        df_sorted, failures = scan(["SPY", "SPY2", "NONE"], self.config_path, workers=2, provider=provider)
+        self.assertEqual(provider.requests, [["SPY", "SPY2", "NONE"]])
+        self.assertEqual(sorted(df_sorted["ticker"]), ["SPY", "SPY2"])
+        self.assertEqual([failure["ticker"] for failure in failures], ["NONE"])
+
+
+if __name__ == '__main__':
+    unittest.main()
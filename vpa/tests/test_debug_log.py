@@ -0,0 +1,71 @@
+import unittest
+import os
+from vpa.app import DebugLog
+
+
+class Unprintable:
+    # Fails the test if a message argument is ever turned into a string
+    def __format__(self, format_spec):
+        raise AssertionError("message was formatted")
+
+    def __str__(self):
+        raise AssertionError("message was formatted")
+
+
+class TestDebugLog(unittest.TestCase):
+    PREFIX = "test_debug_log"
+
+    def setUp(self):
+        self.logger = DebugLog(level="INFO", file_prefix=TestDebugLog.PREFIX, echo=False)
+        self.file_name = self.logger.log_file.name
+
+    def tearDown(self):
+        self.logger.close()
+        if os.path.exists(self.file_name):
+            os.remove(self.file_name)
+
+    def read_lines(self):
+        self.logger.flush()
+        with open(self.file_name, 'r') as file:
+            return [line.rstrip("\n").split(" - ", 2)[1:] for line in file]
+
+    def test_messages_below_level_are_not_formatted(self):
+        self.logger.log("candle: {}", Unprintable(), level="DEBUG")
+        self.logger.log(lambda: str(Unprintable()), level="DEBUG")
+        self.assertFalse(self.logger.is_enabled("DEBUG"))
+        self.assertEqual(self.read_lines(), [])
+
+    def test_lazy_messages(self):
+        self.logger.log("{} change: {:.2f}%", "period_one", 1.23456, level="INFO")
+        self.logger.log(lambda: "built on demand", level="WARN")
+        self.logger.log("no arguments {}", level="ERROR")
+        self.assertEqual(self.read_lines(), [["INFO", "period_one change: 1.23%"], ["WARN", "built on demand"],
+                                             ["ERROR", "no arguments {}"]])
+
+    def test_batched_writes_keep_order(self):
+        for i in range(2000):
+            self.logger.log("message {}", i, level="INFO")
+        self.assertEqual([message for _, message in self.read_lines()], [f"message {i}" for i in range(2000)])
+
+    def test_close_writes_everything(self):
+        self.logger.log("last message", level="INFO")
+        self.logger.close()
+        self.logger.log("after close", level="INFO")
+        with open(self.file_name, 'r') as file:
+            self.assertEqual(file.read().count("message"), 1)
+
+    def test_shared_logger(self):
+        shared = DebugLog.shared(level="ERROR", file_prefix=TestDebugLog.PREFIX + "_shared")
+        try:
+            self.assertIs(DebugLog.shared(level="ERROR", file_prefix=TestDebugLog.PREFIX + "_shared"), shared)
+            self.assertFalse(shared.is_enabled("INFO"))
+            # Asking for a more verbose shared logger lowers its level
+            DebugLog.shared(level="INFO", file_prefix=TestDebugLog.PREFIX + "_shared")
+            self.assertTrue(shared.is_enabled("INFO"))
+        finally:
+            shared.close()
+            os.remove(shared.log_file.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
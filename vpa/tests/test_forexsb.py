@@ -0,0 +1,69 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from vpa.cache import frame_from_records
+from vpa.forexsb import (convert_forexsb_csv, open_forexsb_store, read_forexsb_csv, read_forexsb_tail, store_slice,
+                         store_tail)
+
+
+class TestForexsb(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.csv_path = os.path.join(absolute_path, "../data/GBPUSD_D1.csv")
+        self.full = read_forexsb_csv(self.csv_path)
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_full_file(self):
+        self.assertEqual(list(self.full.columns), ["Date", "Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(len(self.full), 5014)
+        self.assertEqual(self.full["Date"].iloc[0], pd.Timestamp("2009-05-05"))
+        self.assertEqual(self.full["Volume"].iloc[0], 21584)
+
+    def test_tail_matches_full_read(self):
+        for rows, block_size in [(1, 64 * 1024), (51, 64 * 1024), (51, 100), (400, 1000), (5014, 4096)]:
+            expected = self.full.tail(rows).reset_index(drop=True)
+            pd.testing.assert_frame_equal(read_forexsb_tail(self.csv_path, rows, block_size=block_size), expected)
+        # Asking for more rows than there are returns them all, without the header
+        pd.testing.assert_frame_equal(read_forexsb_tail(self.csv_path, 10000, block_size=1000), self.full)
+        self.assertEqual(len(read_forexsb_tail(self.csv_path, 0)), 0)
+
+    def test_tail_line_endings(self):
+        with open(self.csv_path, 'rb') as file:
+            lines = file.read().split(b"\n")[:20]
+        for ending, trailing in [(b"\n", b"\n"), (b"\r\n", b"\r\n"), (b"\r\n", b"")]:
+            path = os.path.join(self.temp_dir.name, "GBPUSD_D1.csv")
+            with open(path, 'wb') as file:
+                file.write(ending.join(lines) + trailing)
+            expected = self.full.head(19).tail(5).reset_index(drop=True)
+            pd.testing.assert_frame_equal(read_forexsb_tail(path, 5, block_size=50), expected)
+
+    def test_memory_mapped_store(self):
+        store_path = convert_forexsb_csv(self.csv_path, os.path.join(self.temp_dir.name, "GBPUSD_D1.npy"))
+        records = open_forexsb_store(self.csv_path, store_path)
+        self.assertIsInstance(records, np.memmap)
+        np.testing.assert_array_equal(records["Date"], self.full["Date"].to_numpy(dtype="datetime64[ns]"))
+        np.testing.assert_array_equal(records["Close"], self.full["Close"])
+
+        selection = store_slice(records, "2020-01-01", "2021-01-01")
+        self.assertTrue(np.shares_memory(selection, records))
+        dates = self.full["Date"]
+        expected = self.full[(dates >= "2020-01-01") & (dates < "2021-01-01")].reset_index(drop=True)
+        frame = frame_from_records(selection)
+        pd.testing.assert_frame_equal(frame[expected.columns], expected, check_dtype=False)
+        self.assertEqual(len(store_tail(records, 51)), 51)
+        self.assertEqual(store_tail(records, 51)["Date"][-1], records["Date"][-1])
+
+        # A store older than its CSV is converted again
+        os.utime(store_path, (0, 0))
+        open_forexsb_store(self.csv_path, store_path)
+        self.assertGreater(os.path.getmtime(store_path), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import os
+import json
+import tempfile
+from unittest import mock
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+from vpa.data_provider import CsvDirectoryProvider
+from vpa.metrics import METRICS_ENV, ScanMetrics, StageMetrics, metrics_format, prometheus_text, write_metrics
+from vpa.scanner import scan
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        self.my_data_frame = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+        self.log_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.log_dir.cleanup()
+
+    def test_stage_metrics(self):
+        metrics = StageMetrics()
+        with metrics.timer("percentiles"):
+            pass
+        with metrics.timer("percentiles"):
+            pass
+        metrics.count("bars", 3)
+        self.assertEqual(metrics.calls("percentiles"), 2)
+        self.assertGreater(metrics.seconds("percentiles"), 0)
+        self.assertEqual(metrics.counter("bars"), 3)
+
+        total = StageMetrics.from_dict(metrics.to_dict()).merge(metrics)
+        self.assertEqual(total.calls("percentiles"), 4)
+        self.assertEqual(total.counter("bars"), 6)
+
+        disabled = StageMetrics(enabled=False)
+        with disabled.timer("percentiles"):
+            disabled.count("bars")
+        self.assertEqual(disabled.to_dict(), {"stages": {}, "counters": {}})
+
+    def test_enabled_by_config_or_environment(self):
+        with mock.patch.dict(os.environ, {METRICS_ENV: ""}):
+            self.assertIsNone(metrics_format(self.config))
+            self.assertEqual(metrics_format(dict(self.config, metrics={"enabled": True, "format": "prometheus"})),
+                             "prometheus")
+        with mock.patch.dict(os.environ, {METRICS_ENV: "json"}):
+            self.assertEqual(metrics_format(self.config), "json")
+        with mock.patch.dict(os.environ, {METRICS_ENV: "off"}):
+            self.assertIsNone(metrics_format(dict(self.config, metrics={"enabled": True})))
+
+    def test_analyzer_stages(self):
+        with mock.patch.dict(os.environ, {METRICS_ENV: "json"}):
+            analyzer = MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                                      fixed_df=self.my_data_frame, log_prefix="test_metrics")
+            analyzer.process_data()
+            metrics = analyzer.metrics()
+            scored = len(analyzer.signal_table())
+            self.assertEqual(metrics.counter("bars"), len(self.my_data_frame))
+            self.assertEqual(metrics.counter("bars_scored"), scored)
+            self.assertEqual(metrics.calls("candles"), len(self.my_data_frame))
+            self.assertEqual(metrics.calls("signals"), scored)
+            self.assertEqual(metrics.calls("process_data"), 1)
+            # The stages are inside process_data
+            stages = ["candles", "percentiles", "adx", "signals", "logging"]
+            self.assertLess(sum(metrics.seconds(stage) for stage in stages), metrics.seconds("process_data"))
+
+            file_path = analyzer.write_metrics(self.log_dir.name)
+            with open(file_path, 'r') as file:
+                self.assertEqual(json.load(file)["tickers"]["SPY"], metrics.to_dict())
+
+        # Off by default
+        analyzer = MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                                  fixed_df=self.my_data_frame, log_prefix="test_metrics")
+        analyzer.process_data()
+        self.assertEqual(analyzer.metrics().to_dict(), {"stages": {}, "counters": {}})
+        self.assertIsNone(analyzer.write_metrics(self.log_dir.name))
+
+    def test_scan_metrics(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            for offset, ticker in enumerate(["AAA", "BBB"]):
+                self.my_data_frame.iloc[offset * 20:offset * 20 + 100].to_csv(os.path.join(data_dir, f"{ticker}.csv"),
+                                                                              index=False)
+            metrics = ScanMetrics()
+            scan(["AAA", "BBB", "MISSING"], self.config_path, workers=2, provider=CsvDirectoryProvider(data_dir),
+                 metrics=metrics)
+        self.assertEqual(sorted(metrics.tickers), ["AAA", "BBB"])
+        self.assertEqual(metrics.scan.calls("download"), 1)
+        self.assertEqual(metrics.scan.counter("failures"), 1)
+        self.assertEqual(metrics.total().counter("bars"), 200)
+
+        text = prometheus_text(metrics.groups())
+        # Each run starts from zero, so every family is a gauge of the run
+        self.assertIn("# TYPE vpa_stage_seconds gauge", text)
+        self.assertNotIn(" counter\n", text)
+        self.assertIn('vpa_events{ticker="AAA",counter="bars"} 100', text)
+        self.assertIn('vpa_stage_calls{scope="scan",stage="download"} 1', text)
+
+        file_path = write_metrics(metrics, self.log_dir.name, "prometheus", name="scan")
+        self.assertEqual(os.path.basename(file_path), "scan_metrics.prom")
+        with open(file_path, 'r') as file:
+            self.assertEqual(file.read(), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+from vpa.app import DebugLog
+from vpa.app_runner import MarketAnalyzer
+from vpa.data_provider import CsvDirectoryProvider
+from vpa.panel import load_panel, panel_scores, panel_signals
+from vpa.scanner import scan
+
+
+class TestPanel(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        spy_data = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        # Histories of different lengths ending on different days, one exactly a window long and one too short
+        self.frames = {f"T{i:02d}": spy_data.iloc[i * 3:i * 3 + 60 + i].reset_index(drop=True) for i in range(20)}
+        self.frames["EXACT"] = spy_data.iloc[:50].reset_index(drop=True)
+        self.frames["SHORT"] = spy_data.iloc[:30].reset_index(drop=True)
+
+    def test_ragged_panel(self):
+        panel = load_panel(self.frames, self.config)
+        self.assertEqual(panel["Close"].shape, (22, 50))
+        self.assertTrue(panel["mask"][:21].all())
+        self.assertEqual(panel["mask"][21].sum(), 30)
+        self.assertFalse(panel["mask"][21, :20].any())
+        self.assertEqual(panel["previous_close"][20], 0)
+        self.assertEqual(panel["previous_close"][0], self.frames["T00"]["Close"].iloc[-51])
+        np.testing.assert_array_equal(panel["Close"][0], self.frames["T00"]["Close"].iloc[-50:])
+
+    def test_matches_the_analyzer(self):
+        logger = DebugLog.shared(level="ERROR", file_prefix="test_panel")
+        signals = panel_signals(load_panel(self.frames, self.config), self.config)
+        for row, (ticker, df) in enumerate(self.frames.items()):
+            analyzer = MarketAnalyzer(config_path=None, ticker_symbol=ticker, fixed_df=df, config=self.config,
+                                      logger=logger)
+            self.assertEqual(signals["trade_signal"][row], analyzer.process_data(), ticker)
+            table = analyzer.signal_table()
+            if len(table):
+                self.assertEqual(signals["flags"][row], table["flags"][-1], ticker)
+                self.assertEqual(signals["time"][row], table["time"][-1], ticker)
+        self.assertEqual(list(signals["complete"]), [True] * 21 + [False])
+        self.assertEqual(panel_scores({}, self.config), {})
+
+    def test_panel_scan(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            for ticker, df in self.frames.items():
+                df.to_csv(os.path.join(data_dir, f"{ticker}.csv"), index=False)
+            provider = CsvDirectoryProvider(data_dir)
+            tickers = list(self.frames) + ["MISSING"]
+            df_sorted, failures = scan(tickers, self.config_path, workers=2, provider=provider)
+            panel_sorted, panel_failures = scan(tickers, self.config_path, provider=provider, panel=True)
+        pd.testing.assert_frame_equal(panel_sorted, df_sorted)
+        self.assertEqual([failure["ticker"] for failure in panel_failures], ["MISSING"])
+
+
+if __name__ == '__main__':
+    unittest.main()
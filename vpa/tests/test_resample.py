@@ -0,0 +1,95 @@
+import unittest
+import os
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+from vpa.resample import BarResampler, MultiTimeframeAnalyzer, period_start, resample_frame
+from vpa.sweep import read_price_csv
+
+
+class TestResample(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        self.hourly = read_price_csv(os.path.join(absolute_path, "../data/GBPUSD_H1_CutDown.csv"))
+        self.daily = read_price_csv(os.path.join(absolute_path, "../data/GBPUSD_D1.csv"))
+
+    def test_period_start(self):
+        self.assertEqual(period_start("2025-05-01 07:00:00", "H4"), datetime(2025, 5, 1, 4))
+        self.assertEqual(period_start("2025-05-01 07:30:00", "D1"), datetime(2025, 5, 1))
+        # Weeks start on Sunday
+        self.assertEqual(period_start("2025-05-04 21:00:00", "W1"), datetime(2025, 5, 4))
+        self.assertEqual(period_start("2025-05-10 12:00:00", "W1"), datetime(2025, 5, 4))
+        with self.assertRaises(ValueError):
+            period_start("2025-05-01 07:00:00", "H2")
+
+    def test_daily_bars_match_the_downloaded_daily_data(self):
+        resampled = resample_frame(self.hourly, "D1")
+        daily = self.daily.assign(Date=pd.to_datetime(self.daily["Date"]))
+        daily = daily[daily["Date"].isin(resampled["Date"])].reset_index(drop=True)
+        self.assertEqual(len(daily), len(resampled))
+        pd.testing.assert_frame_equal(resampled, daily, check_dtype=False)
+
+    def test_streaming_matches_batch(self):
+        for timeframe in ["H4", "D1", "W1"]:
+            for source_timeframe in [None, "H1"]:
+                resampler = BarResampler(timeframe, source_timeframe)
+                bars = []
+                for row in self.hourly.itertuples():
+                    bars.extend(resampler.update(row.Date, row.Open, row.High, row.Low, row.Close, row.Volume))
+                last = resampler.flush()
+                if last is not None:
+                    bars.append(last)
+                expected = resample_frame(self.hourly, timeframe)
+                self.assertEqual(bars, list(expected.itertuples(index=False, name=None)))
+
+    def test_bar_completes_on_its_last_source_bar(self):
+        resampler = BarResampler("H4", "H1")
+        self.assertEqual(resampler.update("2025-05-01 00:00:00", 1, 2, 0.5, 1.5, 10), [])
+        self.assertEqual(resampler.update("2025-05-01 01:00:00", 1.5, 3, 1, 2, 20), [])
+        # 02:00 is missing, 03:00 ends the period
+        self.assertEqual(resampler.update("2025-05-01 03:00:00", 2, 2.5, 0.2, 1, 5),
+                         [(datetime(2025, 5, 1), 1, 3, 0.2, 1, 35)])
+        self.assertIsNone(resampler.partial)
+        # Without a source timeframe the bar is only known to be complete when the next period starts
+        resampler = BarResampler("H4")
+        self.assertEqual(resampler.update("2025-05-01 03:00:00", 2, 2.5, 0.2, 1, 5), [])
+        self.assertEqual(resampler.update("2025-05-01 04:00:00", 1, 1, 1, 1, 1),
+                         [(datetime(2025, 5, 1), 2, 2.5, 0.2, 1, 5)])
+
+    def test_analyzer_per_timeframe_from_one_stream(self):
+        timeframes = ("H1", "H4")
+        analyzer = MultiTimeframeAnalyzer(self.config, timeframes, source_timeframe="H1",
+                                          history=self.hourly.iloc[:150], log_level="ERROR",
+                                          log_prefix="test_resample")
+        streamed = {timeframe: [] for timeframe in timeframes}
+        for row in self.hourly.iloc[150:].itertuples():
+            for timeframe, signals in analyzer.on_bar(row.Date, row.Open, row.High, row.Low, row.Close,
+                                                      row.Volume).items():
+                streamed[timeframe].append(signals)
+        # The last H4 bar is cut short by the end of the data
+        for timeframe, signals in analyzer.flush().items():
+            streamed[timeframe].append(signals)
+        self.assertEqual(len(streamed["H1"]), len(self.hourly) - 150)
+
+        for timeframe in timeframes:
+            # H4 is still filling its windows at the start of the stream
+            scored = [signals for signals in streamed[timeframe] if signals is not None]
+            batch = MarketAnalyzer(config_path=self.config_path, log_level="ERROR", log_prefix="test_resample",
+                                   fixed_df=resample_frame(self.hourly, timeframe))
+            batch.process_data()
+            table = batch.signal_table()
+            self.assertGreater(len(scored), 0)
+            self.assertEqual([signals["time"] for signals in scored], list(table["time"][-len(scored):]))
+            np.testing.assert_array_equal([signals["trade_signal"] for signals in scored],
+                                          table["trade_signal"][-len(scored):])
+
+
+if __name__ == '__main__':
+    unittest.main()
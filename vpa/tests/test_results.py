@@ -0,0 +1,70 @@
+import unittest
+import os
+import random
+import tempfile
+import pandas as pd
+from vpa.results import ScanResultSink, read_results
+
+
+class TestResults(unittest.TestCase):
+
+    def results(self, count, seed=1):
+        # Scores rounded to whole numbers so plenty of them tie and the ticker decides the order
+        generator = random.Random(seed)
+        return [{"ticker": f"T{i:04d}", "signal_score": float(generator.randint(-20, 20)), "error": None}
+                for i in generator.sample(range(count), count)]
+
+    def sorted_frame(self, results):
+        # How scanner.scan orders the results
+        df = pd.DataFrame([{"ticker": result["ticker"], "signal_score": result["signal_score"]} for result in results])
+        return df.sort_values(by=['signal_score', 'ticker'], ascending=[False, True]).reset_index(drop=True)
+
+    def test_top_and_bottom_match_a_full_sort(self):
+        results = self.results(500)
+        sink = ScanResultSink(rows=5)
+        for result in results:
+            sink.add(result)
+        df_sorted = self.sorted_frame(results)
+        ranked = sink.ranked()
+        self.assertEqual(sink.count, 500)
+        pd.testing.assert_frame_equal(ranked.head(5), df_sorted.head(5))
+        pd.testing.assert_frame_equal(ranked.tail(5), df_sorted.tail(5))
+        self.assertEqual(list(ranked.index), [0, 1, 2, 3, 4, 495, 496, 497, 498, 499])
+
+    def test_small_scans_rank_everything(self):
+        for count in [0, 1, 3, 7, 10]:
+            results = self.results(count, seed=count)
+            sink = ScanResultSink(rows=5)
+            for result in results:
+                sink.add(result)
+            expected = self.sorted_frame(results) if count else pd.DataFrame(columns=["ticker", "signal_score"])
+            pd.testing.assert_frame_equal(sink.ranked(), expected, check_dtype=False, check_index_type=False)
+
+    def test_columnar_file(self):
+        results = self.results(50)
+        failure = {"ticker": "BAD", "signal_score": None, "error": "ValueError: No data returned for BAD"}
+        with tempfile.TemporaryDirectory() as path:
+            with ScanResultSink(os.path.join(path, "scan"), rows=2) as sink:
+                for result in results[:25] + [failure] + results[25:]:
+                    sink.add(result)
+            self.assertEqual(sink.failures, [failure])
+            df = read_results(os.path.join(path, "scan"))
+            self.assertEqual(list(df["ticker"]), [result["ticker"] for result in results])
+            self.assertEqual(list(df["signal_score"]), [result["signal_score"] for result in results])
+
+            # Appending to the same directory carries on where the last scan left off, and a row a crash left
+            # half written is ignored
+            with ScanResultSink(os.path.join(path, "scan")) as sink:
+                sink.add({"ticker": "ZZZ", "signal_score": 1.5, "error": None})
+            with open(os.path.join(path, "scan", "ticker.S16"), "ab") as file:
+                file.write(b"PARTIAL".ljust(16, b"\0"))
+            df = read_results(os.path.join(path, "scan"))
+            self.assertEqual(len(df), 51)
+            self.assertEqual(df.iloc[-1].tolist(), ["ZZZ", 1.5])
+
+            with self.assertRaises(ValueError):
+                ScanResultSink(os.path.join(path, "long")).add({"ticker": "X" * 17, "signal_score": 0.0, "error": None})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import os
+import numpy as np
+import pandas as pd
+from vpa.rolling import RollingPercentile
+from vpa.vectorized import rolling_percentile_ranks
+
+
+class TestRollingPercentile(unittest.TestCase):
+    WINDOW_LENGTH = 25
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        relative_path = "../data/"
+        full_path = os.path.join(absolute_path, relative_path)
+
+        self.my_data_frame = pd.read_csv(full_path + "spy_data.csv")
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+
+    def test_bucketed_matches_np_percentile(self):
+        # The bucketed mode must give exactly the percentiles update_percentiles used to calculate every bar
+        rolling = RollingPercentile(TestRollingPercentile.WINDOW_LENGTH)
+        for volume in self.my_data_frame["Volume"]:
+            rolling.push(volume)
+            window = list(rolling.values)
+            steps = np.percentile(window, range(5, 100, 5))
+            self.assertEqual(rolling.steps(), list(steps))
+            expected = [5 + 5 * sum(1 for step in steps if value <= step) for value in window]
+            self.assertEqual(list(rolling.ranks()), expected)
+            self.assertEqual(rolling.rank(volume), expected[-1])
+            for threshold in [0, 40, 55, 70, 95]:
+                self.assertEqual(rolling.count_above(threshold), sum(1 for rank in expected if rank > threshold))
+        self.assertEqual(len(rolling), TestRollingPercentile.WINDOW_LENGTH)
+
+    def test_rank_mode(self):
+        rolling = RollingPercentile(5, mode="rank")
+        for value in [3.0, 1.0, 2.0, 2.0, 5.0, 4.0]:
+            rolling.push(value)
+        self.assertEqual(list(rolling.values), [1.0, 2.0, 2.0, 5.0, 4.0])
+        self.assertEqual(list(rolling.ranks()), [20.0, 60.0, 60.0, 100.0, 80.0])
+        self.assertEqual(list(rolling.ranks(np.array([1.0, 2.0, 2.0, 5.0, 4.0]))), [20.0, 60.0, 60.0, 100.0, 80.0])
+        self.assertEqual(rolling.rank(2.0), 60.0)
+        self.assertEqual(rolling.count_above(59), 4)
+        self.assertEqual(rolling.count_above(60), 2)
+        self.assertEqual(rolling.count_above(100), 0)
+
+    def test_vectorized_ranks_match(self):
+        spreads = (self.my_data_frame["Close"] - self.my_data_frame["Open"]).abs().to_numpy()
+        for mode in ["bucketed", "rank"]:
+            rolling = RollingPercentile(TestRollingPercentile.WINDOW_LENGTH, mode=mode)
+            vectorized = rolling_percentile_ranks(spreads, TestRollingPercentile.WINDOW_LENGTH, 5, 5, mode)
+            for index, spread in enumerate(spreads):
+                rolling.push(spread)
+                if index >= TestRollingPercentile.WINDOW_LENGTH - 1:
+                    np.testing.assert_array_equal(rolling.ranks(),
+                                                  vectorized[index - TestRollingPercentile.WINDOW_LENGTH + 1])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            RollingPercentile(5, mode="nearest")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import os
+import json
+import numpy as np
+import pandas as pd
+from vpa.app import PERIODS, identify_acc_or_dist_arrays
+from vpa.candle_buffer import CandleBuffer
+from vpa.rolling import RollingPercentile
+from vpa.rule_plan import (ACC_DIST_VOLUME_PERCENTILE, ACC_DIST_LOW_PRICE_PERCENTILE, ACC_DIST_HIGH_PRICE_PERCENTILE,
+                           RulePlan, acc_or_dist)
+from vpa.signal_table import FLAG_BITS, signal_labels
+
+
+class TestRulePlan(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        with open(os.path.join(absolute_path, "../config/config.json"), 'r') as file:
+            self.config = json.load(file)
+        self.my_data_frame = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.plan = RulePlan(self.config)
+
+    def test_config_is_compiled_per_period(self):
+        for index, period in enumerate(PERIODS):
+            parameters = self.config["trading_parameters"][period]
+            self.assertEqual(self.plan.signal_bar_count[index], parameters["Signal_Bar_Count"])
+            self.assertEqual(self.plan.high_spread_threshold[index], parameters["High_Spread_Threshold"])
+            self.assertEqual(self.plan.anomaly_threshold[index], parameters["Anomaly_Threshold"])
+            self.assertEqual(self.plan.bear_bar_count[index],
+                             self.config["PERIOD_ONE_LENGTH"] - parameters["Signal_Bar_Count"])
+            self.assertEqual(self.plan.in_window[:, index].sum(), self.config[f"PERIOD_{period[7:].upper()}_LENGTH"])
+        self.assertEqual(self.plan.longest_period, "period_three")
+
+    def test_bar_counts_match_each_window(self):
+        # Random percentiles in a buffer, counted by the plan and window by window
+        buffer = CandleBuffer({period: int(length) for period, length in zip(PERIODS, self.plan.lengths)})
+        rng = np.random.default_rng(1)
+        for row in self.my_data_frame.head(80).itertuples():
+            buffer.append(row.Date, row.Volume, row.Open, row.High, row.Low, row.Close)
+            for period in PERIODS:
+                window = buffer.window(period)
+                window[f"spread_percentile_{period}"] = rng.integers(1, 20, len(window)) * 5
+                window[f"volume_percentile_{period}"] = rng.integers(1, 20, len(window)) * 5
+
+        counts = self.plan.bar_counts(buffer.window(self.plan.longest_period)["up_bar"], buffer.percentiles("spread"),
+                                      buffer.percentiles("volume"))
+        for index, period in enumerate(PERIODS):
+            window = buffer.window(period)
+            spread, volume = window[f"spread_percentile_{period}"], window[f"volume_percentile_{period}"]
+            expected = [window["up_bar"].sum(), (spread > self.plan.high_spread_threshold[index]).sum(),
+                        (volume > self.plan.high_volume_threshold[index]).sum(),
+                        (np.abs(spread - volume) > self.plan.anomaly_threshold[index]).sum()]
+            self.assertEqual([count[index] for count in counts], expected)
+
+    def test_acc_or_dist_matches_percentiles(self):
+        volumes = self.my_data_frame["Volume"].to_numpy(dtype=float)
+        closes = self.my_data_frame["Close"].to_numpy(dtype=float)
+        length, short_length = self.config["PERIOD_THREE_LENGTH"], self.config["PERIOD_ONE_LENGTH"]
+        rolling_volumes, rolling_closes = RollingPercentile(length), RollingPercentile(length)
+        found = set()
+        for end in range(len(volumes)):
+            rolling_volumes.push(volumes[end])
+            rolling_closes.push(closes[end])
+            if end + 1 < length:
+                continue
+            window = slice(end + 1 - length, end + 1)
+            _, expected = identify_acc_or_dist_arrays(volumes[window], closes[window],
+                                                      volumes[end + 1 - short_length:end + 1], closes[end])
+            result = acc_or_dist(volumes[end + 1 - short_length:end + 1], closes[end],
+                                 rolling_volumes.quantile(ACC_DIST_VOLUME_PERCENTILE / 100),
+                                 rolling_closes.quantile(ACC_DIST_LOW_PRICE_PERCENTILE / 100),
+                                 rolling_closes.quantile(ACC_DIST_HIGH_PRICE_PERCENTILE / 100))
+            self.assertEqual(result, expected)
+            found.add(result)
+        self.assertEqual(found, {"", "Acc", "Dist"})
+
+    def test_signal_labels(self):
+        flags = (FLAG_BITS["wide_spread_period_two"] | FLAG_BITS["high_volume_period_two"] | FLAG_BITS["hammer"]
+                 | FLAG_BITS["trending"] | FLAG_BITS["trending_down"] | FLAG_BITS["bear_period_one"]
+                 | FLAG_BITS["volume_backed_period_one"] | FLAG_BITS["distribution"] | FLAG_BITS["test_fail"])
+        self.assertEqual(signal_labels(flags), {
+            "single_candle_signals": ["Down Bar", "Wide Spread (period_two)", "High Volume (period_two)", "Hammer"],
+            "trend_signals": ["Market is trending", "Trending Down"],
+            "multiple_bar_signals": ["Bear Signal (period_one)", "Volume Backed (period_one)"],
+            "acc_dist_signals": ["Possible Dist", "Test Fail"]
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from vpa.scanner import COMBINED, load_tickers, load_universes, scan, scan_to_sink, scan_universes, write_report
+from vpa.results import ScanResultSink, read_results
+from vpa.data_provider import CsvDirectoryProvider
+
+
+class TestScanner(unittest.TestCase):
+    TICKERS = ["AAA", "BBB", "CCC", "DDD"]
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+
+        spy_data = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.data_dir = tempfile.TemporaryDirectory()
+        # A different slice of the SPY history for each ticker so the scores differ
+        for offset, ticker in enumerate(TestScanner.TICKERS):
+            spy_data.iloc[offset * 20:offset * 20 + 100].to_csv(os.path.join(self.data_dir.name, f"{ticker}.csv"),
+                                                                index=False)
+        self.provider = CsvDirectoryProvider(self.data_dir.name)
+
+    def tearDown(self):
+        self.data_dir.cleanup()
+
+    def test_load_tickers(self):
+        tickers = load_tickers(os.path.join(os.path.dirname(__file__), "../data/SP500-tickers.csv"))
+        self.assertEqual(tickers[:3], ["MSFT", "AAPL", "NVDA"])
+        self.assertNotIn("BRK.B", tickers)
+
+        # The exchange suffix of the FTSE list is kept
+        universes = load_universes({"SP500": {"file": "SP500-tickers.csv"},
+                                    "FTSE": {"file": "FTSE_tickers.csv", "replace_dots": False}},
+                                   os.path.join(os.path.dirname(__file__), "../data/"))
+        self.assertIn("BRK-B", universes["SP500"])
+        self.assertEqual(universes["FTSE"][:2], ["III.L", "ADM.L"])
+        with self.assertRaises(ValueError):
+            load_universes({COMBINED: {"file": "SP500-tickers.csv"}}, "")
+
+    def test_parallel_scan_matches_serial(self):
+        serial, serial_failures = scan(TestScanner.TICKERS + ["MISSING"], self.config_path, workers=1,
+                                       provider=self.provider)
+        parallel, parallel_failures = scan(TestScanner.TICKERS + ["MISSING"], self.config_path, workers=3,
+                                           provider=self.provider)
+        pd.testing.assert_frame_equal(serial, parallel)
+        self.assertEqual(sorted(serial["ticker"]), TestScanner.TICKERS)
+        self.assertTrue(serial["signal_score"].is_monotonic_decreasing)
+        # The missing ticker fails on its own without stopping the scan
+        self.assertEqual([failure["ticker"] for failure in parallel_failures], ["MISSING"])
+
+        vectorized, vectorized_failures = scan(TestScanner.TICKERS, self.config_path, workers=2,
+                                               provider=self.provider, vectorized=True)
+        pd.testing.assert_frame_equal(serial, vectorized)
+
+    def test_write_report(self):
+        df_sorted, failures = scan(TestScanner.TICKERS + ["MISSING"], self.config_path, workers=2,
+                                   provider=self.provider)
+        with tempfile.TemporaryDirectory() as log_dir:
+            with open(write_report(df_sorted, failures, log_dir, rows=2)) as report:
+                text = report.read()
+        self.assertIn("Top 2 rows:", text)
+        self.assertIn("Bottom 2 rows:", text)
+        self.assertIn("MISSING: ValueError: No data returned for MISSING", text)
+
+    def test_scan_to_sink_matches_scan(self):
+        df_sorted, failures = scan(TestScanner.TICKERS + ["MISSING"], self.config_path, workers=2,
+                                   provider=self.provider)
+        with tempfile.TemporaryDirectory() as path:
+            with ScanResultSink(path, rows=1) as sink:
+                scan_to_sink(TestScanner.TICKERS + ["MISSING"], self.config_path, sink, workers=2,
+                             provider=self.provider)
+            pd.testing.assert_frame_equal(sink.ranked(), df_sorted.iloc[[0, -1]])
+            self.assertEqual(sink.failures, failures)
+            streamed = read_results(path).sort_values(by=['signal_score', 'ticker'], ascending=[False, True])
+            pd.testing.assert_frame_equal(streamed.reset_index(drop=True), df_sorted)
+
+    def test_scan_universes(self):
+        universes = {"US": ["AAA", "BBB", "CCC"], "UK": ["CCC", "DDD", "MISSING"]}
+        df_sorted, failures = scan(TestScanner.TICKERS + ["MISSING"], self.config_path, workers=2,
+                                   provider=self.provider)
+        with tempfile.TemporaryDirectory() as path:
+            sinks = scan_universes(universes, self.config_path, rows=5, results_dir=path, workers=2,
+                                   provider=self.provider, source_limits={"US": 1, "UK": 1})
+            # CCC is in both lists but only analysed once
+            self.assertEqual(len(read_results(os.path.join(path, COMBINED))), 4)
+        self.assertEqual(list(sinks), [COMBINED, "US", "UK"])
+        pd.testing.assert_frame_equal(sinks[COMBINED].ranked(), df_sorted)
+        self.assertEqual(sinks[COMBINED].failures, failures)
+        for name, tickers in universes.items():
+            expected = df_sorted[df_sorted["ticker"].isin(tickers)].reset_index(drop=True)
+            pd.testing.assert_frame_equal(sinks[name].ranked(), expected)
+        self.assertEqual([failure["ticker"] for failure in sinks["UK"].failures], ["MISSING"])
+        self.assertEqual(sinks["US"].failures, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
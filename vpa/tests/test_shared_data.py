@@ -0,0 +1,69 @@
+import unittest
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from vpa.cache import records_from_frame
+from vpa.data_provider import CsvDirectoryProvider
+from vpa.scanner import scan
+from vpa.shared_data import SharedMarketData
+
+
+def _attached_closes(descriptor, ticker):
+    # Runs in a worker process
+    with SharedMarketData.attach(descriptor) as shared:
+        return shared.frame(ticker)["Close"].tolist()
+
+
+class TestSharedData(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        spy_data = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.frames = {f"T{i}": spy_data.iloc[i * 20:i * 20 + 60 + i].reset_index(drop=True) for i in range(4)}
+        self.frames["EMPTY"] = spy_data.iloc[:0]
+
+    def test_rows_and_index(self):
+        with SharedMarketData.create(self.frames) as shared:
+            self.assertEqual(shared.tickers, list(self.frames))
+            self.assertEqual(len(shared.records("EMPTY")), 0)
+            for ticker, df in self.frames.items():
+                np.testing.assert_array_equal(shared.records(ticker), records_from_frame(df))
+                self.assertEqual(shared.frame(ticker)["Close"].tolist(), df["Close"].tolist())
+            # Views of the block rather than copies
+            self.assertFalse(shared.records("T1").flags.owndata)
+            self.assertTrue(np.shares_memory(shared.frame("T1")["Close"].to_numpy(), shared.records("T1")))
+        with SharedMarketData.create({}) as shared:
+            self.assertEqual(len(shared), 0)
+
+    @unittest.skipUnless(os.path.isdir("/dev/shm"), "no /dev/shm on this platform")
+    def test_block_is_freed(self):
+        with SharedMarketData.create(self.frames) as shared:
+            name = shared.descriptor()[0]
+            self.assertTrue(os.path.exists(os.path.join("/dev/shm", name)))
+        self.assertFalse(os.path.exists(os.path.join("/dev/shm", name)))
+
+    def test_attach_from_another_process(self):
+        with SharedMarketData.create(self.frames) as shared:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                closes = executor.submit(_attached_closes, shared.descriptor(), "T2").result()
+        self.assertEqual(closes, self.frames["T2"]["Close"].tolist())
+
+    def test_scan_from_shared_memory(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            for ticker, df in self.frames.items():
+                if len(df):
+                    df.to_csv(os.path.join(data_dir, f"{ticker}.csv"), index=False)
+            provider = CsvDirectoryProvider(data_dir)
+            shared, shared_failures = scan(list(self.frames), self.config_path, workers=2, provider=provider)
+            pickled, pickled_failures = scan(list(self.frames), self.config_path, workers=2, provider=provider,
+                                             shared_memory=False)
+        pd.testing.assert_frame_equal(shared, pickled)
+        self.assertEqual(shared_failures, pickled_failures)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import json
+import numpy as np
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+from vpa.signal_table import (SIGNAL_FLAGS, FLAG_BITS, SIGNAL_TABLE_DTYPE, flag_mask, flag_names, signal_frame)
+
+
+class TestSignalTable(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+
+        self.my_data_frame = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+
+    def analyzer(self):
+        return MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                              fixed_df=self.my_data_frame, log_prefix="test_signal_table")
+
+    def test_flags_fit_the_table(self):
+        self.assertEqual(len(SIGNAL_FLAGS), len(set(SIGNAL_FLAGS)))
+        self.assertLessEqual(len(SIGNAL_FLAGS), 8 * SIGNAL_TABLE_DTYPE["flags"].itemsize)
+
+    def test_process_data_records_every_bar(self):
+        analyzer = self.analyzer()
+        trade_signal = analyzer.process_data()
+        table = analyzer.signal_table()
+
+        self.assertEqual(table.dtype, SIGNAL_TABLE_DTYPE)
+        self.assertEqual(len(table), len(self.my_data_frame) - self.config["PERIOD_THREE_LENGTH"] + 1)
+        self.assertEqual(table["time"][-1], self.my_data_frame["Date"].iloc[-1])
+        self.assertEqual(table["trade_signal"][-1], trade_signal)
+        np.testing.assert_array_equal(table["trade_signal"],
+                                      table["single_candle_signal_score"] + table["trend_signal_score"]
+                                      + table["multiple_bar_signal_score"] + table["acc_dist_signal_score"])
+
+        # The flags agree with the scores they contributed to
+        np.testing.assert_array_equal(table["trend_signal_score"] == 5, flag_mask(table, "trending_up"))
+        np.testing.assert_array_equal(table["trend_signal_score"] == -5, flag_mask(table, "trending_down"))
+        np.testing.assert_array_equal(table["acc_dist_signal_score"] != 0,
+                                      flag_mask(table, "accumulation") | flag_mask(table, "distribution"))
+        self.assertFalse((flag_mask(table, "hammer") & flag_mask(table, "shooting_star")).any())
+        self.assertTrue(flag_mask(table, "up_bar").any())
+
+    def test_vectorized_table_matches_process_data(self):
+        analyzer = self.analyzer()
+        analyzer.process_data()
+        loop_table = analyzer.signal_table()
+
+        analyzer = self.analyzer()
+        analyzer.process_data_vectorized()
+        vectorized_table = analyzer.signal_table()
+
+        self.assertEqual(len(vectorized_table), len(loop_table))
+        for name in SIGNAL_TABLE_DTYPE.names:
+            np.testing.assert_array_equal(vectorized_table[name], loop_table[name], err_msg=name)
+
+    def test_signal_frame(self):
+        analyzer = self.analyzer()
+        analyzer.process_data_vectorized()
+        table = analyzer.signal_table()
+        df = signal_frame(table, expand_flags=True)
+        self.assertEqual(len(df), len(table))
+        self.assertEqual(list(df.columns), list(SIGNAL_TABLE_DTYPE.names) + SIGNAL_FLAGS)
+
+        last = df.iloc[-1]
+        self.assertEqual(flag_names(last["flags"]), [name for name in SIGNAL_FLAGS if last[name]])
+
+    def test_flag_names(self):
+        self.assertEqual(flag_names(FLAG_BITS["hammer"] | FLAG_BITS["climax"]), ["hammer", "climax"])
+        self.assertEqual(flag_names(0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import os
+import time
+import numpy as np
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        self.gbpusd = pd.read_csv(os.path.join(absolute_path, "../data/GBPUSD_H1_CutDown.csv"), sep="\t",
+                                  index_col=False, names=["Date", "Open", "High", "Low", "Close", "Volume"],
+                                  skiprows=1, usecols=range(6))
+
+    def analyzer(self, df):
+        return MarketAnalyzer(config_path=self.config_path, ticker_symbol="GBPUSD", log_level="ERROR", fixed_df=df,
+                              log_prefix="test_streaming")
+
+    def test_on_bar_matches_process_data(self):
+        batch = self.analyzer(self.gbpusd)
+        batch.process_data()
+        table = batch.signal_table()
+
+        # Warm up on the first 100 bars, then stream the rest one bar at a time
+        streaming = self.analyzer(self.gbpusd.iloc[:100])
+        streaming.process_data()
+        streamed = [streaming.on_bar(row.Date, row.Open, row.High, row.Low, row.Close, row.Volume)
+                    for row in self.gbpusd.iloc[100:].itertuples()]
+
+        tail = table[-len(streamed):]
+        self.assertEqual([signals["time"] for signals in streamed], list(tail["time"]))
+        np.testing.assert_array_equal([signals["trade_signal"] for signals in streamed], tail["trade_signal"])
+        np.testing.assert_array_equal([signals["flags"] for signals in streamed], tail["flags"])
+
+    def test_on_bar_without_history(self):
+        # With no history every bar is streamed and nothing is scored until the period_three window is full
+        analyzer = self.analyzer(self.gbpusd)
+        streamed = [analyzer.on_bar(row.Date, row.Open, row.High, row.Low, row.Close, row.Volume)
+                    for row in self.gbpusd.itertuples()]
+        batch = self.analyzer(self.gbpusd)
+        batch.process_data()
+        table = batch.signal_table()
+
+        warm_up = len(self.gbpusd) - len(table)
+        self.assertTrue(all(signals is None for signals in streamed[:warm_up]))
+        np.testing.assert_array_equal([signals["trade_signal"] for signals in streamed[warm_up:]],
+                                      table["trade_signal"])
+
+    def test_on_bar_latency(self):
+        streaming = self.analyzer(self.gbpusd.iloc[:100])
+        streaming.process_data()
+        rows = list(self.gbpusd.iloc[100:].itertuples())
+        start = time.perf_counter()
+        for row in rows:
+            streaming.on_bar(row.Date, row.Open, row.High, row.Low, row.Close, row.Volume)
+        self.assertLess((time.perf_counter() - start) / len(rows), 0.002)
+
+
+if __name__ == '__main__':
+    unittest.main()
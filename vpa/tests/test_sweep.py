@@ -0,0 +1,93 @@
+import unittest
+import os
+import json
+import numpy as np
+import pandas as pd
+from vpa.backtest import backtest
+from vpa.sweep import apply_parameters, evaluate, grid_search, random_search, run_sweep, set_parameter
+
+
+class TestSweep(unittest.TestCase):
+    SPACE = {
+        "PERIOD_TWO_LENGTH": [20, 25],
+        "trading_parameters.*.High_Volume_Threshold": [50, 60],
+        "trading_parameters.period_three.Signal_Bar_Count": [24, 26, 28]
+    }
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        with open(os.path.join(absolute_path, "../config/config.json"), 'r') as file:
+            self.config = json.load(file)
+        self.my_data_frame = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+
+    def test_set_parameter(self):
+        config = apply_parameters(self.config, {"trading_parameters.*.Anomaly_Threshold": 30,
+                                                "trading_parameters.period_two.Signal_Bar_Count": 10,
+                                                "PERCENTILE_START": 10})
+        self.assertEqual([config["trading_parameters"][key]["Anomaly_Threshold"] for key in config["trading_parameters"]],
+                         [30, 30, 30])
+        self.assertEqual(config["trading_parameters"]["period_two"]["Signal_Bar_Count"], 10)
+        self.assertEqual(config["PERCENTILE_START"], 10)
+        # The original config is left alone
+        self.assertEqual(self.config["trading_parameters"]["period_one"]["Anomaly_Threshold"], 20)
+
+        config = {"a": {"b": 1}}
+        set_parameter(config, "a.b", 2)
+        self.assertEqual(config, {"a": {"b": 2}})
+
+    def test_search_spaces(self):
+        grid = grid_search(TestSweep.SPACE)
+        self.assertEqual(len(grid), 12)
+        self.assertEqual(len({tuple(parameters.values()) for parameters in grid}), 12)
+
+        sample = random_search(TestSweep.SPACE, 5, seed=3)
+        self.assertEqual(len(sample), 5)
+        self.assertEqual(len({tuple(parameters.values()) for parameters in sample}), 5)
+        self.assertTrue(all(parameters in grid for parameters in sample))
+        self.assertEqual(random_search(TestSweep.SPACE, 5, seed=3), sample)
+        self.assertEqual(random_search(TestSweep.SPACE, 50), grid)
+
+    def test_shared_features_match_separate_backtests(self):
+        parameter_sets = grid_search(TestSweep.SPACE)
+        rows = evaluate(self.my_data_frame, self.config, parameter_sets)
+        for parameters, row in zip(parameter_sets, rows):
+            stats = backtest(self.my_data_frame, apply_parameters(self.config, parameters))["stats"]
+            self.assertIsNone(row["error"])
+            self.assertEqual({key: row[key] for key in parameters}, parameters)
+            self.assertEqual(row["total_return"], stats["total_return"])
+            self.assertEqual(row["trades"], stats["trades"])
+
+    def test_shared_cache_across_period_three_lengths(self):
+        # The ranks of the shorter periods depend on the period_three window they are taken from
+        parameter_sets = grid_search({"PERIOD_THREE_LENGTH": [50, 60], "PERIOD_TWO_LENGTH": [20, 25]})
+        cache = {}
+        rows = evaluate(self.my_data_frame, self.config, parameter_sets, cache)
+        for parameters, row in zip(parameter_sets, rows):
+            stats = backtest(self.my_data_frame, apply_parameters(self.config, parameters))["stats"]
+            self.assertIsNone(row["error"])
+            self.assertEqual(row["total_return"], stats["total_return"])
+            self.assertEqual(row["trades"], stats["trades"])
+        # Evaluating again with the filled cache gives the same rows
+        self.assertEqual(evaluate(self.my_data_frame, self.config, parameter_sets, cache), rows)
+
+    def test_run_sweep_ranks_results(self):
+        parameter_sets = grid_search(TestSweep.SPACE) + [{"PERIOD_TWO_LENGTH": 60,
+                                                          "trading_parameters.*.High_Volume_Threshold": 50,
+                                                          "trading_parameters.period_three.Signal_Bar_Count": 26}]
+        results = run_sweep(self.my_data_frame, self.config, parameter_sets, workers=2, chunk_size=4)
+        self.assertEqual(len(results), 13)
+        self.assertEqual(list(results["rank"]), list(range(1, 14)))
+        returns = results["total_return"].to_numpy()
+        self.assertTrue(np.all(returns[:-2] >= returns[1:-1]))
+        # PERIOD_TWO_LENGTH longer than PERIOD_THREE_LENGTH cannot be scored and is ranked last
+        self.assertEqual(results["PERIOD_TWO_LENGTH"].iloc[-1], 60)
+        self.assertIn("PERIOD_THREE_LENGTH", results["error"].iloc[-1])
+
+        in_process = run_sweep(self.my_data_frame, self.config, parameter_sets, workers=1)
+        pd.testing.assert_frame_equal(results.drop(columns="rank").sort_values(list(TestSweep.SPACE)).reset_index(drop=True),
+                                      in_process.drop(columns="rank").sort_values(list(TestSweep.SPACE)).reset_index(drop=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
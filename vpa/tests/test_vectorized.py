@@ -0,0 +1,71 @@
+import unittest
+import os
+import json
+import numpy as np
+import pandas as pd
+from vpa.app_runner import MarketAnalyzer
+from vpa.vectorized import compute_signals, rolling_percentile_ranks
+
+SCORE_KEYS = ["single_candle_signal_score", "trend_signal_score", "multiple_bar_signal_score", "acc_dist_signal_score"]
+
+
+class TestVectorizedEngine(unittest.TestCase):
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.config_path = os.path.join(absolute_path, "../config/config.json")
+        with open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+
+        self.my_data_frame = pd.read_csv(os.path.join(absolute_path, "../data/spy_data.csv"))
+        self.my_data_frame = self.my_data_frame.sort_values("Date", axis=0)
+
+    def test_percentile_ranks_match_update_percentiles(self):
+        values = self.my_data_frame["Volume"].to_numpy()[:25]
+        ranks = rolling_percentile_ranks(values, 25, 5, 5)
+        steps = np.percentile(values, range(5, 100, 5))
+        expected = [5 + 5 * sum(1 for step in steps if value <= step) for value in values]
+        self.assertEqual(ranks.shape, (1, 25))
+        self.assertEqual(list(ranks[0]), expected)
+
+    def test_rank_percentiles_count_ties(self):
+        values = np.array([3.0, 1.0, 3.0, 2.0, 1.0, 5.0, 3.0])
+        ranks = rolling_percentile_ranks(values, 5, 5, 5, mode="rank")
+        expected = [[100 * sum(1 for other in window if other <= value) / 5 for value in window]
+                    for window in [values[i:i + 5] for i in range(3)]]
+        self.assertEqual(ranks.tolist(), expected)
+
+    def test_scores_match_process_data(self):
+        # Record the scores process_data produces for every bar and compare them to the columnar engine
+        analyzer = MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                                  fixed_df=self.my_data_frame, log_prefix="test_vectorized")
+        loop_scores = []
+        detect_signals = analyzer.detect_signals
+
+        def recording_detect_signals(candle):
+            signals = detect_signals(candle)
+            loop_scores.append([signals[key] for key in SCORE_KEYS])
+            return signals
+
+        analyzer.detect_signals = recording_detect_signals
+        trade_signal = analyzer.process_data()
+
+        signals = compute_signals(self.my_data_frame, self.config)
+        vectorized_scores = np.stack([signals[key] for key in SCORE_KEYS], axis=1)
+        self.assertEqual(vectorized_scores.shape, (len(self.my_data_frame) - self.config["PERIOD_THREE_LENGTH"] + 1, 4))
+        np.testing.assert_array_equal(vectorized_scores, np.array(loop_scores))
+        self.assertEqual(signals["trade_signal"][-1], trade_signal)
+
+        analyzer = MarketAnalyzer(config_path=self.config_path, ticker_symbol="SPY", log_level="ERROR",
+                                  fixed_df=self.my_data_frame, log_prefix="test_vectorized")
+        self.assertEqual(analyzer.process_data_vectorized(), trade_signal)
+
+    def test_not_enough_data(self):
+        short_frame = self.my_data_frame.head(self.config["PERIOD_THREE_LENGTH"] - 1)
+        signals = compute_signals(short_frame, self.config)
+        self.assertEqual(len(signals["trade_signal"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
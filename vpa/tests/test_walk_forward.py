@@ -0,0 +1,66 @@
+import unittest
+import os
+import json
+import numpy as np
+import pandas as pd
+from vpa.backtest import backtest
+from vpa.sweep import apply_parameters, grid_search, read_price_csv
+from vpa.walk_forward import out_of_sample_stats, walk_forward, walk_forward_folds
+
+
+class TestWalkForward(unittest.TestCase):
+    SPACE = {
+        "trading_parameters.*.High_Volume_Threshold": [50, 60],
+        "trading_parameters.period_three.Signal_Bar_Count": [24, 28]
+    }
+
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        with open(os.path.join(absolute_path, "../config/config.json"), 'r') as file:
+            self.config = json.load(file)
+        os.makedirs(os.path.join(absolute_path, "../log/"), exist_ok=True)
+        self.gbpusd = read_price_csv(os.path.join(absolute_path, "../data/GBPUSD_D1.csv")).iloc[-1500:]
+        self.gbpusd = self.gbpusd.reset_index(drop=True)
+
+    def test_folds(self):
+        self.assertEqual(walk_forward_folds(10, 4, 2), [(0, 4, 4, 6), (2, 6, 6, 8), (4, 8, 8, 10)])
+        self.assertEqual(walk_forward_folds(11, 4, 2, step=3), [(0, 4, 4, 6), (3, 7, 7, 9)])
+        self.assertEqual(walk_forward_folds(5, 4, 2), [])
+
+    def test_out_of_sample_stats_trade_only_the_test_bars(self):
+        stats = out_of_sample_stats(self.gbpusd, self.config, 1000, 1250)
+        # The warm-up bars give the first test bar full windows, so the test bars are the bars traded
+        warm_up = self.config["PERIOD_THREE_LENGTH"] - 1
+        frame = self.gbpusd.iloc[1000 - warm_up:1250].reset_index(drop=True)
+        result = backtest(frame, self.config)
+        self.assertEqual(len(result["equity"]), 250)
+        self.assertEqual(stats["total_return"], result["stats"]["total_return"])
+        self.assertEqual(stats["trades"], result["stats"]["trades"])
+
+    def test_parallel_folds_match_sequential(self):
+        parameter_sets = grid_search(TestWalkForward.SPACE)
+        folds, summary = walk_forward(self.gbpusd, self.config, parameter_sets, 750, 250, workers=2)
+        sequential, sequential_summary = walk_forward(self.gbpusd, self.config, parameter_sets, 750, 250, workers=1)
+        pd.testing.assert_frame_equal(folds, sequential)
+        self.assertEqual(summary, sequential_summary)
+
+        self.assertEqual(list(folds["fold"]), [1, 2, 3])
+        self.assertEqual(list(folds["test_start"]), list(self.gbpusd["Date"].iloc[[750, 1000, 1250]]))
+        self.assertEqual(summary["folds"], 3)
+        self.assertEqual(summary["test_trades"], folds["test_trades"].sum())
+        self.assertAlmostEqual(summary["compounded_test_return"], np.prod(1 + folds["test_total_return"]) - 1)
+
+        # Each fold's test result is that of the parameters that did best on its train bars
+        fold = folds.iloc[1]
+        best = {key[len("best."):]: fold[key] for key in folds.columns if key.startswith("best.")}
+        self.assertIn(best, parameter_sets)
+        stats = out_of_sample_stats(self.gbpusd, apply_parameters(self.config, best), 1000, 1250)
+        self.assertEqual(fold["test_total_return"], stats["total_return"])
+
+    def test_not_enough_bars(self):
+        with self.assertRaises(ValueError):
+            walk_forward(self.gbpusd, self.config, grid_search(TestWalkForward.SPACE), 1400, 250, workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
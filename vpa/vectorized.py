@@ -0,0 +1,290 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from vpa.app import PERIODS, Candle, calculate_adx_batch
+from vpa.signal_table import FLAG_BITS
+from vpa.rule_plan import PERIOD_LENGTH_KEYS
+
+# Columnar version of MarketAnalyzer.process_data. Every bar of the frame is scored in one pass using NumPy arrays
+# instead of building a Candle per row and walking three deques. The scoring rules are the same as
+# MarketAnalyzer.detect_signals so the per-bar trade_signal matches the loop.
+
+
+def rows_to_process(df, config):
+    # process_data stops at MAX_ROWS (by index label) when running on the sample CSV
+    if not config["use_real_data"] and config["MAX_ROWS"] > 0:
+        past_limit = np.flatnonzero(np.asarray(df.index) >= config["MAX_ROWS"])
+        if len(past_limit):
+            return df.iloc[:past_limit[0]]
+    return df
+
+
+def candle_arrays(df):
+    # Step 3: The same adjustments process_data makes before creating each Candle (see adjusted_candles)
+    close = df["Close"].to_numpy(dtype=float)
+    previous_close = np.concatenate(([0.0], close[:-1]))
+    candles = adjusted_candles(df["Open"].to_numpy(dtype=float), df["High"].to_numpy(dtype=float),
+                               df["Low"].to_numpy(dtype=float), close, previous_close)
+    candles["time"] = df["Date"].to_numpy()
+    candles["volume"] = df["Volume"].to_numpy()
+    return candles
+
+
+def adjusted_candles(raw_open, high, low, close, previous_close):
+    # The open is the previous close (unless that was zero) and the high/low are stretched to include the adjusted
+    # open. Works element by element, so the arrays can be one series or a (ticker x time) panel.
+    candle_open = np.where(previous_close != 0, previous_close, raw_open)
+    high = np.maximum(high, candle_open)
+    low = np.minimum(low, candle_open)
+
+    spread = np.abs(close - candle_open)
+    upper_wick = high - close
+    lower_wick = close - low
+
+    shooting_star = ((upper_wick > spread * Candle.CONFIG_SHOOTING_STAR_UPPER_WICK_X_TIMES_BIGGER_THAN_SPREAD)
+                     & (upper_wick > lower_wick * Candle.CONFIG_SHOOTING_STAR_UPPER_WICK_X_TIMES_BIGGER_THAN_LOWER_WICK))
+    hammer = ((lower_wick > spread * Candle.CONFIG_HAMMER_LOWER_WICK_X_TIMES_BIGGER_THAN_SPREAD)
+              & (lower_wick > upper_wick * Candle.CONFIG_HAMMER_LOWER_WICK_X_TIMES_BIGGER_THAN_UPPER_WICK))
+    lld = ((upper_wick > spread * Candle.CONFIG_LLD_BOTH_WICKS_X_TIMES_BIGGER_THAN_SPREAD)
+           & (lower_wick > spread * Candle.CONFIG_LLD_BOTH_WICKS_X_TIMES_BIGGER_THAN_SPREAD))
+    # A long-legged Doji is never also a Hammer or Shooting Star
+    shooting_star &= ~lld
+    hammer &= ~lld
+
+    return {
+        "open": candle_open,
+        "high": high,
+        "low": low,
+        "close": close,
+        "up_bar": close > candle_open,
+        "spread": spread,
+        "shooting_star": shooting_star,
+        "hammer": hammer,
+        "lld": lld
+    }
+
+
+def rolling_percentile_ranks(values, length, percentile_start, percentile_increments, mode="bucketed"):
+    # Step 5: For every window of `length` values, work out the percentile of each member of the window in
+    # the same way as RollingPercentile. Row i holds the window ending at values[length - 1 + i].
+    return window_percentile_ranks(sliding_window_view(values, length), percentile_start, percentile_increments, mode)
+
+
+def window_percentile_ranks(windows, percentile_start, percentile_increments, mode="bucketed"):
+    # The percentile of each member of each row of a (windows x values) array, as RollingPercentile works it out
+    if mode == "rank":
+        return 100 * _counts_at_or_below(windows) / windows.shape[1]
+    steps = np.percentile(windows, range(percentile_start, 100, percentile_increments), axis=1).T
+    above_count = (windows[:, :, None] <= steps[:, None, :]).sum(axis=2)
+    return percentile_start + percentile_increments * above_count
+
+
+def _counts_at_or_below(windows):
+    # For each member of each row, how many members of its row are <= it. Each row is sorted once and every member
+    # takes the position of the last of its equal values, so this is O(W log W) per row rather than comparing every
+    # pair of members.
+    order = np.argsort(windows, axis=1, kind="stable")
+    ordered = np.take_along_axis(windows, order, axis=1)
+    positions = np.broadcast_to(np.arange(1, windows.shape[1] + 1), windows.shape)
+    last_of_run = np.ones(windows.shape, dtype=bool)
+    last_of_run[:, :-1] = ordered[:, 1:] != ordered[:, :-1]
+    # Carry the position of each run's last member back over the rest of the run
+    sorted_counts = np.minimum.accumulate(np.where(last_of_run, positions, windows.shape[1])[:, ::-1], axis=1)[:, ::-1]
+    counts = np.empty(windows.shape, dtype=np.intp)
+    np.put_along_axis(counts, order, sorted_counts, axis=1)
+    return counts
+
+
+def compute_signals(df, config):
+    # Score every bar of the frame at once. The returned arrays have one entry per bar that process_data would score,
+    # i.e. from the point where the period_three rolling window is full.
+    return score_features(compute_features(df, config), config)
+
+
+def _cached(cache, key, compute):
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def period_lengths(config):
+    lengths = {key: config[PERIOD_LENGTH_KEYS[key]] for key in PERIODS}
+    if max(lengths.values()) != lengths["period_three"]:
+        raise ValueError("The vectorized engine requires PERIOD_THREE_LENGTH to be the longest rolling window")
+    return lengths
+
+
+def compute_features(df, config, cache=None):
+    # Everything compute_signals works out that does not depend on the "trading_parameters" thresholds: the candles,
+    # the percentile ranks of every window, the ADX and the single candle, trend and accumulation/distribution
+    # scores. `cache` is an optional dict kept for one frame - the candles, ranks and ADX are stored in it by window
+    # length and percentile settings so configurations that share them do not recompute them (see vpa/sweep.py).
+    lengths = period_lengths(config)
+    if cache is None:
+        cache = {}
+
+    df = rows_to_process(df, config)
+    candles = _cached(cache, ("candles", len(df)), lambda: candle_arrays(df))
+    window_end = lengths["period_three"] - 1
+    bar_count = max(len(df) - window_end, 0)
+
+    if bar_count == 0:
+        return {"lengths": lengths, "bar_count": bar_count, "time": candles["time"][window_end:]}
+
+    # The period_three window ending on each scored bar - row i is the window of bar window_end + i
+    windows = {name: sliding_window_view(candles[name], lengths["period_three"])
+               for name in ["close", "volume", "up_bar", "spread", "shooting_star", "hammer", "lld"]}
+    adx_values = _cached(cache, ("adx", len(df), lengths["period_three"]),
+                         lambda: calculate_adx_batch(candles["high"], candles["low"], candles["close"],
+                                                     lengths["period_three"]))
+    # The ranks are of the last `length` candles of each period_three window, so they are kept by period_three too
+    features = window_features(windows, adx_values, config,
+                               lambda key, compute: _cached(cache, (key[0], len(df), lengths["period_three"]) + key[1:],
+                                                            compute))
+    features["time"] = candles["time"][window_end:]
+    return features
+
+
+def window_features(windows, adx_values, config, cached=None):
+    # The features of the bar at the end of each period_three window. `windows` holds (windows x period_three)
+    # arrays of the candle columns and adx_values the ADX of each window. The windows can be every window of one
+    # frame (compute_features) or the latest window of many tickers (see vpa/panel.py). `cached(key, compute)` can
+    # keep the percentile ranks for reuse.
+    lengths = period_lengths(config)
+    if cached is None:
+        cached = lambda key, compute: compute()
+    bar_count = len(windows["close"])
+    features = {"lengths": lengths, "bar_count": bar_count}
+
+    # The signals that fire on each bar, as the bits detect_signals sets (see vpa/signal_table.py)
+    flags = np.zeros(bar_count, dtype=np.uint32)
+
+    def set_flag(name, mask):
+        flags[mask] |= np.uint32(FLAG_BITS[name])
+
+    up_bar = windows["up_bar"][:, -1]
+    up_sign = np.where(up_bar, 1, -1)
+    set_flag("up_bar", up_bar)
+
+    # Step 5: Percentiles of every candle in the window of each period
+    spread_ranks = {}
+    volume_ranks = {}
+    percentile_settings = (config["PERCENTILE_START"], config["PERCENTILE_INCREMENTS"],
+                           config.get("PERCENTILE_MODE", "bucketed"))
+    for key, length in lengths.items():
+        for prop, ranks in [("spread", spread_ranks), ("volume", volume_ranks)]:
+            ranks[key] = cached((prop, length, percentile_settings),
+                                lambda: window_percentile_ranks(windows[prop][:, -length:], *percentile_settings))
+
+    # Single candle signals - up/down, wide spread and high volume on each period, Shooting Star and Hammer
+    single_candle_signal_score = up_sign.astype(float)
+    for key in PERIODS:
+        wide_spread = spread_ranks[key][:, -1] > 70
+        high_volume = wide_spread & (volume_ranks[key][:, -1] > 70)
+        single_candle_signal_score += 2.5 * up_sign * wide_spread + 2.5 * up_sign * high_volume
+        set_flag(f"wide_spread_{key}", wide_spread)
+        set_flag(f"high_volume_{key}", high_volume)
+    shooting_star = windows["shooting_star"][:, -1]
+    hammer = windows["hammer"][:, -1] & ~shooting_star
+    single_candle_signal_score += np.where(shooting_star, -3, 0) + np.where(hammer, 3, 0)
+    set_flag("shooting_star", shooting_star)
+    set_flag("hammer", hammer)
+
+    # Step 6: Trend signals from the ADX over the period_three window
+    trending = adx_values[:, 0] > 25
+    trending_up = adx_values[:, 2] > adx_values[:, 3]
+    trending_down = adx_values[:, 3] > adx_values[:, 2]
+    trend_signal_score = 5.0 * (trending & trending_up) - 5.0 * (trending & trending_down)
+    set_flag("trending", trending)
+    set_flag("trending_up", trending & trending_up)
+    set_flag("trending_down", trending & trending_down)
+
+    # Step 7: The parts of the bar counts that do not depend on the thresholds
+    up_bar_counts = {}
+    spread_volume_differences = {}
+    for key, length in lengths.items():
+        up_bar_counts[key] = windows["up_bar"][:, -length:].sum(axis=1)
+        spread_volume_differences[key] = np.abs(spread_ranks[key] - volume_ranks[key])
+
+    # Step 9: Accumulation or distribution - compare the period_one volume and the last close to period_three
+    volume_percentiles = np.percentile(windows["volume"], [65, 90], axis=1)
+    price_percentiles = np.percentile(windows["close"], [10, 20, 80], axis=1)
+    period_one_volumes = windows["volume"][:, -lengths["period_one"]:]
+    high_volume_count = (period_one_volumes > volume_percentiles[0][:, None]).sum(axis=1)
+    close = windows["close"][:, -1]
+    near_lows = close < price_percentiles[1]
+    near_highs = close > price_percentiles[2]
+    acc = (high_volume_count >= 3) & near_lows
+    dist = (high_volume_count >= 3) & ~near_lows & near_highs
+    acc_dist_sign = np.where(acc, 1, 0) + np.where(dist, -1, 0)
+
+    candle_pattern = shooting_star | windows["hammer"][:, -1] | windows["lld"][:, -1]
+    potential_test = (spread_ranks["period_one"][:, -1] > 65) | candle_pattern
+    test_pass = potential_test & (volume_ranks["period_one"][:, -1] < 50)
+    test_fail = potential_test & ~test_pass
+    climax = (spread_ranks["period_two"][:, -1] < 40) & (volume_ranks["period_two"][:, -1] > 60)
+    acc_dist_signal_score = (10.0 * acc_dist_sign + 5.0 * acc_dist_sign * test_pass - 2.0 * (acc_dist_sign != 0) * test_fail
+                             + 10.0 * acc_dist_sign * climax)
+    set_flag("accumulation", acc)
+    set_flag("distribution", dist)
+    set_flag("test_pass", (acc | dist) & test_pass)
+    set_flag("test_fail", (acc | dist) & test_fail)
+    set_flag("climax", (acc | dist) & climax)
+
+    features.update({
+        "flags": flags,
+        "single_candle_signal_score": single_candle_signal_score,
+        "trend_signal_score": trend_signal_score,
+        "acc_dist_signal_score": acc_dist_signal_score,
+        "up_bar_counts": up_bar_counts,
+        "spread_ranks": spread_ranks,
+        "volume_ranks": volume_ranks,
+        "spread_volume_differences": spread_volume_differences
+    })
+    return features
+
+
+def score_features(features, config):
+    # Steps 7 and 8 with the config's thresholds: the bar counts on each period and whether they generate a (volume
+    # backed) signal, then the total of the four scores
+    bar_count = features["bar_count"]
+    result = {"time": features["time"]}
+    if bar_count == 0:
+        for name in ["single_candle_signal_score", "trend_signal_score", "multiple_bar_signal_score",
+                     "acc_dist_signal_score", "trade_signal"]:
+            result[name] = np.zeros(0)
+        result["flags"] = np.zeros(0, dtype=np.uint32)
+        return result
+
+    flags = features["flags"].copy()
+
+    def set_flag(name, mask):
+        flags[mask] |= np.uint32(FLAG_BITS[name])
+
+    multiple_bar_signal_score = np.zeros(bar_count)
+    for key in PERIODS:
+        parameters = config["trading_parameters"][key]
+        up_bar_count = features["up_bar_counts"][key]
+        high_spread_count = (features["spread_ranks"][key] > parameters["High_Spread_Threshold"]).sum(axis=1)
+        high_volume_count = (features["volume_ranks"][key] > parameters["High_Volume_Threshold"]).sum(axis=1)
+        anomaly_count = (features["spread_volume_differences"][key] > parameters["Anomaly_Threshold"]).sum(axis=1)
+
+        bull = up_bar_count >= parameters["Signal_Bar_Count"]
+        bear = ~bull & (up_bar_count <= features["lengths"]["period_one"] - parameters["Signal_Bar_Count"])
+        volume_backed = ((bull | bear) & (high_spread_count >= parameters["High_Spread_Count"])
+                         & (high_volume_count >= parameters["High_Volume_Count"])
+                         & (anomaly_count <= parameters["Anomaly_Threshold"]))
+        direction = np.where(bull, 2.5, 0) + np.where(bear, -2.5, 0)
+        multiple_bar_signal_score += np.where(volume_backed, direction * 2, direction)
+        set_flag(f"bull_{key}", bull)
+        set_flag(f"bear_{key}", bear)
+        set_flag(f"volume_backed_{key}", volume_backed)
+
+    result["single_candle_signal_score"] = features["single_candle_signal_score"]
+    result["trend_signal_score"] = features["trend_signal_score"]
+    result["multiple_bar_signal_score"] = multiple_bar_signal_score
+    result["acc_dist_signal_score"] = features["acc_dist_signal_score"]
+    result["trade_signal"] = (features["single_candle_signal_score"] + features["trend_signal_score"]
+                              + multiple_bar_signal_score + features["acc_dist_signal_score"])
+    result["flags"] = flags
+    return result
@@ -0,0 +1,170 @@
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from vpa.app import DebugLog
+from vpa.app_runner import MarketAnalyzer
+from vpa.backtest import backtest
+from vpa.shared_data import SharedMarketData
+from vpa.sweep import RESULT_STATS, apply_parameters, evaluate, grid_search, random_search, read_price_csv
+
+# Walk-forward validation of the config: the history is cut into rolling folds of `train_bars` followed by
+# `test_bars`. On each fold the search space (see vpa/sweep.py) is tuned on the train bars, then the best config is
+# run through MarketAnalyzer over the test bars - which it has not seen - and backtested. Folds are independent, so
+# they run on a pool of worker processes which read the price data from one shared memory block (see
+# vpa/shared_data.py) rather than each being sent a copy.
+#
+# The test bars are scored with the PERIOD_THREE_LENGTH - 1 bars before them as warm-up, so the first test bar has
+# a full set of rolling windows and every test bar is traded.
+
+
+# The name of the price data in the shared block
+_SHARED_KEY = "walk_forward"
+
+
+def walk_forward_folds(bar_count, train_bars, test_bars, step=None):
+    # (train_start, train_end, test_start, test_end) bar ranges, end exclusive. Each fold moves on `step` bars,
+    # by default one test period so the test periods follow on from each other.
+    step = step or test_bars
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= bar_count:
+        folds.append((start, start + train_bars, start + train_bars, start + train_bars + test_bars))
+        start += step
+    return folds
+
+
+def run_fold(df, config, parameter_sets, fold, rank_by="total_return"):
+    # Tune on the train bars, then score the best and the untuned config on the test bars
+    train_start, train_end, test_start, test_end = fold
+    train_df = df.iloc[train_start:train_end].reset_index(drop=True)
+    rows = evaluate(train_df, config, parameter_sets)
+    scores = np.array([row[rank_by] if row["error"] is None else -np.inf for row in rows], dtype=float)
+    if not np.isfinite(scores).any():
+        raise ValueError(f"No parameter set could be evaluated on the bars {train_start} to {train_end}")
+    best = int(np.argmax(scores))
+
+    result = {
+        **fold_dates(df, fold),
+        **{f"best.{key}": value for key, value in parameter_sets[best].items()},
+        f"train_{rank_by}": rows[best][rank_by]
+    }
+    result.update({f"test_{name}": value for name, value in
+                   out_of_sample_stats(df, apply_parameters(config, parameter_sets[best]), test_start, test_end).items()})
+    result["untuned_test_total_return"] = out_of_sample_stats(df, config, test_start, test_end)["total_return"]
+    return result
+
+
+def fold_dates(df, fold):
+    train_start, train_end, test_start, test_end = fold
+    return {
+        "train_start": df["Date"].iloc[train_start],
+        "train_end": df["Date"].iloc[train_end - 1],
+        "test_start": df["Date"].iloc[test_start],
+        "test_end": df["Date"].iloc[test_end - 1]
+    }
+
+
+def out_of_sample_stats(df, config, test_start, test_end):
+    # Backtest statistics for a config over df's test_start to test_end bars, scored by MarketAnalyzer
+    warm_up = config["PERIOD_THREE_LENGTH"] - 1
+    test_df = df.iloc[max(test_start - warm_up, 0):test_end].reset_index(drop=True)
+    analyzer = MarketAnalyzer(config_path=None, ticker_symbol="walk_forward", fixed_df=test_df, config=config,
+                              logger=DebugLog.shared(level="ERROR", file_prefix="walk_forward"))
+    analyzer.process_data_vectorized()
+    stats = backtest(test_df, config, analyzer.signal_table())["stats"]
+    return {name: stats[name] for name in RESULT_STATS}
+
+
+# Per worker process state, set by _init_worker. The block stays attached for the life of the worker, as the frame
+# is a view of it.
+_worker_market_data = None
+_worker_df = None
+_worker_config = None
+_worker_parameter_sets = None
+
+
+def _init_worker(descriptor, config, parameter_sets):
+    global _worker_market_data, _worker_df, _worker_config, _worker_parameter_sets
+    _worker_market_data = SharedMarketData.attach(descriptor)
+    _worker_df = _worker_market_data.frame(_SHARED_KEY)
+    _worker_config, _worker_parameter_sets = config, parameter_sets
+
+
+def _run_fold(fold, rank_by):
+    return run_fold(_worker_df, _worker_config, _worker_parameter_sets, fold, rank_by)
+
+
+def walk_forward(df, config, parameter_sets, train_bars, test_bars, step=None, workers=None, rank_by="total_return"):
+    # Run every fold, concurrently unless workers is 1. Returns a DataFrame with a row per fold and a dict summarising
+    # the test periods.
+    folds = walk_forward_folds(len(df), train_bars, test_bars, step)
+    if not folds:
+        raise ValueError(f"{len(df)} bars is not enough for one fold of {train_bars} + {test_bars} bars")
+    workers = workers or config.get("scan_workers", 0) or os.cpu_count()
+    results = {}
+    if workers == 1:
+        for index, fold in enumerate(folds):
+            results[index] = run_fold(df, config, parameter_sets, fold, rank_by)
+    else:
+        # The workers see the OHLCV columns as the shared block stores them (dates as datetime64), so the dates of
+        # each fold are filled in from the caller's frame
+        with SharedMarketData.create({_SHARED_KEY: df}) as shared:
+            with ProcessPoolExecutor(max_workers=min(workers, len(folds)), initializer=_init_worker,
+                                     initargs=(shared.descriptor(), config, parameter_sets)) as executor:
+                futures = {executor.submit(_run_fold, fold, rank_by): index for index, fold in enumerate(folds)}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    results[index] = {**future.result(), **fold_dates(df, folds[index])}
+
+    fold_results = pd.DataFrame([results[index] for index in range(len(folds))])
+    fold_results.insert(0, "fold", range(1, len(folds) + 1))
+    return fold_results, summarise_folds(fold_results, rank_by)
+
+
+def summarise_folds(fold_results, rank_by="total_return"):
+    test_returns = fold_results["test_total_return"].to_numpy()
+    summary = {
+        "folds": int(len(fold_results)),
+        "compounded_test_return": float(np.prod(1 + test_returns) - 1),
+        "mean_test_return": float(test_returns.mean()),
+        "median_test_return": float(np.median(test_returns)),
+        "positive_folds": float((test_returns > 0).mean()),
+        "worst_test_drawdown": float(fold_results["test_max_drawdown"].min()),
+        "mean_test_drawdown": float(fold_results["test_max_drawdown"].mean()),
+        "test_trades": int(fold_results["test_trades"].sum()),
+        "mean_test_win_rate": float(fold_results["test_win_rate"].mean()),
+        "compounded_untuned_test_return": float(np.prod(1 + fold_results["untuned_test_total_return"].to_numpy()) - 1)
+    }
+    if rank_by == "total_return":
+        # How much of the in-sample return survives out of sample
+        summary["mean_train_return"] = float(fold_results["train_total_return"].mean())
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward validation of config.json")
+    parser.add_argument("space", help="JSON file with the search space to tune on each train fold")
+    parser.add_argument("--data", default="data/GBPUSD_D1.csv")
+    parser.add_argument("--config", default="config/config.json")
+    parser.add_argument("--train-bars", type=int, default=1000)
+    parser.add_argument("--test-bars", type=int, default=250)
+    parser.add_argument("--step", type=int, default=None)
+    parser.add_argument("--samples", type=int, default=None, help="tune on this many random combinations")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rank-by", default="total_return")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as file:
+        base_config = json.load(file)
+    with open(args.space, 'r') as file:
+        search_space = json.load(file)
+    parameter_sets = (grid_search(search_space) if args.samples is None
+                      else random_search(search_space, args.samples, args.seed))
+    folds_df, fold_summary = walk_forward(read_price_csv(args.data), base_config, parameter_sets, args.train_bars,
+                                          args.test_bars, args.step, args.workers, args.rank_by)
+    print(folds_df.to_string())
+    print(json.dumps(fold_summary, indent=2))